@@ -0,0 +1,120 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+"""Import time and first call latency benchmark.
+
+Every measurement runs in a new interpreter so nothing is cached
+between runs. Results are printed as JSON::
+
+    python benchmarks/import_time.py --runs 20
+
+Use ``--max-import-ms`` to fail if median import time regresses.
+"""
+from __future__ import annotations
+
+from argparse import ArgumentParser
+from json import dumps
+from statistics import median
+from subprocess import run
+from sys import executable
+from typing import Dict, List
+
+IMPORT_CODE = '''
+from time import perf_counter
+start = perf_counter()
+import {package}
+print(perf_counter() - start)
+'''
+
+BLOCK_FIRST_CALL_CODE = '''
+from time import perf_counter
+start = perf_counter()
+from sdbus_block.secrets import SecretService
+SecretService().read_alias('default')
+print(perf_counter() - start)
+'''
+
+ASYNC_FIRST_CALL_CODE = '''
+from time import perf_counter
+start = perf_counter()
+from asyncio import run
+from sdbus_async.secrets import SecretService
+async def main():
+    await SecretService().read_alias('default')
+run(main())
+print(perf_counter() - start)
+'''
+
+
+def measure(code: str, runs: int) -> Dict[str, float]:
+    timings: List[float] = []
+    for _ in range(runs):
+        completed = run(
+            (executable, '-c', code),
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        timings.append(float(completed.stdout) * 1000)
+
+    return {
+        'min_ms': min(timings),
+        'median_ms': median(timings),
+        'max_ms': max(timings),
+    }
+
+
+def main() -> int:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument(
+        '--no-bus', action='store_true',
+        help='Skip first call measurements that need secrets daemon.')
+    parser.add_argument(
+        '--max-import-ms', type=float,
+        help='Exit with error if median import time is larger.')
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, float]] = {}
+    for package in ('sdbus_async.secrets', 'sdbus_block.secrets'):
+        results[f'import {package}'] = measure(
+            IMPORT_CODE.format(package=package), args.runs)
+
+    if not args.no_bus:
+        results['first call blocking'] = measure(
+            BLOCK_FIRST_CALL_CODE, args.runs)
+        results['first call async'] = measure(
+            ASYNC_FIRST_CALL_CODE, args.runs)
+
+    print(dumps(results, indent=4))
+
+    if args.max_import_ms is not None:
+        for name, timings in results.items():
+            if (
+                name.startswith('import')
+                and timings['median_ms'] > args.max_import_ms
+            ):
+                print(f'{name} is slower than {args.max_import_ms} ms')
+                return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,308 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+"""Latency and throughput benchmark of both packages.
+
+Starts a private ``dbus-daemon`` and the stand-in secrets service
+for every keyring size, then runs the async and blocking workers in
+separate interpreters. Results are written as JSON::
+
+    python benchmarks/secrets_benchmark.py --sizes 100 1000 10000 \\
+        --output results.json
+
+For every operation the number of calls, p50 and p99 latency in
+milliseconds and sequential throughput in calls per second are
+reported.
+"""
+from __future__ import annotations
+
+from argparse import SUPPRESS, ArgumentParser
+from asyncio import run as asyncio_run
+from json import dumps, loads
+from os import environ
+from pathlib import Path
+from subprocess import PIPE, Popen, run
+from sys import executable
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Tuple,
+)
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+STAND_IN_SERVICE = BENCHMARKS_DIR / 'stand_in_service.py'
+
+DBUS_DAEMON_CONFIG = '''<!DOCTYPE busconfig PUBLIC
+ "-//freedesktop//DTD D-Bus Bus Configuration 1.0//EN"
+ "http://www.freedesktop.org/standards/dbus/1.0/busconfig.dtd">
+<busconfig>
+  <type>session</type>
+  <listen>unix:dir={socket_dir}</listen>
+  <auth>EXTERNAL</auth>
+  <policy context="default">
+    <allow send_destination="*" eavesdrop="true"/>
+    <allow eavesdrop="true"/>
+    <allow own="*"/>
+  </policy>
+</busconfig>
+'''
+
+GET_SECRETS_BATCH = 100
+
+OperationResults = Dict[str, Dict[str, float]]
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    sorted_timings = sorted(timings)
+    calls = len(sorted_timings)
+    return {
+        'calls': calls,
+        'p50_ms': sorted_timings[calls // 2] * 1000,
+        'p99_ms': sorted_timings[min(calls - 1, calls * 99 // 100)] * 1000,
+        'throughput_per_s': calls / sum(sorted_timings),
+    }
+
+
+def items_indexes(size: int, calls: int) -> Iterator[int]:
+    # Spread the accessed items over the whole keyring
+    step = max(size // calls, 1)
+    for call in range(calls):
+        yield (call * step) % size
+
+
+def item_proxies(
+    item_class: Callable[[str], Any],
+    items_paths: List[str],
+    size: int,
+    calls: int,
+) -> Dict[int, Any]:
+    return {
+        index: item_class(items_paths[index])
+        for index in items_indexes(size, calls)
+    }
+
+
+def new_item_properties(index: int) -> Dict[str, Tuple[str, Any]]:
+    return {
+        'org.freedesktop.Secret.Item.Label': ('s', 'New item'),
+        'org.freedesktop.Secret.Item.Attributes': (
+            'a{ss}', {'benchmark-new': str(index)}),
+    }
+
+
+def sort_items_paths(items_paths: List[str]) -> List[str]:
+    return sorted(items_paths, key=lambda path: int(path.rsplit('/', 1)[1]))
+
+
+def benchmark_blocking(size: int, calls: int) -> OperationResults:
+    from sdbus_block.secrets import SecretCollection, SecretItem, SecretService
+
+    service = SecretService()
+    collection = SecretCollection(service.read_alias('default'))
+    items_paths = sort_items_paths(collection.items)
+    items = item_proxies(SecretItem, items_paths, size, calls)
+    _, session_path = service.open_session('plain', ('s', ''))
+    secret = (session_path, b'', b'new secret', 'text/plain')
+
+    operations: Dict[str, Callable[[int], Any]] = {
+        'open_session': lambda _: service.open_session('plain', ('s', '')),
+        'search_items': lambda index: service.search_items(
+            {'benchmark-index': str(index)}),
+        'get_secret': lambda index: items[index].get_secret(session_path),
+        'get_secrets': lambda index: service.get_secrets(
+            items_paths[index:index + GET_SECRETS_BATCH], session_path),
+        'create_item': lambda index: collection.create_item(
+            new_item_properties(index), secret, False),
+        'read_label': lambda index: items[index].label,
+        'read_attributes': lambda index: items[index].attributes,
+    }
+
+    results: OperationResults = {}
+    for operation_name, operation in operations.items():
+        timings: List[float] = []
+        for index in items_indexes(size, calls):
+            start = perf_counter()
+            operation(index)
+            timings.append(perf_counter() - start)
+
+        results[operation_name] = summarize(timings)
+
+    return results
+
+
+async def benchmark_async(size: int, calls: int) -> OperationResults:
+    from sdbus_async.secrets import SecretCollection, SecretItem, SecretService
+
+    service = SecretService()
+    collection = SecretCollection(await service.read_alias('default'))
+    items_paths = sort_items_paths(await collection.items)
+    items = item_proxies(SecretItem, items_paths, size, calls)
+    _, session_path = await service.open_session('plain', ('s', ''))
+    secret = (session_path, b'', b'new secret', 'text/plain')
+
+    operations: Dict[str, Callable[[int], Awaitable[Any]]] = {
+        'open_session': lambda _: service.open_session('plain', ('s', '')),
+        'search_items': lambda index: service.search_items(
+            {'benchmark-index': str(index)}),
+        'get_secret': lambda index: items[index].get_secret(session_path),
+        'get_secrets': lambda index: service.get_secrets(
+            items_paths[index:index + GET_SECRETS_BATCH], session_path),
+        'create_item': lambda index: collection.create_item(
+            new_item_properties(index), secret, False),
+        'read_label': lambda index: items[index].label.get_async(),
+        'read_attributes': lambda index: (
+            items[index].attributes.get_async()),
+    }
+
+    results: OperationResults = {}
+    for operation_name, operation in operations.items():
+        timings: List[float] = []
+        for index in items_indexes(size, calls):
+            start = perf_counter()
+            await operation(index)
+            timings.append(perf_counter() - start)
+
+        results[operation_name] = summarize(timings)
+
+    return results
+
+
+def run_worker(flavour: str, size: int, calls: int) -> None:
+    if flavour == 'async':
+        results = asyncio_run(benchmark_async(size, calls))
+    else:
+        results = benchmark_blocking(size, calls)
+
+    print(dumps(results))
+
+
+def start_dbus_daemon(temp_dir: Path) -> Tuple[Popen[str], str]:
+    config_path = temp_dir / 'bus.conf'
+    config_path.write_text(DBUS_DAEMON_CONFIG.format(socket_dir=temp_dir))
+
+    dbus_daemon = Popen(
+        (
+            'dbus-daemon', '--nofork', '--print-address=1',
+            f'--config-file={config_path}',
+        ),
+        stdout=PIPE,
+        text=True,
+    )
+    assert dbus_daemon.stdout is not None
+    return dbus_daemon, dbus_daemon.stdout.readline().strip()
+
+
+def start_service(size: int, env: Dict[str, str]) -> Popen[str]:
+    service = Popen(
+        (executable, str(STAND_IN_SERVICE), '--items', str(size)),
+        stdout=PIPE,
+        env=env,
+        text=True,
+    )
+    assert service.stdout is not None
+    if service.stdout.readline().strip() != 'READY':
+        service.kill()
+        raise RuntimeError('Stand-in service failed to start')
+
+    return service
+
+
+def run_benchmarks(
+    sizes: List[int],
+    calls: int,
+    flavours: List[str],
+) -> Dict[str, Any]:
+    results: Dict[str, Any] = {'calls': calls, 'sizes': {}}
+
+    with TemporaryDirectory() as temp_dir:
+        dbus_daemon, bus_address = start_dbus_daemon(Path(temp_dir))
+        env = dict(environ)
+        env['DBUS_SESSION_BUS_ADDRESS'] = bus_address
+        env['DBUS_STARTER_BUS_TYPE'] = 'user'
+        # Benchmark packages from this source tree
+        env['PYTHONPATH'] = str(BENCHMARKS_DIR.parent)
+
+        try:
+            for size in sizes:
+                service = start_service(size, env)
+                try:
+                    results['sizes'][str(size)] = {
+                        flavour: loads(run(
+                            (
+                                executable, __file__,
+                                '--worker', flavour,
+                                '--sizes', str(size),
+                                '--calls', str(calls),
+                            ),
+                            stdout=PIPE,
+                            env=env,
+                            check=True,
+                            text=True,
+                        ).stdout)
+                        for flavour in flavours
+                    }
+                finally:
+                    service.terminate()
+                    service.wait()
+        finally:
+            dbus_daemon.terminate()
+            dbus_daemon.wait()
+
+    return results
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+        help='Number of items in the keyring.')
+    parser.add_argument(
+        '--calls', type=int, default=200,
+        help='Number of calls of every operation.')
+    parser.add_argument(
+        '--flavours', nargs='+', default=['async', 'blocking'],
+        choices=('async', 'blocking'))
+    parser.add_argument(
+        '--output', type=Path,
+        help='Write JSON results to file instead of standard output.')
+    parser.add_argument('--worker', choices=('async', 'blocking'),
+                        help=SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        run_worker(args.worker, args.sizes[0], args.calls)
+        return
+
+    results_json = dumps(
+        run_benchmarks(args.sizes, args.calls, args.flavours), indent=4)
+
+    if args.output is None:
+        print(results_json)
+    else:
+        args.output.write_text(results_json + '\n')
+
+
+if __name__ == '__main__':
+    main()
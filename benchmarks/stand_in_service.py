@@ -0,0 +1,85 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+"""In-memory stand-in for the secrets daemon used by benchmarks.
+
+Runs the reference :py:class:`SecretsDaemon` on the default bus
+with the ``default`` collection filled with generated items.
+Prints ``READY`` once the name is acquired::
+
+    python benchmarks/stand_in_service.py --items 1000
+"""
+from __future__ import annotations
+
+from argparse import ArgumentParser
+from asyncio import Event, run
+from time import time
+from typing import Iterator
+
+from sdbus import request_default_bus_name_async
+from sdbus_async.secrets.daemon import (
+    MemoryStorage,
+    SecretsDaemon,
+    StoredCollection,
+    StoredItem,
+)
+
+COLLECTION_PATH = '/org/freedesktop/secrets/collection/benchmark'
+
+
+def generate_items(items_count: int, now: int) -> Iterator[StoredItem]:
+    for i in range(items_count):
+        yield StoredItem(
+            f'{COLLECTION_PATH}/{i}',
+            COLLECTION_PATH,
+            f'Item {i}',
+            {'benchmark-index': str(i), 'benchmark-group': str(i % 10)},
+            f'secret {i}'.encode(),
+            'text/plain',
+            now,
+            now,
+        )
+
+
+async def serve(items_count: int) -> None:
+    now = int(time())
+    secrets_daemon = SecretsDaemon(MemoryStorage(
+        (StoredCollection(COLLECTION_PATH, 'Benchmark', now, now),),
+        generate_items(items_count, now),
+        {'default': COLLECTION_PATH},
+    ))
+    secrets_daemon.export()
+
+    await request_default_bus_name_async('org.freedesktop.secrets')
+    print('READY', flush=True)
+    await Event().wait()
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--items', type=int, default=0,
+        help='Number of items in the default collection.')
+    args = parser.parse_args()
+
+    run(serve(args.items))
+
+
+if __name__ == '__main__':
+    main()
@@ -19,20 +19,121 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
 from __future__ import annotations
 
-from .interfaces import (
-    SecretCollectionInterface,
-    SecretItemInterface,
-    SecretPromptInterface,
-    SecretServiceInterface,
-    SecretSessionInterface,
-)
-from .objects import (
-    SecretCollection,
-    SecretItem,
-    SecretPrompt,
-    SecretService,
-    SecretSession,
-)
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, Dict, List
+
+if TYPE_CHECKING:
+    from .bulk import fetch_secrets, get_secrets_in_chunks
+    from .cache import SecretsCache
+    from .call_policy import (
+        CallPolicy,
+        CircuitBreaker,
+        CircuitOpenError,
+        DeadlineExceededError,
+    )
+    from .client import SecretsClient
+    from .encryption import (
+        DH_AES_ALGORITHM,
+        PLAIN_ALGORITHM,
+        DhAesSessionCipher,
+        PlainSessionCipher,
+        new_session_cipher,
+    )
+    from .exceptions import (
+        SecretIsLockedError,
+        SecretNoSessionError,
+        SecretNoSuchObjectError,
+    )
+    from .index import SecretsIndex
+    from .instrumentation import instrument
+    from .interfaces import (
+        SecretCollectionInterface,
+        SecretItemInterface,
+        SecretPromptInterface,
+        SecretServiceInterface,
+        SecretSessionInterface,
+    )
+    from .metrics import InMemoryMetricsSink, MemberStats, MetricsSink
+    from .objects import (
+        SecretCollection,
+        SecretItem,
+        SecretPrompt,
+        SecretService,
+        SecretSession,
+    )
+    from .prompts import await_prompt
+    from .proxies import SecretProxyFactory
+    from .records import (
+        CollectionProperties,
+        ItemInfo,
+        ItemProperties,
+        SearchResult,
+        Secret,
+    )
+    from .resilience import with_policy
+    from .sessions import SecretSessionManager
+    from .snapshots import snapshot_collection, snapshot_item, snapshot_items
+    from .values import SecretValue
+
+# Exported names are imported on first access so that importing
+# the package does not import every submodule.
+_NAMES_MODULES: Dict[str, str] = {
+    'SecretCollectionInterface': 'interfaces',
+    'SecretItemInterface': 'interfaces',
+    'SecretPromptInterface': 'interfaces',
+    'SecretServiceInterface': 'interfaces',
+    'SecretSessionInterface': 'interfaces',
+
+    'SecretService': 'objects',
+    'SecretCollection': 'objects',
+    'SecretItem': 'objects',
+    'SecretPrompt': 'objects',
+    'SecretSession': 'objects',
+
+    'SecretSessionManager': 'sessions',
+
+    'PLAIN_ALGORITHM': 'encryption',
+    'DH_AES_ALGORITHM': 'encryption',
+    'PlainSessionCipher': 'encryption',
+    'DhAesSessionCipher': 'encryption',
+    'new_session_cipher': 'encryption',
+    'SecretValue': 'values',
+
+    'fetch_secrets': 'bulk',
+    'get_secrets_in_chunks': 'bulk',
+
+    'SecretsCache': 'cache',
+    'SecretsClient': 'client',
+    'SecretsIndex': 'index',
+
+    'ItemProperties': 'records',
+    'CollectionProperties': 'records',
+    'Secret': 'records',
+    'SearchResult': 'records',
+    'ItemInfo': 'records',
+    'snapshot_item': 'snapshots',
+    'snapshot_collection': 'snapshots',
+    'snapshot_items': 'snapshots',
+
+    'await_prompt': 'prompts',
+
+    'SecretProxyFactory': 'proxies',
+
+    'instrument': 'instrumentation',
+    'MetricsSink': 'metrics',
+    'InMemoryMetricsSink': 'metrics',
+    'MemberStats': 'metrics',
+
+    'with_policy': 'resilience',
+    'CallPolicy': 'call_policy',
+    'CircuitBreaker': 'call_policy',
+    'CircuitOpenError': 'call_policy',
+    'DeadlineExceededError': 'call_policy',
+
+    'SecretIsLockedError': 'exceptions',
+    'SecretNoSessionError': 'exceptions',
+    'SecretNoSuchObjectError': 'exceptions',
+}
 
 __all__ = (
     'SecretCollectionInterface',
@@ -46,4 +147,64 @@ __all__ = (
     'SecretItem',
     'SecretPrompt',
     'SecretSession',
+
+    'SecretSessionManager',
+
+    'PLAIN_ALGORITHM',
+    'DH_AES_ALGORITHM',
+    'PlainSessionCipher',
+    'DhAesSessionCipher',
+    'new_session_cipher',
+    'SecretValue',
+
+    'fetch_secrets',
+    'get_secrets_in_chunks',
+
+    'SecretsCache',
+    'SecretsClient',
+    'SecretsIndex',
+
+    'ItemProperties',
+    'CollectionProperties',
+    'Secret',
+    'SearchResult',
+    'ItemInfo',
+    'snapshot_item',
+    'snapshot_collection',
+    'snapshot_items',
+
+    'await_prompt',
+
+    'SecretProxyFactory',
+
+    'instrument',
+    'MetricsSink',
+    'InMemoryMetricsSink',
+    'MemberStats',
+
+    'with_policy',
+    'CallPolicy',
+    'CircuitBreaker',
+    'CircuitOpenError',
+    'DeadlineExceededError',
+
+    'SecretIsLockedError',
+    'SecretNoSessionError',
+    'SecretNoSuchObjectError',
 )
+
+
+def __getattr__(name: str) -> Any:
+    try:
+        module_name = _NAMES_MODULES[name]
+    except KeyError:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}') from None
+
+    value = getattr(import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + list(__all__))
@@ -0,0 +1,202 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class AttributeIndex:
+    """Inverted index of items attributes.
+
+    Maps every attribute name and value pair to the set of items
+    object paths having that attribute. Does not communicate
+    with the secrets daemon.
+    """
+
+    def __init__(self) -> None:
+        self._attribute_to_items: Dict[Tuple[str, str], Set[str]] = {}
+        self._item_attributes: Dict[str, Dict[str, str]] = {}
+        self._item_collection: Dict[str, str] = {}
+        self._collection_items: Dict[str, Set[str]] = {}
+        self._locked_collections: Set[str] = set()
+
+    def set_item(
+        self,
+        item_path: str,
+        collection_path: str,
+        attributes: Dict[str, str],
+    ) -> None:
+        """Add item or replace its attributes.
+
+        :param str item_path: Object path to item.
+        :param str collection_path: Object path to collection
+            of the item.
+        :param Dict[str,str] attributes: Item attributes.
+        """
+        self.remove_item(item_path)
+
+        self._item_attributes[item_path] = dict(attributes)
+        self._item_collection[item_path] = collection_path
+        self._collection_items.setdefault(
+            collection_path, set()).add(item_path)
+
+        for attribute in attributes.items():
+            self._attribute_to_items.setdefault(
+                attribute, set()).add(item_path)
+
+    def remove_item(self, item_path: str) -> None:
+        """Remove item if present.
+
+        :param str item_path: Object path to item.
+        """
+        attributes = self._item_attributes.pop(item_path, None)
+        if attributes is None:
+            return
+
+        collection_path = self._item_collection.pop(item_path)
+        self._collection_items[collection_path].discard(item_path)
+
+        for attribute in attributes.items():
+            attribute_items = self._attribute_to_items[attribute]
+            attribute_items.discard(item_path)
+            if not attribute_items:
+                del self._attribute_to_items[attribute]
+
+    def set_collection_locked(
+        self,
+        collection_path: str,
+        locked: bool,
+    ) -> None:
+        """Set whether items of the collection are locked.
+
+        :param str collection_path: Object path to collection.
+        :param bool locked: Is collection locked?
+        """
+        self._collection_items.setdefault(collection_path, set())
+
+        if locked:
+            self._locked_collections.add(collection_path)
+        else:
+            self._locked_collections.discard(collection_path)
+
+    def remove_collection(self, collection_path: str) -> None:
+        """Remove collection and all its items.
+
+        :param str collection_path: Object path to collection.
+        """
+        for item_path in tuple(
+            self._collection_items.get(collection_path, ())
+        ):
+            self.remove_item(item_path)
+
+        self._collection_items.pop(collection_path, None)
+
+        self._locked_collections.discard(collection_path)
+
+    def clear(self) -> None:
+        """Remove all collections and items."""
+        self._attribute_to_items.clear()
+        self._item_attributes.clear()
+        self._item_collection.clear()
+        self._collection_items.clear()
+        self._locked_collections.clear()
+
+    def get_attributes(self, item_path: str) -> Optional[Dict[str, str]]:
+        """Get indexed attributes of the item.
+
+        :param str item_path: Object path to item.
+        :returns: Copy of item attributes or None if item
+            is not indexed.
+        :rtype: Optional[Dict[str,str]]
+        """
+        attributes = self._item_attributes.get(item_path)
+        return dict(attributes) if attributes is not None else None
+
+    def search_items(
+        self,
+        attributes: Dict[str, str],
+    ) -> Tuple[List[str], List[str]]:
+        """Find items in any collection.
+
+        Same as :py:meth:`SecretServiceInterface.search_items`
+        but answered from the index.
+
+        :param Dict[str,str] attributes: Attributes that should match.
+        :returns: Two arrays of matched object paths.
+            First arrays contains unlocked items and second locked ones.
+        :rtype: Tuple[List[str],List[str]]
+        """
+        unlocked_items: List[str] = []
+        locked_items: List[str] = []
+
+        locked_collections = self._locked_collections
+        item_collection = self._item_collection
+        for item_path in self._match(attributes):
+            if item_collection[item_path] in locked_collections:
+                locked_items.append(item_path)
+            else:
+                unlocked_items.append(item_path)
+
+        return unlocked_items, locked_items
+
+    def search_collection_items(
+        self,
+        collection_path: str,
+        attributes: Dict[str, str],
+    ) -> List[str]:
+        """Search for items in a collection.
+
+        Same as :py:meth:`SecretCollectionInterface.search_items`
+        but answered from the index.
+
+        :param str collection_path: Object path to collection.
+        :param Dict[str,str] attributes: Attributes that should match.
+        :returns: List of matched items object paths.
+        :rtype: List[str]
+        """
+        collection_items = self._collection_items.get(collection_path, ())
+        return [
+            item_path for item_path in self._match(attributes)
+            if item_path in collection_items
+        ]
+
+    def __len__(self) -> int:
+        return len(self._item_attributes)
+
+    def _match(self, attributes: Dict[str, str]) -> Set[str]:
+        if not attributes:
+            return set(self._item_attributes)
+
+        try:
+            attribute_sets = sorted(
+                (
+                    self._attribute_to_items[attribute]
+                    for attribute in attributes.items()
+                ),
+                key=len,
+            )
+        except KeyError:
+            return set()
+
+        matched = set(attribute_sets[0])
+        for attribute_items in attribute_sets[1:]:
+            matched.intersection_update(attribute_items)
+
+        return matched
@@ -0,0 +1,222 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from asyncio import Task, gather, get_running_loop, shield, sleep
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
+
+from sdbus.sd_bus_internals import SdBus
+from sdbus_async.dbus_daemon import FreedesktopDbus
+
+from .encryption import PLAIN_ALGORITHM
+from .expiring_cache import ExpiringLruCache
+from .interfaces import SecretCollectionInterface, SecretServiceInterface
+from .objects import SECRET_SERVICE_BUS_NAME, SecretItem
+from .records import ItemProperties
+from .sessions import SecretSessionManager
+from .snapshots import snapshot_item
+from .values import SecretValue
+
+if TYPE_CHECKING:
+    from sdbus.dbus_proxy_async_signal import DbusSignalAsync
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 60.0
+
+
+class SecretsCache:
+    """Client side cache of secrets and items properties.
+
+    Entries are evicted after ``ttl`` seconds or when the cache is
+    full and the entry is least recently used.
+
+    Entries are invalidated as soon as ``ItemChanged`` or ``ItemDeleted``
+    signals are received for the item or ``CollectionDeleted`` signal
+    is received for its collection. The first lookup waits until
+    the signals are subscribed so no change is missed.
+
+    Can be used as an async context manager which stops watching
+    signals on exit.
+    """
+
+    def __init__(
+        self,
+        session_manager: SecretSessionManager,
+        algorithm: str = PLAIN_ALGORITHM,
+        bus: Optional[SdBus] = None,
+        max_size: int = DEFAULT_CACHE_SIZE,
+        ttl: float = DEFAULT_CACHE_TTL,
+    ) -> None:
+        """
+        :param SecretSessionManager session_manager: Session manager
+            used to retrieve secrets.
+        :param str algorithm: Session algorithm.
+        :param SdBus bus: Use specific bus or session bus by default.
+        :param int max_size: Maximum number of cached secrets and
+            maximum number of cached items properties.
+        :param float ttl: Seconds before an entry expires.
+        """
+        self._session_manager = session_manager
+        self._algorithm = algorithm
+        self._bus = bus
+        self._secrets: ExpiringLruCache[str, Tuple[SecretValue, str]] = (
+            ExpiringLruCache(max_size, ttl))
+        self._properties: ExpiringLruCache[str, ItemProperties] = (
+            ExpiringLruCache(max_size, ttl))
+        self._watch_tasks: List[Task[None]] = []
+        self._watch_started: Optional[Task[None]] = None
+
+    @property
+    def hits(self) -> int:
+        """Number of lookups answered from cache."""
+        return self._secrets.hits + self._properties.hits
+
+    @property
+    def misses(self) -> int:
+        """Number of lookups that called the secrets daemon."""
+        return self._secrets.misses + self._properties.misses
+
+    async def get_secret(self, item_path: str) -> Tuple[SecretValue, str]:
+        """Get decoded secret of the item.
+
+        Every call returns a new copy of the cached value that
+        the caller can close. Cached value is wiped once evicted.
+
+        :param str item_path: Object path to item.
+        :returns: Tuple of secret value and content type.
+        :rtype: Tuple[SecretValue,str]
+        """
+        await self._ensure_watch()
+
+        cached_secret = self._secrets.get(item_path)
+        if cached_secret is None:
+            generation = self._secrets.generation
+            cipher = await self._session_manager.get_cipher(
+                self._algorithm)
+            secret = await SecretItem(item_path, self._bus).get_secret(
+                cipher.session_path)
+
+            cached_secret = (cipher.decode(secret), secret[3])
+            self._secrets.put(item_path, cached_secret, generation)
+
+        value, content_type = cached_secret
+        return SecretValue(value, value.content_type), content_type
+
+    async def get_properties(self, item_path: str) -> ItemProperties:
+        """Get properties of the item.
+
+        :param str item_path: Object path to item.
+        :returns: Item properties.
+        :rtype: ItemProperties
+        """
+        await self._ensure_watch()
+
+        cached_properties = self._properties.get(item_path)
+        if cached_properties is not None:
+            return cached_properties
+
+        generation = self._properties.generation
+        properties = await snapshot_item(item_path, self._bus)
+
+        self._properties.put(item_path, properties, generation)
+        return properties
+
+    def invalidate(self, item_path: Optional[str] = None) -> None:
+        """Remove cached entries.
+
+        :param str item_path: Only remove entries of this item.
+            By default all entries are removed.
+        """
+        if item_path is None:
+            self._secrets.clear()
+            self._properties.clear()
+        else:
+            self._secrets.discard(item_path)
+            self._properties.discard(item_path)
+
+    def invalidate_collection(self, collection_path: str) -> None:
+        """Remove cached entries of all items in the collection.
+
+        :param str collection_path: Object path to collection.
+        """
+        items_prefix = collection_path + '/'
+        for cache in (self._secrets, self._properties):
+            for item_path in cache.keys():
+                if item_path.startswith(items_prefix):
+                    cache.discard(item_path)
+
+    async def close(self) -> None:
+        """Stop watching signals and remove all entries."""
+        watch_tasks = self._watch_tasks
+        self._watch_tasks = []
+        if self._watch_started is not None:
+            watch_tasks.append(self._watch_started)
+            self._watch_started = None
+
+        for watch_task in watch_tasks:
+            watch_task.cancel()
+
+        await gather(*watch_tasks, return_exceptions=True)
+        self.invalidate()
+
+    async def __aenter__(self) -> SecretsCache:
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def _ensure_watch(self) -> None:
+        watch_started = self._watch_started
+        if watch_started is None:
+            watch_started = get_running_loop().create_task(
+                self._start_watch())
+            self._watch_started = watch_started
+
+        if watch_started.done():
+            watch_started.result()
+        else:
+            await shield(watch_started)
+
+    async def _start_watch(self) -> None:
+        loop = get_running_loop()
+        self._watch_tasks = [
+            loop.create_task(self._watch_items(
+                SecretCollectionInterface.item_changed)),
+            loop.create_task(self._watch_items(
+                SecretCollectionInterface.item_deleted)),
+            loop.create_task(self._watch_collections()),
+        ]
+        # Let the tasks send their match rules. Messages of
+        # a connection are processed in order so once a reply to
+        # the following call arrives the match rules are active.
+        await sleep(0)
+        await FreedesktopDbus(self._bus).get_id()
+
+    async def _watch_items(self, signal: DbusSignalAsync[str]) -> None:
+        async for _, item_path in signal.catch_anywhere(
+                SECRET_SERVICE_BUS_NAME, self._bus):
+            self.invalidate(item_path)
+
+    async def _watch_collections(self) -> None:
+        async for _, collection_path in (
+            SecretServiceInterface.collection_deleted.catch_anywhere(
+                SECRET_SERVICE_BUS_NAME, self._bus)
+        ):
+            self.invalidate_collection(collection_path)
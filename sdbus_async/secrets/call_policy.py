@@ -0,0 +1,213 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from random import uniform
+from threading import Lock
+from time import monotonic
+from typing import FrozenSet, Optional, Tuple, Type
+
+from sdbus import (
+    DbusDisconnectedError,
+    DbusNameHasNoOwnerError,
+    DbusNoReplyError,
+    DbusServiceUnknownError,
+    DbusTimeoutError,
+)
+
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.05
+DEFAULT_MAX_BACKOFF = 1.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 10.0
+
+# Methods that can be repeated without side effects.
+# Properties reads are always idempotent.
+IDEMPOTENT_METHODS: FrozenSet[str] = frozenset((
+    'org.freedesktop.Secret.Service.SearchItems',
+    'org.freedesktop.Secret.Service.GetSecrets',
+    'org.freedesktop.Secret.Service.ReadAlias',
+    'org.freedesktop.Secret.Collection.SearchItems',
+    'org.freedesktop.Secret.Item.GetSecret',
+    'org.freedesktop.DBus.Properties.Get',
+    'org.freedesktop.DBus.Properties.GetAll',
+))
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half-open'
+
+
+class DeadlineExceededError(TimeoutError):
+    """Call did not finish before its deadline."""
+
+
+class CircuitOpenError(Exception):
+    """Call was rejected because the secrets daemon is unavailable."""
+
+
+class CircuitBreaker:
+    """Fail fast while the secrets daemon is unavailable.
+
+    After ``failure_threshold`` consecutive failed calls the circuit
+    opens and calls are rejected with :py:exc:`CircuitOpenError`.
+    Once ``reset_timeout`` seconds pass a single probe call
+    is let through. Its success closes the circuit and its failure
+    opens it again.
+
+    Can be shared between proxies and threads.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+    ) -> None:
+        """
+        :param int failure_threshold: Number of consecutive failures
+            that open the circuit.
+        :param float reset_timeout: Seconds before a probe call
+            is allowed.
+        """
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = Lock()
+
+    @property
+    def state(self) -> str:
+        """``closed``, ``open`` or ``half-open``."""
+        return self._state
+
+    def before_call(self) -> None:
+        """Check if a call is allowed.
+
+        :raises CircuitOpenError: Circuit is open.
+        """
+        with self._lock:
+            if self._state == CIRCUIT_CLOSED:
+                return
+
+            if self._state == CIRCUIT_OPEN:
+                retry_in = self._opened_at + self._reset_timeout - monotonic()
+                if retry_in > 0:
+                    raise CircuitOpenError(
+                        f'Secrets daemon unavailable, '
+                        f'retry in {retry_in:.1f} seconds'
+                    )
+
+                self._state = CIRCUIT_HALF_OPEN
+
+            if self._probe_in_flight:
+                raise CircuitOpenError(
+                    'Secrets daemon unavailable, probe call in progress')
+
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        """Record that the daemon replied."""
+        with self._lock:
+            self._state = CIRCUIT_CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record that the daemon did not reply."""
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if (
+                self._state == CIRCUIT_HALF_OPEN
+                or self._failures >= self._failure_threshold
+            ):
+                self._state = CIRCUIT_OPEN
+                self._opened_at = monotonic()
+
+    def release(self) -> None:
+        """Record that the call was cancelled without a result."""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+class CallPolicy:
+    """Deadline, retries and circuit breaker applied to calls.
+
+    Only failures that mean the daemon did not reply, such as
+    no reply, timeout or the service name having no owner, are retried
+    and counted by the circuit breaker. Other errors are raised
+    immediately.
+    """
+
+    transient_errors: Tuple[Type[BaseException], ...] = (
+        DbusDisconnectedError,
+        DbusNameHasNoOwnerError,
+        DbusNoReplyError,
+        DbusServiceUnknownError,
+        DbusTimeoutError,
+    )
+    """Errors that mean the daemon is unavailable."""
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        idempotent_methods: FrozenSet[str] = IDEMPOTENT_METHODS,
+    ) -> None:
+        """
+        :param float timeout: Seconds before the call including
+            all retries fails with :py:exc:`DeadlineExceededError`.
+            No deadline by default.
+        :param int retries: Maximum number of retries
+            of idempotent calls.
+        :param float backoff: Base delay before the first retry.
+            Delay doubles with every retry and is randomized.
+        :param float max_backoff: Maximum delay between retries.
+        :param CircuitBreaker circuit_breaker: Circuit breaker
+            shared by calls. Disabled by default.
+        :param FrozenSet[str] idempotent_methods: Full D-Bus names
+            of methods that can be retried.
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.circuit_breaker = circuit_breaker
+        self.idempotent_methods = idempotent_methods
+
+    def deadline(self) -> Optional[float]:
+        """Monotonic time of the deadline of a new call."""
+        if self.timeout is None:
+            return None
+
+        return monotonic() + self.timeout
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Randomized delay before the retry.
+
+        :param int attempt: Number of failed attempts so far minus one.
+        :rtype: float
+        """
+        return uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
@@ -0,0 +1,197 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from asyncio import gather
+from os import getpid
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+from sdbus import sd_bus_open
+from sdbus.sd_bus_internals import SdBus
+
+from .cache import DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL, SecretsCache
+from .encryption import PLAIN_ALGORITHM, PlainSessionCipher
+from .objects import SecretService
+from .sessions import SecretSessionManager
+from .values import SecretValue
+
+
+class _ClientState:
+    # Everything that belongs to a connection of a single process.
+    __slots__ = ('pid', 'bus', 'service', 'sessions', 'cache')
+
+    def __init__(
+        self,
+        bus: SdBus,
+        algorithm: str,
+        cache_size: int,
+        cache_ttl: float,
+    ) -> None:
+        self.pid = getpid()
+        self.bus = bus
+        self.service = SecretService(bus)
+        self.sessions = SecretSessionManager(bus)
+        self.cache = SecretsCache(
+            self.sessions, algorithm, bus, cache_size, cache_ttl)
+
+
+class SecretsClient:
+    """Process aware connection, sessions and cache.
+
+    Connection is opened on first use. If the process was forked
+    since then the inherited connection, sessions, cached secrets
+    and signal watches are discarded without touching them and
+    the child process opens its own connection on first use.
+
+    Objects returned by the client should not be kept across
+    forks. Get them from the client again instead.
+
+    Can be used as an async context manager which closes the
+    sessions on exit.
+    """
+
+    def __init__(
+        self,
+        bus_factory: Callable[[], SdBus] = sd_bus_open,
+        algorithm: str = PLAIN_ALGORITHM,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        cache_ttl: float = DEFAULT_CACHE_TTL,
+    ) -> None:
+        """
+        :param Callable[[],SdBus] bus_factory: Function that opens
+            a new connection.
+            By default connects to the same bus as default bus.
+        :param str algorithm: Session algorithm used to get secrets.
+        :param int cache_size: Maximum number of cached secrets.
+        :param float cache_ttl: Seconds before a cached secret expires.
+        """
+        self.algorithm = algorithm
+        self._bus_factory = bus_factory
+        self._cache_size = cache_size
+        self._cache_ttl = cache_ttl
+        self._state: Optional[_ClientState] = None
+
+    @property
+    def bus(self) -> SdBus:
+        """Connection of the current process."""
+        return self._get_state().bus
+
+    @property
+    def service(self) -> SecretService:
+        """Secret service object using the connection."""
+        return self._get_state().service
+
+    @property
+    def sessions(self) -> SecretSessionManager:
+        """Session manager of the current process."""
+        return self._get_state().sessions
+
+    @property
+    def cache(self) -> SecretsCache:
+        """Secrets cache of the current process."""
+        return self._get_state().cache
+
+    async def get_session(self) -> str:
+        """Get object path of the session of the current process.
+
+        :returns: Object path of the session.
+        :rtype: str
+        """
+        return await self.sessions.get_session(self.algorithm)
+
+    async def get_cipher(self) -> PlainSessionCipher:
+        """Get cipher of the session of the current process.
+
+        :returns: Cipher with negotiated session.
+        :rtype: PlainSessionCipher
+        """
+        return await self.sessions.get_cipher(self.algorithm)
+
+    async def get_secret(self, item_path: str) -> Tuple[SecretValue, str]:
+        """Get decoded secret of the item through the cache.
+
+        Returned value is a copy owned by the caller and can be
+        closed without affecting the cache.
+
+        :param str item_path: Object path to item.
+        :returns: Tuple of secret value and content type.
+        :rtype: Tuple[SecretValue,str]
+        """
+        return await self.cache.get_secret(item_path)
+
+    async def warm_up(self, item_paths: Iterable[str] = ()) -> None:
+        """Open the connection and the session and prefetch secrets.
+
+        Session is opened and secrets are fetched concurrently.
+        Call from the worker startup hook after fork so the first
+        request does not wait for the connection.
+
+        :param Iterable[str] item_paths: Items which secrets should
+            be cached.
+        """
+        state = self._get_state()
+
+        await gather(
+            state.sessions.get_cipher(self.algorithm),
+            *(state.cache.get_secret(item_path) for item_path in item_paths),
+        )
+
+    def reset(self) -> None:
+        """Discard the connection, sessions and cache without closing.
+
+        Next call opens a new connection.
+        """
+        self._state = None
+
+    async def close(self) -> None:
+        """Close sessions of the current process and remove cache."""
+        state = self._get_existing_state()
+        self._state = None
+
+        if state is not None:
+            await state.cache.close()
+            await state.sessions.close()
+
+    async def __aenter__(self) -> SecretsClient:
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    def _get_existing_state(self) -> Optional[_ClientState]:
+        state = self._state
+        if state is not None and state.pid != getpid():
+            # Inherited from the parent process
+            self._state = state = None
+
+        return state
+
+    def _get_state(self) -> _ClientState:
+        state = self._get_existing_state()
+        if state is None:
+            state = _ClientState(
+                self._bus_factory(),
+                self.algorithm,
+                self._cache_size,
+                self._cache_ttl,
+            )
+            self._state = state
+
+        return state
@@ -0,0 +1,162 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from asyncio import Future, Task, gather, get_running_loop, shield, sleep
+from typing import Any, Dict, List, Optional, Set
+
+from sdbus.sd_bus_internals import SdBus
+
+from .objects import SecretService
+from .prompts import await_prompt
+
+DEFAULT_WINDOW = 0.005
+
+
+class _Batch:
+    def __init__(self, future: Future[Set[str]]) -> None:
+        self.future = future
+        self.objects: Dict[str, None] = {}
+
+
+class SecretLockCoalescer:
+    """Combine concurrent unlock and lock requests.
+
+    Requests made within ``window`` seconds of the first one are sent
+    as a single :py:meth:`SecretServiceInterface.unlock` or
+    :py:meth:`SecretServiceInterface.lock` call. If the daemon
+    returns a prompt it is shown once for the whole batch and every
+    caller receives the part of the result it requested.
+
+    Can be used as an async context manager which cancels pending
+    requests on exit.
+    """
+
+    def __init__(
+        self,
+        bus: Optional[SdBus] = None,
+        window: float = DEFAULT_WINDOW,
+        window_id: str = '',
+        prompt_timeout: Optional[float] = None,
+    ) -> None:
+        """
+        :param SdBus bus: Use specific bus or session bus by default.
+        :param float window: Seconds to wait for more requests
+            before making the call.
+        :param str window_id: Platform specific window handle to use
+            for showing prompts.
+        :param float prompt_timeout: Seconds to wait for a prompt
+            to complete. By default waits forever.
+        """
+        self._bus = bus
+        self._window = window
+        self._window_id = window_id
+        self._prompt_timeout = prompt_timeout
+        self._batches: Dict[str, _Batch] = {}
+        self._batches_tasks: Set[Task[None]] = set()
+
+    async def unlock(self, objects: List[str]) -> List[str]:
+        """Unlock the objects together with other pending requests.
+
+        :param List[str] objects: Object paths to collections or items.
+        :returns: Requested objects that were unlocked.
+            Does not include objects which prompt was dismissed.
+        :rtype: List[str]
+        """
+        return await self._request('unlock', objects)
+
+    async def lock(self, objects: List[str]) -> List[str]:
+        """Lock the objects together with other pending requests.
+
+        :param List[str] objects: Object paths to collections or items.
+        :returns: Requested objects that were locked.
+        :rtype: List[str]
+        """
+        return await self._request('lock', objects)
+
+    async def close(self) -> None:
+        """Cancel pending requests."""
+        batches_tasks = list(self._batches_tasks)
+        for batch_task in batches_tasks:
+            batch_task.cancel()
+
+        await gather(*batches_tasks, return_exceptions=True)
+
+    async def __aenter__(self) -> SecretLockCoalescer:
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def _request(
+        self,
+        method_name: str,
+        objects: List[str],
+    ) -> List[str]:
+        batch = self._batches.get(method_name)
+        if batch is None:
+            loop = get_running_loop()
+            batch = _Batch(loop.create_future())
+            self._batches[method_name] = batch
+
+            batch_task = loop.create_task(self._call(method_name, batch))
+            self._batches_tasks.add(batch_task)
+            batch_task.add_done_callback(self._batches_tasks.discard)
+
+        batch.objects.update(dict.fromkeys(objects))
+
+        # Cancelling one caller should not cancel the whole batch
+        done_objects = await shield(batch.future)
+        return [
+            object_path for object_path in objects
+            if object_path in done_objects
+        ]
+
+    async def _call(self, method_name: str, batch: _Batch) -> None:
+        try:
+            await sleep(self._window)
+            # New requests start a new batch from now on
+            self._close_batch(method_name, batch)
+
+            done_objects, prompt_path = await getattr(
+                SecretService(self._bus), method_name)(list(batch.objects))
+
+            done_objects_set = set(done_objects)
+            dismissed, prompt_result = await await_prompt(
+                prompt_path,
+                self._window_id,
+                self._prompt_timeout,
+                self._bus,
+            )
+            if not dismissed and prompt_result is not None:
+                done_objects_set.update(prompt_result)
+        except Exception as error:
+            batch.future.set_exception(error)
+        except BaseException:
+            batch.future.cancel()
+            raise
+        else:
+            batch.future.set_result(done_objects_set)
+        finally:
+            self._close_batch(method_name, batch)
+
+    def _close_batch(self, method_name: str, batch: _Batch) -> None:
+        if self._batches.get(method_name) is batch:
+            del self._batches[method_name]
@@ -0,0 +1,82 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from argparse import ArgumentParser
+from asyncio import Event, get_running_loop, run
+from signal import SIGINT, SIGTERM
+from typing import Optional
+
+from sdbus import request_default_bus_name_async
+
+from ..objects import SECRET_SERVICE_BUS_NAME
+from .log_storage import LogStorage
+from .service import SecretsDaemon
+from .sqlite_storage import SqliteStorage
+from .storage import SecretsStorage
+
+
+async def serve(storage: Optional[SecretsStorage], replace: bool) -> None:
+    secrets_daemon = SecretsDaemon(storage)
+    secrets_daemon.export()
+    try:
+        await request_default_bus_name_async(
+            SECRET_SERVICE_BUS_NAME,
+            replace_existing=replace,
+        )
+
+        stop_event = Event()
+        loop = get_running_loop()
+        for stop_signal in (SIGINT, SIGTERM):
+            loop.add_signal_handler(stop_signal, stop_event.set)
+
+        await stop_event.wait()
+    finally:
+        secrets_daemon.close()
+
+
+def main() -> None:
+    parser = ArgumentParser(
+        prog='python -m sdbus_async.secrets.daemon',
+        description='In-memory secrets daemon.',
+    )
+    storage_group = parser.add_mutually_exclusive_group()
+    storage_group.add_argument(
+        '--log-file',
+        help='Persist secrets to append-only log file.')
+    storage_group.add_argument(
+        '--sqlite-file',
+        help='Persist secrets to SQLite database.')
+    parser.add_argument(
+        '--replace', action='store_true',
+        help='Replace currently running secrets daemon.')
+    args = parser.parse_args()
+
+    storage: Optional[SecretsStorage] = None
+    if args.log_file is not None:
+        storage = LogStorage(args.log_file)
+    elif args.sqlite_file is not None:
+        storage = SqliteStorage(args.sqlite_file)
+
+    run(serve(storage, args.replace))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,555 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from mmap import ACCESS_READ, mmap
+from os import (
+    O_APPEND,
+    O_CREAT,
+    O_RDONLY,
+    O_RDWR,
+    O_TRUNC,
+    close,
+    fstat,
+    fsync,
+    ftruncate,
+)
+from os import open as open_fd
+from os import pread, replace, write
+from os.path import dirname
+from struct import Struct
+from threading import Lock, Thread
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+from zlib import crc32
+
+from .storage import (
+    SecretsStorage,
+    StorageFailedError,
+    StoredCollection,
+    StoredItem,
+)
+
+LOG_MAGIC = b'SDBUS-SECRETS-LOG-1\n'
+
+DEFAULT_COMPACTION_MIN_BYTES = 1024 * 1024
+
+_RECORD_HEADER = Struct('<II')
+_UINT32 = Struct('<I')
+_INT64 = Struct('<q')
+
+_PUT_COLLECTION = 1
+_DELETE_COLLECTION = 2
+_PUT_ITEM = 3
+_DELETE_ITEM = 4
+_SET_ALIAS = 5
+
+# Offset and total size of a record
+RecordLocation = Tuple[int, int]
+
+
+class _RecordEncoder:
+    def __init__(self, record_type: int) -> None:
+        self.payload = bytearray((record_type, ))
+
+    def add_bytes(self, value: bytes) -> None:
+        self.payload += _UINT32.pack(len(value))
+        self.payload += value
+
+    def add_str(self, value: str) -> None:
+        self.add_bytes(value.encode())
+
+    def add_int(self, value: int) -> None:
+        self.payload += _INT64.pack(value)
+
+    def to_record(self) -> bytes:
+        return (
+            _RECORD_HEADER.pack(len(self.payload), crc32(self.payload))
+            + self.payload
+        )
+
+
+class _RecordDecoder:
+    def __init__(self, payload: bytes) -> None:
+        self.payload = payload
+        self.record_type: int = payload[0]
+        self.position = 1
+
+    def get_bytes(self) -> bytes:
+        length, = _UINT32.unpack_from(self.payload, self.position)
+        start = self.position + _UINT32.size
+        self.position = start + length
+        return bytes(self.payload[start:self.position])
+
+    def get_str(self) -> str:
+        return self.get_bytes().decode()
+
+    def get_int(self) -> int:
+        value: int = _INT64.unpack_from(self.payload, self.position)[0]
+        self.position += _INT64.size
+        return value
+
+
+class _LogIndex:
+    """Locations of the latest records of every live object."""
+
+    def __init__(self) -> None:
+        self.collections: Dict[str, RecordLocation] = {}
+        self.items: Dict[str, RecordLocation] = {}
+        self.aliases: Dict[str, RecordLocation] = {}
+        self.collection_items: Dict[str, Set[str]] = {}
+        self.items_collection: Dict[str, str] = {}
+
+    def live_locations(self) -> List[RecordLocation]:
+        return sorted((
+            *self.collections.values(),
+            *self.items.values(),
+            *self.aliases.values(),
+        ))
+
+    def live_bytes(self) -> int:
+        return sum(size for _, size in self.live_locations())
+
+    def apply(self, payload: bytes, location: RecordLocation) -> None:
+        decoder = _RecordDecoder(payload)
+        record_type = decoder.record_type
+        path = decoder.get_str()
+
+        if record_type == _PUT_COLLECTION:
+            self.collections[path] = location
+            self.collection_items.setdefault(path, set())
+        elif record_type == _DELETE_COLLECTION:
+            self.collections.pop(path, None)
+            for item_path in self.collection_items.pop(path, ()):
+                self.items.pop(item_path, None)
+                self.items_collection.pop(item_path, None)
+        elif record_type == _PUT_ITEM:
+            collection_path = decoder.get_str()
+            self.items[path] = location
+            self.items_collection[path] = collection_path
+            self.collection_items.setdefault(
+                collection_path, set()).add(path)
+        elif record_type == _DELETE_ITEM:
+            self.items.pop(path, None)
+            collection_path = self.items_collection.pop(path, '')
+            self.collection_items.get(collection_path, set()).discard(path)
+        elif record_type == _SET_ALIAS:
+            if decoder.get_str():
+                self.aliases[path] = location
+            else:
+                self.aliases.pop(path, None)
+        else:
+            raise ValueError(f'Unknown record type {record_type}')
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    # Write may be short, for example when the disk is almost full
+    view = memoryview(data)
+    while view:
+        view = view[write(fd, view):]
+
+
+def _fsync_directory(path: str) -> None:
+    directory_fd = open_fd(dirname(path) or '.', O_RDONLY)
+    try:
+        fsync(directory_fd)
+    finally:
+        close(directory_fd)
+
+
+def _iter_records(
+    data: Union[bytes, mmap],
+    start: int,
+) -> Iterator[Tuple[bytes, RecordLocation]]:
+    position = start
+    while position + _RECORD_HEADER.size <= len(data):
+        length, checksum = _RECORD_HEADER.unpack_from(data, position)
+        payload_start = position + _RECORD_HEADER.size
+        payload = data[payload_start:payload_start + length]
+        if len(payload) != length or crc32(payload) != checksum:
+            # Torn or corrupted record
+            return
+
+        record_size = _RECORD_HEADER.size + length
+        yield payload, (position, record_size)
+        position += record_size
+
+
+class LogStorage(SecretsStorage):
+    """Append-only log storage.
+
+    Every change is appended to the log file as a checksummed record
+    so the cost of a write does not depend on the number of items.
+    Log is memory-mapped for reads and an in-memory index keeps the
+    location of the latest record of every object.
+
+    Records made obsolete by later changes are removed by compaction
+    which rewrites live records to a new file in a background thread.
+    Compaction starts once obsolete records take more space than
+    live ones and at least ``compaction_min_bytes``.
+
+    Incomplete or corrupted records at the end of the log, for example
+    after a crash during a write, are truncated when the log is opened.
+    A failed write is truncated immediately. If that fails too
+    every later write raises :py:exc:`StorageFailedError`.
+
+    Secrets are stored unencrypted. The file is created readable
+    only by the owner.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sync_writes: bool = False,
+        compaction_min_bytes: int = DEFAULT_COMPACTION_MIN_BYTES,
+    ) -> None:
+        """
+        :param str path: Path to log file. Created if it does not exist.
+        :param bool sync_writes: Call ``fsync`` after every write.
+            By default the log is synced once per batch on
+            :py:meth:`commit` as well as on :py:meth:`flush`,
+            compaction and close.
+        :param int compaction_min_bytes: Minimal size of obsolete
+            records before compaction is started.
+        """
+        self._path = path
+        self._sync_writes = sync_writes
+        self._compaction_min_bytes = compaction_min_bytes
+        self._lock = Lock()
+        self._compaction_thread: Optional[Thread] = None
+        self._failed = False
+
+        self._fd = open_fd(
+            path, O_RDWR | O_CREAT | O_APPEND, 0o600)
+        try:
+            self._index, self._size = self._load_index(self._fd)
+        except BaseException:
+            close(self._fd)
+            raise
+
+        self._map = mmap(self._fd, self._size, access=ACCESS_READ)
+        self._dead_bytes = (
+            self._size - len(LOG_MAGIC) - self._index.live_bytes())
+
+    @property
+    def size(self) -> int:
+        """Size of the log file in bytes."""
+        return self._size
+
+    @property
+    def dead_bytes(self) -> int:
+        """Size of records made obsolete by later changes."""
+        return self._dead_bytes
+
+    def load_collections(self) -> List[StoredCollection]:
+        with self._lock:
+            return [
+                self._decode_collection(location)
+                for location in self._index.collections.values()
+            ]
+
+    def load_items(self) -> Iterator[StoredItem]:
+        with self._lock:
+            items_locations = list(self._index.items.values())
+
+        for location in items_locations:
+            with self._lock:
+                stored_item = self._decode_item(location)
+
+            yield stored_item
+
+    def load_aliases(self) -> Dict[str, str]:
+        aliases: Dict[str, str] = {}
+        with self._lock:
+            for location in self._index.aliases.values():
+                decoder = _RecordDecoder(self._read(location))
+                name = decoder.get_str()
+                aliases[name] = decoder.get_str()
+
+        return aliases
+
+    def read_item(self, item_path: str) -> Optional[StoredItem]:
+        """Read the latest version of the item.
+
+        :param str item_path: Object path to item.
+        :returns: Stored item or None if item does not exist.
+        :rtype: Optional[StoredItem]
+        """
+        with self._lock:
+            location = self._index.items.get(item_path)
+            if location is None:
+                return None
+
+            return self._decode_item(location)
+
+    def put_collection(self, collection: StoredCollection) -> None:
+        encoder = _RecordEncoder(_PUT_COLLECTION)
+        encoder.add_str(collection.path)
+        encoder.add_str(collection.label)
+        encoder.add_int(collection.created)
+        encoder.add_int(collection.modified)
+        self._append(encoder)
+
+    def delete_collection(self, collection_path: str) -> None:
+        encoder = _RecordEncoder(_DELETE_COLLECTION)
+        encoder.add_str(collection_path)
+        self._append(encoder)
+
+    def put_item(self, item: StoredItem) -> None:
+        encoder = _RecordEncoder(_PUT_ITEM)
+        encoder.add_str(item.path)
+        encoder.add_str(item.collection_path)
+        encoder.add_str(item.label)
+        encoder.add_int(len(item.attributes))
+        for attribute_name, attribute_value in item.attributes.items():
+            encoder.add_str(attribute_name)
+            encoder.add_str(attribute_value)
+        encoder.add_bytes(item.secret)
+        encoder.add_str(item.content_type)
+        encoder.add_int(item.created)
+        encoder.add_int(item.modified)
+        self._append(encoder)
+
+    def delete_item(self, item_path: str) -> None:
+        encoder = _RecordEncoder(_DELETE_ITEM)
+        encoder.add_str(item_path)
+        self._append(encoder)
+
+    def set_alias(self, name: str, collection_path: Optional[str]) -> None:
+        encoder = _RecordEncoder(_SET_ALIAS)
+        encoder.add_str(name)
+        encoder.add_str(collection_path or '')
+        self._append(encoder)
+
+    def commit(self) -> None:
+        if not self._sync_writes:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the log to disk."""
+        with self._lock:
+            fsync(self._fd)
+
+    def compact(self) -> None:
+        """Rewrite live records to a new log file.
+
+        Called automatically from a background thread. Changes are
+        accepted while live records are copied.
+        """
+        with self._lock:
+            live_locations = self._index.live_locations()
+            copied_size = self._size
+            old_fd = self._fd
+
+        compacted_path = self._path + '.compact'
+        new_fd = open_fd(
+            compacted_path,
+            O_RDWR | O_CREAT | O_TRUNC | O_APPEND,
+            0o600,
+        )
+        try:
+            _write_all(new_fd, LOG_MAGIC)
+            new_index = _LogIndex()
+            new_size = self._copy_records(
+                old_fd, new_fd, new_index, live_locations)
+
+            with self._lock:
+                # Copy records appended while live records were copied
+                tail = pread(
+                    old_fd, self._size - copied_size, copied_size)
+                for payload, (offset, record_size) in _iter_records(tail, 0):
+                    _write_all(new_fd, tail[offset:offset + record_size])
+                    new_index.apply(payload, (new_size, record_size))
+                    new_size += record_size
+
+                fsync(new_fd)
+                replace(compacted_path, self._path)
+
+                self._map.close()
+                close(old_fd)
+                self._fd = new_fd
+                self._index = new_index
+                self._size = new_size
+                self._map = mmap(new_fd, new_size, access=ACCESS_READ)
+                self._dead_bytes = (
+                    new_size - len(LOG_MAGIC) - new_index.live_bytes())
+
+                # Make the rename durable
+                _fsync_directory(self._path)
+        except BaseException:
+            if self._fd != new_fd:
+                close(new_fd)
+            raise
+
+    def close(self) -> None:
+        compaction_thread = self._compaction_thread
+        if compaction_thread is not None:
+            compaction_thread.join()
+
+        with self._lock:
+            fsync(self._fd)
+            self._map.close()
+            close(self._fd)
+
+    @staticmethod
+    def _load_index(fd: int) -> Tuple[_LogIndex, int]:
+        file_size = fstat(fd).st_size
+        if file_size == 0:
+            _write_all(fd, LOG_MAGIC)
+            return _LogIndex(), len(LOG_MAGIC)
+
+        with mmap(fd, file_size, access=ACCESS_READ) as file_map:
+            if file_map[:len(LOG_MAGIC)] != LOG_MAGIC:
+                raise ValueError('File is not a secrets log')
+
+            log_index = _LogIndex()
+            log_size = len(LOG_MAGIC)
+            for payload, location in _iter_records(file_map, log_size):
+                log_index.apply(payload, location)
+                log_size = location[0] + location[1]
+
+        if log_size != file_size:
+            ftruncate(fd, log_size)
+            fsync(fd)
+
+        return log_index, log_size
+
+    @staticmethod
+    def _copy_records(
+        old_fd: int,
+        new_fd: int,
+        new_index: _LogIndex,
+        locations: List[RecordLocation],
+    ) -> int:
+        new_size = len(LOG_MAGIC)
+        for offset, record_size in locations:
+            record = pread(old_fd, record_size, offset)
+            _write_all(new_fd, record)
+            new_index.apply(
+                record[_RECORD_HEADER.size:], (new_size, record_size))
+            new_size += record_size
+
+        return new_size
+
+    def _append(self, encoder: _RecordEncoder) -> None:
+        record = encoder.to_record()
+        payload = record[_RECORD_HEADER.size:]
+
+        with self._lock:
+            if self._failed:
+                raise StorageFailedError('Log ends with a partial record')
+
+            live_before = self._live_size_of(payload)
+            try:
+                _write_all(self._fd, record)
+            except BaseException:
+                # Remove partial record so later offsets stay valid
+                try:
+                    ftruncate(self._fd, self._size)
+                except OSError:
+                    self._failed = True
+                raise
+
+            if self._sync_writes:
+                fsync(self._fd)
+
+            self._index.apply(payload, (self._size, len(record)))
+            self._size += len(record)
+            self._dead_bytes += (
+                len(record) + live_before - self._live_size_of(payload))
+
+        self._maybe_start_compaction()
+
+    def _live_size_of(self, payload: bytes) -> int:
+        # Size of live records that the record replaces or deletes
+        decoder = _RecordDecoder(payload)
+        path = decoder.get_str()
+        record_type = decoder.record_type
+        index = self._index
+
+        if record_type == _PUT_COLLECTION:
+            return index.collections.get(path, (0, 0))[1]
+        elif record_type == _DELETE_COLLECTION:
+            return index.collections.get(path, (0, 0))[1] + sum(
+                index.items[item_path][1]
+                for item_path in index.collection_items.get(path, ())
+            )
+        elif record_type in (_PUT_ITEM, _DELETE_ITEM):
+            return index.items.get(path, (0, 0))[1]
+        else:
+            return index.aliases.get(path, (0, 0))[1]
+
+    def _maybe_start_compaction(self) -> None:
+        if (
+            self._dead_bytes < self._compaction_min_bytes
+            or self._dead_bytes < self._size - self._dead_bytes
+        ):
+            return
+
+        if (
+            self._compaction_thread is not None
+            and self._compaction_thread.is_alive()
+        ):
+            return
+
+        self._compaction_thread = Thread(
+            target=self.compact,
+            name='secrets-log-compaction',
+            daemon=True,
+        )
+        self._compaction_thread.start()
+
+    def _read(self, location: RecordLocation) -> bytes:
+        offset, record_size = location
+        if offset + record_size > len(self._map):
+            # Log grew since it was mapped
+            self._map.close()
+            self._map = mmap(self._fd, self._size, access=ACCESS_READ)
+
+        return self._map[offset + _RECORD_HEADER.size:offset + record_size]
+
+    def _decode_collection(self, location: RecordLocation) -> StoredCollection:
+        decoder = _RecordDecoder(self._read(location))
+        return StoredCollection(
+            decoder.get_str(),
+            decoder.get_str(),
+            decoder.get_int(),
+            decoder.get_int(),
+        )
+
+    def _decode_item(self, location: RecordLocation) -> StoredItem:
+        decoder = _RecordDecoder(self._read(location))
+        item_path = decoder.get_str()
+        collection_path = decoder.get_str()
+        label = decoder.get_str()
+        attributes = {}
+        for _ in range(decoder.get_int()):
+            attribute_name = decoder.get_str()
+            attributes[attribute_name] = decoder.get_str()
+
+        return StoredItem(
+            item_path,
+            collection_path,
+            label,
+            attributes,
+            decoder.get_bytes(),
+            decoder.get_str(),
+            decoder.get_int(),
+            decoder.get_int(),
+        )
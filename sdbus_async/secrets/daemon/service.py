@@ -0,0 +1,814 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from asyncio import Task, get_running_loop
+from itertools import count
+from re import sub
+from time import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+from sdbus import (
+    DbusNotSupportedError,
+    dbus_method_async_override,
+    dbus_property_async_override,
+    get_current_message,
+)
+from sdbus.sd_bus_internals import SdBus
+from sdbus_async.dbus_daemon import FreedesktopDbus
+
+from ..attribute_index import AttributeIndex
+from ..encryption import PlainSessionCipher, new_session_cipher
+from ..exceptions import (
+    SecretIsLockedError,
+    SecretNoSessionError,
+    SecretNoSuchObjectError,
+)
+from ..interfaces import (
+    SecretCollectionInterface,
+    SecretItemInterface,
+    SecretPromptInterface,
+    SecretServiceInterface,
+    SecretSessionInterface,
+)
+from .storage import (
+    MemoryStorage,
+    SecretsStorage,
+    StoredCollection,
+    StoredItem,
+)
+
+if TYPE_CHECKING:
+    from sdbus.dbus_proxy_async_interface_base import DbusExportHandle
+
+SECRETS_PATH = '/org/freedesktop/secrets'
+COLLECTIONS_PATH = SECRETS_PATH + '/collection'
+SESSIONS_PATH = SECRETS_PATH + '/session'
+PROMPTS_PATH = SECRETS_PATH + '/prompt'
+NO_OBJECT_PATH = '/'
+
+DEFAULT_ALIAS = 'default'
+DEFAULT_COLLECTION_LABEL = 'Login'
+
+ITEM_LABEL_PROPERTY = 'org.freedesktop.Secret.Item.Label'
+ITEM_ATTRIBUTES_PROPERTY = 'org.freedesktop.Secret.Item.Attributes'
+COLLECTION_LABEL_PROPERTY = 'org.freedesktop.Secret.Collection.Label'
+
+SecretTuple = Tuple[str, bytes, bytes, str]
+
+
+class DaemonSession(SecretSessionInterface):
+    """Session exported by the daemon."""
+
+    def __init__(
+        self,
+        daemon: SecretsDaemon,
+        cipher: PlainSessionCipher,
+        owner: Optional[str],
+    ) -> None:
+        super().__init__()
+        self._daemon = daemon
+        self.cipher = cipher
+        self.owner = owner
+
+    @dbus_method_async_override()
+    async def close(self) -> None:
+        self._daemon.close_session(self.cipher.session_path)
+
+
+class DaemonPrompt(SecretPromptInterface):
+    """Prompt exported by the daemon.
+
+    Daemon has no user interface so the prompt
+    is approved as soon as it is shown.
+    """
+
+    def __init__(
+        self,
+        daemon: SecretsDaemon,
+        prompt_path: str,
+        objects: List[str],
+    ) -> None:
+        super().__init__()
+        self._daemon = daemon
+        self._prompt_path = prompt_path
+        self._objects = objects
+
+    @dbus_method_async_override()
+    async def prompt(self, window_id: str) -> None:
+        unlocked_objects = self._daemon.unlock_objects(self._objects)
+        # Send completed signal after the reply to prompt call
+        get_running_loop().call_soon(
+            self._complete, False, unlocked_objects)
+
+    @dbus_method_async_override()
+    async def dismiss(self) -> None:
+        get_running_loop().call_soon(self._complete, True, [])
+
+    def _complete(self, dismissed: bool, objects: List[str]) -> None:
+        if self._daemon.remove_prompt(self._prompt_path):
+            self.completed.emit((dismissed, ('ao', objects)))
+
+
+class DaemonItem(SecretItemInterface):
+    """Item exported by the daemon.
+
+    Only holds the object path. Item data is kept by the daemon.
+    """
+
+    def __init__(self, daemon: SecretsDaemon, item_path: str) -> None:
+        super().__init__()
+        self._daemon = daemon
+        self._item_path = item_path
+
+    @property
+    def _stored(self) -> StoredItem:
+        return self._daemon.get_item(self._item_path)
+
+    @dbus_method_async_override()
+    async def delete(self) -> str:
+        self._daemon.check_unlocked(self._stored.collection_path)
+        self._daemon.delete_item(self._item_path)
+        return NO_OBJECT_PATH
+
+    @dbus_method_async_override()
+    async def get_secret(self, session: str) -> SecretTuple:
+        stored = self._stored
+        self._daemon.check_unlocked(stored.collection_path)
+        return self._daemon.get_cipher(session).encode(
+            stored.secret, stored.content_type)
+
+    @dbus_method_async_override()
+    async def set_secret(self, secret: SecretTuple) -> None:
+        self._daemon.check_unlocked(self._stored.collection_path)
+        self._daemon.update_item(
+            self._item_path,
+            secret=bytes(self._daemon.get_cipher(secret[0]).decode(secret)),
+            content_type=secret[3],
+        )
+
+    @dbus_property_async_override()
+    def locked(self) -> bool:
+        return self._daemon.is_locked(self._stored.collection_path)
+
+    @dbus_property_async_override()
+    def attributes(self) -> Dict[str, str]:
+        return self._stored.attributes
+
+    @attributes.setter
+    def _attributes_setter(self, attributes: Dict[str, str]) -> None:
+        self._daemon.check_unlocked(self._stored.collection_path)
+        self._daemon.update_item(self._item_path, attributes=attributes)
+
+    @dbus_property_async_override()
+    def label(self) -> str:
+        return self._stored.label
+
+    @label.setter
+    def _label_setter(self, label: str) -> None:
+        self._daemon.check_unlocked(self._stored.collection_path)
+        self._daemon.update_item(self._item_path, label=label)
+
+    @dbus_property_async_override()
+    def created(self) -> int:
+        return self._stored.created
+
+    @dbus_property_async_override()
+    def modified(self) -> int:
+        return self._stored.modified
+
+
+class DaemonCollection(SecretCollectionInterface):
+    """Collection exported by the daemon."""
+
+    def __init__(
+        self,
+        daemon: SecretsDaemon,
+        stored: StoredCollection,
+    ) -> None:
+        super().__init__()
+        self._daemon = daemon
+        self.stored = stored
+        self.items_paths: Dict[str, None] = {}
+        self.next_item_id = 0
+
+    @dbus_method_async_override()
+    async def delete(self) -> str:
+        self._daemon.check_unlocked(self.stored.path)
+        self._daemon.delete_collection(self.stored.path)
+        return NO_OBJECT_PATH
+
+    @dbus_method_async_override()
+    async def search_items(self, attributes: Dict[str, str]) -> List[str]:
+        return self._daemon.search_collection_items(
+            self.stored.path, attributes)
+
+    @dbus_method_async_override()
+    async def create_item(
+        self,
+        properties: Dict[str, Tuple[str, Any]],
+        secret: SecretTuple,
+        replace: bool,
+    ) -> Tuple[str, str]:
+        return self._daemon.create_item(
+            self.stored.path, properties, secret, replace), NO_OBJECT_PATH
+
+    @dbus_property_async_override()
+    def items(self) -> List[str]:
+        return self._daemon.export_items(list(self.items_paths))
+
+    @dbus_property_async_override()
+    def label(self) -> str:
+        return self.stored.label
+
+    @label.setter
+    def _label_setter(self, label: str) -> None:
+        self._daemon.update_collection(self.stored.path, label)
+
+    @dbus_property_async_override()
+    def locked(self) -> bool:
+        return self._daemon.is_locked(self.stored.path)
+
+    @dbus_property_async_override()
+    def created(self) -> int:
+        return self.stored.created
+
+    @dbus_property_async_override()
+    def modified(self) -> int:
+        return self.stored.modified
+
+
+class SecretsDaemon(SecretServiceInterface):
+    """In-memory implementation of the secrets daemon.
+
+    Exports :py:class:`SecretServiceInterface` and the collections,
+    items, sessions and prompts objects using the same interface
+    classes as the client.
+
+    Items are kept as compact records and searched with an inverted
+    attributes index. Exporting an object on the bus is much more
+    expensive than keeping a record so items are only exported once
+    their object path is returned to a client.
+
+    Changes are written to the storage before the daemon state is
+    changed so a failed write is reported to the client and leaves
+    the daemon unchanged. Writes are committed once the current
+    batch of calls is processed. By default nothing is persisted.
+
+    Sessions are closed once the client that opened them
+    disconnects from the bus.
+
+    The daemon has no user interface. Unlocking is done with
+    a prompt that is approved as soon as it is shown.
+    """
+
+    def __init__(self, storage: Optional[SecretsStorage] = None) -> None:
+        """
+        :param SecretsStorage storage: Storage to load objects from
+            and write changes to. By default nothing is persisted.
+        """
+        super().__init__()
+        self._storage = storage if storage is not None else MemoryStorage()
+        self._bus: Optional[SdBus] = None
+        self._index = AttributeIndex()
+        self._items: Dict[str, StoredItem] = {}
+        self._exported_items: Dict[
+            str, Tuple[DaemonItem, DbusExportHandle]] = {}
+        self._collections: Dict[str, DaemonCollection] = {}
+        self._collections_handles: Dict[str, DbusExportHandle] = {}
+        self._locked_collections: Set[str] = set()
+        self._aliases: Dict[str, str] = {}
+        self._sessions: Dict[str, Tuple[DaemonSession, DbusExportHandle]] = {}
+        self._clients_sessions: Dict[str, Set[str]] = {}
+        self._clients_watch: Optional[Task[None]] = None
+        self._prompts: Dict[str, Tuple[DaemonPrompt, DbusExportHandle]] = {}
+        self._objects_ids = count()
+        self._commit_scheduled = False
+
+    def export(self, bus: Optional[SdBus] = None) -> None:
+        """Load the storage and export the service on the bus.
+
+        Creates the default collection if there are no collections.
+        Should be called from a running event loop.
+
+        :param SdBus bus: Use specific bus or default bus.
+        """
+        self._bus = bus
+        self.export_to_dbus(SECRETS_PATH, bus)
+        self._clients_watch = get_running_loop().create_task(
+            self._watch_clients())
+
+        for stored_collection in self._storage.load_collections():
+            self._add_collection(stored_collection)
+
+        for stored_item in self._storage.load_items():
+            self._add_item(stored_item)
+
+        self._aliases.update(self._storage.load_aliases())
+
+        if not self._collections:
+            default_collection = self._create_collection(
+                DEFAULT_COLLECTION_LABEL)
+            self._set_alias(DEFAULT_ALIAS, default_collection.path)
+
+    def close(self) -> None:
+        """Stop watching clients and close the storage."""
+        if self._clients_watch is not None:
+            self._clients_watch.cancel()
+            self._clients_watch = None
+
+        self._commit_scheduled = False
+        self._storage.close()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @dbus_method_async_override()
+    async def open_session(
+        self,
+        algorithm: str,
+        input: Tuple[str, Any],
+    ) -> Tuple[Tuple[str, Any], str]:
+        try:
+            cipher = new_session_cipher(algorithm)
+        except ValueError as exc:
+            raise DbusNotSupportedError(str(exc)) from None
+
+        try:
+            owner = get_current_message().sender
+        except LookupError:
+            # Called directly instead of over D-Bus
+            owner = None
+
+        session_path = f'{SESSIONS_PATH}/s{next(self._objects_ids)}'
+        cipher.negotiate(input, session_path)
+
+        session = DaemonSession(self, cipher, owner)
+        self._sessions[session_path] = (
+            session, session.export_to_dbus(session_path, self._bus))
+        if owner is not None:
+            self._clients_sessions.setdefault(owner, set()).add(session_path)
+
+        return cipher.input, session_path
+
+    @dbus_method_async_override()
+    async def create_collection(
+        self,
+        properties: Dict[str, Tuple[str, Any]],
+        alias: str,
+    ) -> Tuple[str, str]:
+        if alias:
+            existing_path = self._aliases.get(alias)
+            if existing_path in self._collections:
+                return existing_path, NO_OBJECT_PATH
+
+        stored_collection = self._create_collection(
+            properties.get(COLLECTION_LABEL_PROPERTY, ('s', ''))[1])
+        if alias:
+            self._set_alias(alias, stored_collection.path)
+
+        self.collection_created.emit(stored_collection.path)
+        return stored_collection.path, NO_OBJECT_PATH
+
+    @dbus_method_async_override()
+    async def search_items(
+        self,
+        attributes: Dict[str, str],
+    ) -> Tuple[List[str], List[str]]:
+        unlocked_items, locked_items = self._index.search_items(attributes)
+        return self.export_items(unlocked_items), self.export_items(
+            locked_items)
+
+    @dbus_method_async_override()
+    async def unlock(self, objects: List[str]) -> Tuple[List[str], str]:
+        unlocked_objects: List[str] = []
+        locked_objects: List[str] = []
+        for object_path in objects:
+            if self.is_locked(self._object_collection_path(object_path)):
+                locked_objects.append(object_path)
+            else:
+                unlocked_objects.append(object_path)
+
+        if not locked_objects:
+            return unlocked_objects, NO_OBJECT_PATH
+
+        prompt_path = f'{PROMPTS_PATH}/p{next(self._objects_ids)}'
+        prompt = DaemonPrompt(self, prompt_path, locked_objects)
+        self._prompts[prompt_path] = (
+            prompt, prompt.export_to_dbus(prompt_path, self._bus))
+        return unlocked_objects, prompt_path
+
+    @dbus_method_async_override()
+    async def lock(self, objects: List[str]) -> Tuple[List[str], str]:
+        for object_path in objects:
+            self._set_locked(self._object_collection_path(object_path), True)
+
+        return objects, NO_OBJECT_PATH
+
+    @dbus_method_async_override()
+    async def get_secrets(
+        self,
+        items: List[str],
+        session: str,
+    ) -> Dict[str, SecretTuple]:
+        cipher = self.get_cipher(session)
+        locked_collections = self._locked_collections
+
+        secrets: Dict[str, SecretTuple] = {}
+        for item_path in items:
+            stored_item = self._items.get(item_path)
+            if (
+                stored_item is not None
+                and stored_item.collection_path not in locked_collections
+            ):
+                secrets[item_path] = cipher.encode(
+                    stored_item.secret, stored_item.content_type)
+
+        return secrets
+
+    @dbus_method_async_override()
+    async def read_alias(self, name: str) -> str:
+        return self._aliases.get(name, NO_OBJECT_PATH)
+
+    @dbus_method_async_override()
+    async def set_alias(self, name: str, collection: str) -> None:
+        if collection == NO_OBJECT_PATH:
+            self._set_alias(name, None)
+        elif collection in self._collections:
+            self._set_alias(name, collection)
+        else:
+            raise SecretNoSuchObjectError(collection)
+
+    @dbus_property_async_override()
+    def collections(self) -> List[str]:
+        return list(self._collections)
+
+    def get_item(self, item_path: str) -> StoredItem:
+        """Get item record.
+
+        :param str item_path: Object path to item.
+        :returns: Stored item.
+        :rtype: StoredItem
+        :raises SecretNoSuchObjectError: Item does not exist.
+        """
+        try:
+            return self._items[item_path]
+        except KeyError:
+            raise SecretNoSuchObjectError(item_path) from None
+
+    def get_cipher(self, session_path: str) -> PlainSessionCipher:
+        """Get cipher of the session.
+
+        :param str session_path: Object path to session.
+        :returns: Session cipher.
+        :rtype: PlainSessionCipher
+        :raises SecretNoSessionError: Session does not exist.
+        """
+        try:
+            return self._sessions[session_path][0].cipher
+        except KeyError:
+            raise SecretNoSessionError(session_path) from None
+
+    def is_locked(self, collection_path: str) -> bool:
+        """Is the collection locked?
+
+        :param str collection_path: Object path to collection.
+        """
+        return collection_path in self._locked_collections
+
+    def check_unlocked(self, collection_path: str) -> None:
+        """Raise if the collection is locked.
+
+        :param str collection_path: Object path to collection.
+        :raises SecretIsLockedError: Collection is locked.
+        """
+        if collection_path in self._locked_collections:
+            raise SecretIsLockedError(collection_path)
+
+    def export_items(self, items_paths: List[str]) -> List[str]:
+        """Export items that are not yet on the bus.
+
+        :param List[str] items_paths: Object paths to items.
+        :returns: Same list of object paths.
+        :rtype: List[str]
+        """
+        exported_items = self._exported_items
+        for item_path in items_paths:
+            if item_path not in exported_items:
+                item = DaemonItem(self, item_path)
+                exported_items[item_path] = (
+                    item, item.export_to_dbus(item_path, self._bus))
+
+        return items_paths
+
+    def search_collection_items(
+        self,
+        collection_path: str,
+        attributes: Dict[str, str],
+    ) -> List[str]:
+        """Search for items in the collection and export them.
+
+        :param str collection_path: Object path to collection.
+        :param Dict[str,str] attributes: Attributes that should match.
+        :returns: List of matched items object paths.
+        :rtype: List[str]
+        """
+        return self.export_items(
+            self._index.search_collection_items(collection_path, attributes))
+
+    def create_item(
+        self,
+        collection_path: str,
+        properties: Dict[str, Tuple[str, Any]],
+        secret: SecretTuple,
+        replace: bool,
+    ) -> str:
+        """Create or replace an item in the collection.
+
+        :param str collection_path: Object path to collection.
+        :param Dict[str,Tuple[str,Any]] properties: Item properties.
+        :param Tuple[str,bytes,bytes,str] secret: Encoded secret.
+        :param bool replace: Replace item with the same attributes.
+        :returns: Object path to item.
+        :rtype: str
+        :raises SecretIsLockedError: Collection is locked.
+        :raises SecretNoSessionError: Session does not exist.
+        """
+        self.check_unlocked(collection_path)
+        secret_value = bytes(self.get_cipher(secret[0]).decode(secret))
+        label = properties.get(ITEM_LABEL_PROPERTY, ('s', ''))[1]
+        attributes = dict(
+            properties.get(ITEM_ATTRIBUTES_PROPERTY, ('a{ss}', {}))[1])
+
+        if replace:
+            for item_path in self._index.search_collection_items(
+                    collection_path, attributes):
+                if self._items[item_path].attributes == attributes:
+                    self.update_item(
+                        item_path,
+                        label=label,
+                        secret=secret_value,
+                        content_type=secret[3],
+                    )
+                    return self.export_items([item_path])[0]
+
+        collection = self._collections[collection_path]
+        now = int(time())
+        stored_item = StoredItem(
+            f'{collection_path}/{collection.next_item_id}',
+            collection_path,
+            label,
+            attributes,
+            secret_value,
+            secret[3],
+            now,
+            now,
+        )
+        self._storage.put_item(stored_item)
+        self._add_item(stored_item)
+        self._schedule_commit()
+
+        self.export_items([stored_item.path])
+        collection.item_created.emit(stored_item.path)
+        return stored_item.path
+
+    def update_item(self, item_path: str, **changes: Any) -> None:
+        """Change item fields and notify clients.
+
+        :param str item_path: Object path to item.
+        :param changes: New values of :py:class:`StoredItem` fields.
+        """
+        stored_item = self.get_item(item_path)._replace(
+            modified=int(time()), **changes)
+        self._storage.put_item(stored_item)
+        self._items[item_path] = stored_item
+
+        if 'attributes' in changes:
+            self._index.set_item(
+                item_path,
+                stored_item.collection_path,
+                stored_item.attributes,
+            )
+
+        self._schedule_commit()
+        self._collections[stored_item.collection_path].item_changed.emit(
+            item_path)
+
+    def delete_item(self, item_path: str) -> None:
+        """Delete the item and notify clients.
+
+        :param str item_path: Object path to item.
+        """
+        self._storage.delete_item(item_path)
+        stored_item = self._items.pop(item_path)
+        self._index.remove_item(item_path)
+
+        collection = self._collections[stored_item.collection_path]
+        del collection.items_paths[item_path]
+
+        self._unexport_item(item_path)
+        self._schedule_commit()
+        collection.item_deleted.emit(item_path)
+
+    def update_collection(self, collection_path: str, label: str) -> None:
+        """Change collection label and notify clients.
+
+        :param str collection_path: Object path to collection.
+        :param str label: New label.
+        """
+        collection = self._collections[collection_path]
+        stored_collection = collection.stored._replace(
+            label=label, modified=int(time()))
+
+        self._storage.put_collection(stored_collection)
+        collection.stored = stored_collection
+        self._schedule_commit()
+        self.collection_changed.emit(collection_path)
+
+    def delete_collection(self, collection_path: str) -> None:
+        """Delete the collection with all its items and notify clients.
+
+        :param str collection_path: Object path to collection.
+        """
+        self._storage.delete_collection(collection_path)
+        collection = self._collections.pop(collection_path)
+
+        for item_path in collection.items_paths:
+            del self._items[item_path]
+            self._unexport_item(item_path)
+
+        self._index.remove_collection(collection_path)
+        self._locked_collections.discard(collection_path)
+        self._collections_handles.pop(collection_path).stop()
+
+        for alias_name, alias_path in list(self._aliases.items()):
+            if alias_path == collection_path:
+                self._set_alias(alias_name, None)
+
+        self._schedule_commit()
+        self.collection_deleted.emit(collection_path)
+
+    def unlock_objects(self, objects: List[str]) -> List[str]:
+        """Unlock collections of the objects.
+
+        :param List[str] objects: Object paths to collections or items.
+        :returns: Object paths that were unlocked.
+        :rtype: List[str]
+        """
+        for object_path in objects:
+            self._set_locked(self._object_collection_path(object_path), False)
+
+        return objects
+
+    def close_session(self, session_path: str) -> None:
+        """Close the session.
+
+        :param str session_path: Object path to session.
+        """
+        session, export_handle = self._sessions.pop(session_path)
+        export_handle.stop()
+
+        if session.owner is not None:
+            owner_sessions = self._clients_sessions[session.owner]
+            owner_sessions.discard(session_path)
+            if not owner_sessions:
+                del self._clients_sessions[session.owner]
+
+    def remove_prompt(self, prompt_path: str) -> bool:
+        """Remove the prompt from the bus.
+
+        :param str prompt_path: Object path to prompt.
+        :returns: False if the prompt was already removed.
+        :rtype: bool
+        """
+        try:
+            _, export_handle = self._prompts.pop(prompt_path)
+        except KeyError:
+            return False
+
+        export_handle.stop()
+        return True
+
+    async def _watch_clients(self) -> None:
+        async for name, _, new_owner in (
+            FreedesktopDbus(self._bus).name_owner_changed.catch()
+        ):
+            if new_owner:
+                continue
+
+            # Unique name of a client is released on disconnect
+            for session_path in tuple(self._clients_sessions.get(name, ())):
+                self.close_session(session_path)
+
+    def _add_collection(self, stored_collection: StoredCollection) -> None:
+        collection = DaemonCollection(self, stored_collection)
+        self._collections[stored_collection.path] = collection
+        self._collections_handles[stored_collection.path] = (
+            collection.export_to_dbus(stored_collection.path, self._bus))
+        self._index.set_collection_locked(stored_collection.path, False)
+
+    def _create_collection(self, label: str) -> StoredCollection:
+        collection_name = sub('[^a-z0-9_]', '_', label.lower()) or 'collection'
+        collection_path = f'{COLLECTIONS_PATH}/{collection_name}'
+        while collection_path in self._collections:
+            collection_path = (
+                f'{COLLECTIONS_PATH}/{collection_name}'
+                f'{next(self._objects_ids)}'
+            )
+
+        now = int(time())
+        stored_collection = StoredCollection(collection_path, label, now, now)
+        self._storage.put_collection(stored_collection)
+        self._add_collection(stored_collection)
+        self._schedule_commit()
+        return stored_collection
+
+    def _add_item(self, stored_item: StoredItem) -> None:
+        collection = self._collections[stored_item.collection_path]
+        collection.items_paths[stored_item.path] = None
+
+        item_id = stored_item.path.rsplit('/', 1)[1]
+        if item_id.isdigit():
+            collection.next_item_id = max(
+                collection.next_item_id, int(item_id) + 1)
+
+        self._items[stored_item.path] = stored_item
+        self._index.set_item(
+            stored_item.path,
+            stored_item.collection_path,
+            stored_item.attributes,
+        )
+
+    def _unexport_item(self, item_path: str) -> None:
+        exported_item = self._exported_items.pop(item_path, None)
+        if exported_item is not None:
+            exported_item[1].stop()
+
+    def _schedule_commit(self) -> None:
+        # Changes made while processing one batch of calls
+        # are committed together
+        if self._commit_scheduled:
+            return
+
+        try:
+            loop = get_running_loop()
+        except RuntimeError:
+            self._storage.commit()
+            return
+
+        self._commit_scheduled = True
+        loop.call_soon(self._commit)
+
+    def _commit(self) -> None:
+        if self._commit_scheduled:
+            self._commit_scheduled = False
+            self._storage.commit()
+
+    def _set_alias(self, name: str, collection_path: Optional[str]) -> None:
+        self._storage.set_alias(name, collection_path)
+
+        if collection_path is None:
+            self._aliases.pop(name, None)
+        else:
+            self._aliases[name] = collection_path
+
+        self._schedule_commit()
+
+    def _set_locked(self, collection_path: str, locked: bool) -> None:
+        if collection_path not in self._collections:
+            raise SecretNoSuchObjectError(collection_path)
+
+        if locked == self.is_locked(collection_path):
+            return
+
+        if locked:
+            self._locked_collections.add(collection_path)
+        else:
+            self._locked_collections.discard(collection_path)
+
+        self._index.set_collection_locked(collection_path, locked)
+        self.collection_changed.emit(collection_path)
+
+    def _object_collection_path(self, object_path: str) -> str:
+        stored_item = self._items.get(object_path)
+        if stored_item is not None:
+            return stored_item.collection_path
+
+        return object_path
@@ -0,0 +1,266 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from contextlib import contextmanager
+from sqlite3 import Connection, connect
+from typing import Dict, Iterator, List, Optional
+
+from .storage import (
+    SecretsStorage,
+    StorageFailedError,
+    StoredCollection,
+    StoredItem,
+)
+
+DEFAULT_MAX_BATCH_SIZE = 1000
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS collections (
+    path TEXT PRIMARY KEY,
+    label TEXT NOT NULL,
+    created INTEGER NOT NULL,
+    modified INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    collection_path TEXT NOT NULL
+        REFERENCES collections (path) ON DELETE CASCADE,
+    label TEXT NOT NULL,
+    secret BLOB NOT NULL,
+    content_type TEXT NOT NULL,
+    created INTEGER NOT NULL,
+    modified INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_collection ON items (collection_path);
+CREATE TABLE IF NOT EXISTS attributes (
+    item_id INTEGER NOT NULL REFERENCES items (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (item_id, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS aliases (
+    name TEXT PRIMARY KEY,
+    collection_path TEXT NOT NULL
+        REFERENCES collections (path) ON DELETE CASCADE
+);
+'''
+
+_PUT_COLLECTION = '''
+INSERT INTO collections (path, label, created, modified)
+VALUES (?, ?, ?, ?)
+ON CONFLICT (path) DO UPDATE SET
+    label = excluded.label,
+    created = excluded.created,
+    modified = excluded.modified
+'''
+_DELETE_COLLECTION = 'DELETE FROM collections WHERE path = ?'
+_PUT_ITEM = '''
+INSERT INTO items (
+    path, collection_path, label, secret, content_type, created, modified
+)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (path) DO UPDATE SET
+    collection_path = excluded.collection_path,
+    label = excluded.label,
+    secret = excluded.secret,
+    content_type = excluded.content_type,
+    created = excluded.created,
+    modified = excluded.modified
+'''
+_SELECT_ITEM_ID = 'SELECT id FROM items WHERE path = ?'
+_DELETE_ITEM_ATTRIBUTES = 'DELETE FROM attributes WHERE item_id = ?'
+_INSERT_ATTRIBUTE = (
+    'INSERT INTO attributes (item_id, name, value) VALUES (?, ?, ?)')
+_DELETE_ITEM = 'DELETE FROM items WHERE path = ?'
+_SET_ALIAS = '''
+INSERT INTO aliases (name, collection_path) VALUES (?, ?)
+ON CONFLICT (name) DO UPDATE SET collection_path = excluded.collection_path
+'''
+_DELETE_ALIAS = 'DELETE FROM aliases WHERE name = ?'
+_SELECT_COLLECTIONS = (
+    'SELECT path, label, created, modified FROM collections')
+_SELECT_ITEMS = '''
+SELECT id, path, collection_path, label, secret, content_type,
+    created, modified
+FROM items ORDER BY id
+'''
+_SELECT_ATTRIBUTES = 'SELECT item_id, name, value FROM attributes'
+_SELECT_ALIASES = 'SELECT name, collection_path FROM aliases'
+
+
+class SqliteStorage(SecretsStorage):
+    """SQLite database storage.
+
+    Database is used in WAL mode so it can be read and backed up
+    with standard tools while the daemon is running.
+
+    Attributes are kept in a separate table. Daemon searches items
+    in memory so the database is only read when the daemon starts.
+
+    Changes are grouped in a transaction which is committed when
+    the daemon finishes processing a batch of calls or once
+    ``max_batch_size`` changes are pending. Statements are prepared
+    once and reused from the connection statement cache.
+
+    Every change is made in a savepoint. A change that fails, for
+    example because a backup tool holds a lock, is rolled back
+    without affecting other pending changes. Failed commit is
+    retried on the next commit.
+
+    Some errors roll back the whole transaction. Changes made
+    earlier in the transaction are lost while the daemon already
+    applied them in memory. After that every write raises
+    :py:exc:`StorageFailedError`.
+
+    Secrets are stored unencrypted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    ) -> None:
+        """
+        :param str path: Path to database file.
+            Created if it does not exist.
+        :param int max_batch_size: Maximum number of changes
+            in one transaction.
+        """
+        self._max_batch_size = max_batch_size
+        self._pending_changes = 0
+        self._failed = False
+
+        self._connection = connect(path, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode = WAL')
+        # Durable after a crash of the process, WAL is synced
+        # on checkpoints
+        self._connection.execute('PRAGMA synchronous = NORMAL')
+        self._connection.execute('PRAGMA foreign_keys = ON')
+        self._connection.executescript(_SCHEMA)
+
+    def load_collections(self) -> List[StoredCollection]:
+        return [
+            StoredCollection(*row)
+            for row in self._connection.execute(_SELECT_COLLECTIONS)
+        ]
+
+    def load_items(self) -> Iterator[StoredItem]:
+        items_attributes: Dict[int, Dict[str, str]] = {}
+        for item_id, name, value in self._connection.execute(
+                _SELECT_ATTRIBUTES):
+            items_attributes.setdefault(item_id, {})[name] = value
+
+        for item_id, *item_fields in self._connection.execute(_SELECT_ITEMS):
+            item_path, collection_path, label, *secret_fields = item_fields
+            yield StoredItem(
+                item_path,
+                collection_path,
+                label,
+                items_attributes.get(item_id, {}),
+                *secret_fields,
+            )
+
+    def load_aliases(self) -> Dict[str, str]:
+        return dict(self._connection.execute(_SELECT_ALIASES).fetchall())
+
+    def put_collection(self, collection: StoredCollection) -> None:
+        with self._change() as connection:
+            connection.execute(_PUT_COLLECTION, collection)
+
+    def delete_collection(self, collection_path: str) -> None:
+        with self._change() as connection:
+            connection.execute(_DELETE_COLLECTION, (collection_path, ))
+
+    def put_item(self, item: StoredItem) -> None:
+        with self._change() as connection:
+            connection.execute(_PUT_ITEM, (
+                item.path,
+                item.collection_path,
+                item.label,
+                item.secret,
+                item.content_type,
+                item.created,
+                item.modified,
+            ))
+            item_id, = connection.execute(
+                _SELECT_ITEM_ID, (item.path, )).fetchone()
+            connection.execute(_DELETE_ITEM_ATTRIBUTES, (item_id, ))
+            connection.executemany(_INSERT_ATTRIBUTE, (
+                (item_id, name, value)
+                for name, value in item.attributes.items()
+            ))
+
+    def delete_item(self, item_path: str) -> None:
+        with self._change() as connection:
+            connection.execute(_DELETE_ITEM, (item_path, ))
+
+    def set_alias(self, name: str, collection_path: Optional[str]) -> None:
+        with self._change() as connection:
+            if collection_path is None:
+                connection.execute(_DELETE_ALIAS, (name, ))
+            else:
+                connection.execute(_SET_ALIAS, (name, collection_path))
+
+    def commit(self) -> None:
+        if self._connection.in_transaction:
+            try:
+                self._connection.execute('COMMIT')
+            except BaseException:
+                if not self._connection.in_transaction:
+                    self._failed = True
+                raise
+
+        self._pending_changes = 0
+
+    def close(self) -> None:
+        self.commit()
+        self._connection.close()
+
+    @contextmanager
+    def _change(self) -> Iterator[Connection]:
+        if self._failed:
+            raise StorageFailedError(
+                'Earlier changes were rolled back')
+
+        connection = self._connection
+        if not connection.in_transaction:
+            connection.execute('BEGIN')
+            self._pending_changes = 0
+
+        connection.execute('SAVEPOINT change')
+        try:
+            yield connection
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK TO change')
+                connection.execute('RELEASE change')
+            else:
+                # Some errors roll back the whole transaction
+                # and earlier changes are lost
+                self._pending_changes = 0
+                self._failed = True
+            raise
+
+        connection.execute('RELEASE change')
+        self._pending_changes += 1
+        if self._pending_changes >= self._max_batch_size:
+            self.commit()
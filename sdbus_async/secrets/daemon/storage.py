@@ -0,0 +1,209 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+
+class StorageFailedError(Exception):
+    """Storage lost changes already applied by the daemon.
+
+    Storage refuses further writes because it no longer matches
+    the daemon state. Daemon should be restarted.
+    """
+
+
+class StoredCollection(NamedTuple):
+    """Collection as kept by the daemon storage."""
+
+    path: str
+    """Object path to collection."""
+    label: str
+    """Display name of this collection."""
+    created: int
+    """Unix time of creation."""
+    modified: int
+    """Unix time of last modified."""
+
+
+class StoredItem(NamedTuple):
+    """Item as kept by the daemon storage."""
+
+    path: str
+    """Object path to item."""
+    collection_path: str
+    """Object path to collection of the item."""
+    label: str
+    """Item display name."""
+    attributes: Dict[str, str]
+    """Item attributes."""
+    secret: bytes
+    """Secret value."""
+    content_type: str
+    """Content type of the secret."""
+    created: int
+    """Unix time of creation."""
+    modified: int
+    """Unix time of last modified."""
+
+
+class SecretsStorage(ABC):
+    """Persistent storage of the daemon collections, items and aliases.
+
+    Daemon keeps every object in memory and calls the storage
+    on every change. Storage is only read once when the daemon
+    starts.
+    """
+
+    @abstractmethod
+    def load_collections(self) -> List[StoredCollection]:
+        """Read all collections.
+
+        :returns: List of stored collections.
+        :rtype: List[StoredCollection]
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_items(self) -> Iterator[StoredItem]:
+        """Read all items.
+
+        :returns: Iterator over stored items.
+        :rtype: Iterator[StoredItem]
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_aliases(self) -> Dict[str, str]:
+        """Read all aliases.
+
+        :returns: Dictionary of alias names to collections paths.
+        :rtype: Dict[str,str]
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_collection(self, collection: StoredCollection) -> None:
+        """Add or replace the collection.
+
+        :param StoredCollection collection: Collection to store.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_collection(self, collection_path: str) -> None:
+        """Delete the collection and all its items.
+
+        :param str collection_path: Object path to collection.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_item(self, item: StoredItem) -> None:
+        """Add or replace the item.
+
+        :param StoredItem item: Item to store.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_item(self, item_path: str) -> None:
+        """Delete the item.
+
+        :param str item_path: Object path to item.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_alias(self, name: str, collection_path: Optional[str]) -> None:
+        """Set or remove the alias.
+
+        :param str name: Alias name.
+        :param str collection_path: Object path to collection or
+            None to remove the alias.
+        """
+        raise NotImplementedError
+
+    def commit(self) -> None:
+        """Make changes written so far durable.
+
+        Called by the daemon once it finished processing a batch
+        of calls. Storages that write every change immediately
+        do not need to override it.
+        """
+
+    @abstractmethod
+    def close(self) -> None:
+        """Write pending changes and release resources."""
+        raise NotImplementedError
+
+
+class MemoryStorage(SecretsStorage):
+    """Storage that does not persist anything.
+
+    Optionally starts with the given collections and items
+    which is useful for tests and benchmarks.
+    """
+
+    def __init__(
+        self,
+        collections: Iterable[StoredCollection] = (),
+        items: Iterable[StoredItem] = (),
+        aliases: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        :param Iterable[StoredCollection] collections: Initial collections.
+        :param Iterable[StoredItem] items: Initial items.
+        :param Dict[str,str] aliases: Initial aliases.
+        """
+        self._collections = list(collections)
+        self._items = items
+        self._aliases = dict(aliases or {})
+
+    def load_collections(self) -> List[StoredCollection]:
+        return self._collections
+
+    def load_items(self) -> Iterator[StoredItem]:
+        items = self._items
+        # Initial items are only needed once
+        self._items = ()
+        return iter(items)
+
+    def load_aliases(self) -> Dict[str, str]:
+        return self._aliases
+
+    def put_collection(self, collection: StoredCollection) -> None:
+        ...
+
+    def delete_collection(self, collection_path: str) -> None:
+        ...
+
+    def put_item(self, item: StoredItem) -> None:
+        ...
+
+    def delete_item(self, item_path: str) -> None:
+        ...
+
+    def set_alias(self, name: str, collection_path: Optional[str]) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
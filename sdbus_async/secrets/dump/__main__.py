@@ -0,0 +1,148 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from argparse import ArgumentParser, Namespace
+from asyncio import run
+from contextlib import ExitStack
+from sys import stderr, stdin, stdout
+from typing import Iterator
+
+from ..bulk import DEFAULT_CHUNK_SIZE, DEFAULT_MAX_CONCURRENT_CALLS
+from ..encryption import PLAIN_ALGORITHM
+from .formats import (
+    BINARY_FORMAT,
+    JSON_LINES_FORMAT,
+    BinaryWriter,
+    DumpRecord,
+    DumpWriter,
+    JsonLinesWriter,
+    open_private_file,
+    read_binary,
+    read_json_lines,
+)
+from .transfer import PromptDismissedError, export_keyring, import_keyring
+
+
+def _export(args: Namespace) -> int:
+    with ExitStack() as exit_stack:
+        writer: DumpWriter
+        if args.format == BINARY_FORMAT:
+            writer = BinaryWriter(
+                exit_stack.enter_context(open_private_file(args.output, 'wb'))
+                if args.output is not None
+                else stdout.buffer
+            )
+        else:
+            writer = JsonLinesWriter(
+                exit_stack.enter_context(
+                    open_private_file(args.output, 'w', encoding='utf-8'))
+                if args.output is not None
+                else stdout
+            )
+
+        return run(export_keyring(
+            writer,
+            args.secrets,
+            algorithm=args.algorithm,
+            chunk_size=args.chunk_size,
+            max_concurrent_calls=args.max_concurrent_calls,
+        ))
+
+
+def _import(args: Namespace) -> int:
+    with ExitStack() as exit_stack:
+        records: Iterator[DumpRecord]
+        if args.format == BINARY_FORMAT:
+            records = read_binary(
+                exit_stack.enter_context(open(args.input, 'rb'))
+                if args.input is not None
+                else stdin.buffer
+            )
+        else:
+            records = read_json_lines(
+                exit_stack.enter_context(open(args.input, encoding='utf-8'))
+                if args.input is not None
+                else stdin
+            )
+
+        return run(import_keyring(
+            records,
+            algorithm=args.algorithm,
+            replace=args.replace,
+            max_concurrent_calls=args.max_concurrent_calls,
+        ))
+
+
+def main() -> None:
+    parser = ArgumentParser(
+        prog='python -m sdbus_async.secrets.dump',
+        description='Export or import all collections and items.',
+    )
+    parser.add_argument(
+        '--format', choices=(JSON_LINES_FORMAT, BINARY_FORMAT),
+        default=JSON_LINES_FORMAT,
+        help='Dump format. JSON Lines by default.')
+    parser.add_argument(
+        '--algorithm', default=PLAIN_ALGORITHM,
+        help='Session algorithm used to transfer secrets.')
+    parser.add_argument(
+        '--max-concurrent-calls', type=int,
+        default=DEFAULT_MAX_CONCURRENT_CALLS,
+        help='Maximum number of calls waiting for reply.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser(
+        'export', help='Write collections and items to the dump.')
+    export_parser.add_argument(
+        '--secrets', action='store_true',
+        help='Include secret values of unlocked items.')
+    export_parser.add_argument(
+        '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+        help='Maximum number of items fetched at once.')
+    export_parser.add_argument(
+        '--output',
+        help='Output file. Standard output by default.')
+
+    import_parser = subparsers.add_parser(
+        'import', help='Create collections and items from the dump.')
+    import_parser.add_argument(
+        '--replace', action='store_true',
+        help='Replace existing items with the same attributes.')
+    import_parser.add_argument(
+        '--input',
+        help='Input file. Standard input by default.')
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        print(f'Exported {_export(args)} items', file=stderr)
+        return
+
+    try:
+        imported_items = _import(args)
+    except (PromptDismissedError, ValueError) as error:
+        parser.exit(1, f'Import failed: {error}\n')
+
+    print(f'Imported {imported_items} items', file=stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from base64 import b64decode, b64encode
+from json import dumps, loads
+from os import O_CREAT, O_TRUNC, O_WRONLY, close, fchmod, fdopen
+from os import open as open_fd
+from struct import Struct
+from typing import (
+    IO,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Union,
+)
+
+from ..values import SecretValue
+
+DUMP_MAGIC = b'SDBUS-SECRETS-DUMP-1\n'
+
+JSON_LINES_FORMAT = 'jsonl'
+BINARY_FORMAT = 'binary'
+
+# Lengths of record metadata and secret value
+_RECORD_HEADER = Struct('<II')
+
+_COLLECTION_TYPE = 'collection'
+_ITEM_TYPE = 'item'
+
+
+class DumpedCollection(NamedTuple):
+    """Collection record of a dump.
+
+    Always precedes the records of its items.
+    """
+
+    path: str
+    """Object path to collection at the time of export."""
+    label: str
+    """Display name of this collection."""
+    aliases: List[str]
+    """Aliases that pointed to this collection."""
+    created: int
+    """Unix time of creation."""
+    modified: int
+    """Unix time of last modified."""
+
+
+class DumpedItem(NamedTuple):
+    """Item record of a dump."""
+
+    path: str
+    """Object path to item at the time of export."""
+    collection: str
+    """Object path to collection at the time of export."""
+    label: str
+    """Item display name."""
+    attributes: Dict[str, str]
+    """Item attributes."""
+    locked: bool
+    """Was the item locked at the time of export?"""
+    created: int
+    """Unix time of creation."""
+    modified: int
+    """Unix time of last modified."""
+    secret: Optional[SecretValue]
+    """Secret value with its content type or None if secrets
+    were not exported or the item was locked."""
+
+
+DumpRecord = Union[DumpedCollection, DumpedItem]
+
+
+class DumpWriter(ABC):
+    """Base class of dump writers."""
+
+    @abstractmethod
+    def write(self, record: DumpRecord) -> None:
+        """Write a record to the stream.
+
+        :param DumpRecord record: Collection or item record.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def flush(self) -> None:
+        """Flush the underlying stream."""
+        raise NotImplementedError
+
+
+class JsonLinesWriter(DumpWriter):
+    """Writes every record as a JSON object on a separate line.
+
+    Secret values are encoded with base64.
+    """
+
+    def __init__(self, stream: IO[str]) -> None:
+        """
+        :param IO[str] stream: Text stream to write to.
+        """
+        self._stream = stream
+
+    def write(self, record: DumpRecord) -> None:
+        record_dict = _record_to_dict(record)
+
+        secret = record.secret if isinstance(record, DumpedItem) else None
+        if secret is not None:
+            record_dict['secret'] = b64encode(secret).decode('ascii')
+
+        self._stream.write(dumps(record_dict, ensure_ascii=False))
+        self._stream.write('\n')
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+class BinaryWriter(DumpWriter):
+    """Writes length prefixed records.
+
+    Stream starts with ``SDBUS-SECRETS-DUMP-1\\n`` line. Every record
+    is a header of two little endian 32 bit lengths followed by
+    the record metadata encoded as UTF-8 JSON object and
+    the raw secret value.
+    """
+
+    def __init__(self, stream: IO[bytes]) -> None:
+        """
+        :param IO[bytes] stream: Binary stream to write to.
+        """
+        self._stream = stream
+        self._stream.write(DUMP_MAGIC)
+
+    def write(self, record: DumpRecord) -> None:
+        metadata = dumps(_record_to_dict(record)).encode()
+        secret = record.secret if isinstance(record, DumpedItem) else None
+        secret_length = len(secret) if secret is not None else 0
+
+        self._stream.write(_RECORD_HEADER.pack(len(metadata), secret_length))
+        self._stream.write(metadata)
+        if secret is not None:
+            self._stream.write(secret)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+def open_private_file(
+    path: str,
+    mode: str = 'w',
+    encoding: Optional[str] = None,
+) -> IO[Any]:
+    """Open file for writing readable only by the owner.
+
+    Dumps may contain unencrypted secrets. Existing file
+    is truncated and its permissions are restricted.
+
+    :param str path: Path to file.
+    :param str mode: ``w`` for text or ``wb`` for binary file.
+    :param str encoding: Encoding of text file.
+    :returns: File object.
+    """
+    fd = open_fd(path, O_WRONLY | O_CREAT | O_TRUNC, 0o600)
+    try:
+        fchmod(fd, 0o600)
+        return fdopen(fd, mode, encoding=encoding)
+    except BaseException:
+        close(fd)
+        raise
+
+
+def read_json_lines(stream: IO[str]) -> Iterator[DumpRecord]:
+    """Read records written by :py:class:`JsonLinesWriter`.
+
+    Records are read one at a time.
+
+    :param IO[str] stream: Text stream to read from.
+    :returns: Iterator of records.
+    :rtype: Iterator[DumpRecord]
+    :raises ValueError: Stream is malformed.
+    """
+    for line in stream:
+        if not line.strip():
+            continue
+
+        record_dict = loads(line)
+        encoded_secret = record_dict.pop('secret', None)
+        secret = (
+            b64decode(encoded_secret)
+            if encoded_secret is not None
+            else None
+        )
+        yield _record_from_dict(record_dict, secret)
+
+
+def read_binary(stream: IO[bytes]) -> Iterator[DumpRecord]:
+    """Read records written by :py:class:`BinaryWriter`.
+
+    Records are read one at a time.
+
+    :param IO[bytes] stream: Binary stream to read from.
+    :returns: Iterator of records.
+    :rtype: Iterator[DumpRecord]
+    :raises ValueError: Stream is malformed.
+    """
+    if stream.read(len(DUMP_MAGIC)) != DUMP_MAGIC:
+        raise ValueError('Not a secrets dump')
+
+    while True:
+        header = stream.read(_RECORD_HEADER.size)
+        if not header:
+            return
+
+        if len(header) != _RECORD_HEADER.size:
+            raise ValueError('Truncated record header')
+
+        metadata_length, secret_length = _RECORD_HEADER.unpack(header)
+        metadata = _read_exactly(stream, metadata_length)
+        secret = _read_exactly(stream, secret_length)
+
+        record_dict = loads(metadata)
+        yield _record_from_dict(
+            record_dict,
+            secret if 'content_type' in record_dict else None,
+        )
+
+
+def _read_exactly(stream: IO[bytes], length: int) -> bytes:
+    data = stream.read(length)
+    if len(data) != length:
+        raise ValueError('Truncated record')
+
+    return data
+
+
+def _record_to_dict(record: DumpRecord) -> Dict[str, Any]:
+    if isinstance(record, DumpedCollection):
+        return {
+            'type': _COLLECTION_TYPE,
+            'path': record.path,
+            'label': record.label,
+            'aliases': record.aliases,
+            'created': record.created,
+            'modified': record.modified,
+        }
+
+    record_dict: Dict[str, Any] = {
+        'type': _ITEM_TYPE,
+        'path': record.path,
+        'collection': record.collection,
+        'label': record.label,
+        'attributes': record.attributes,
+        'locked': record.locked,
+        'created': record.created,
+        'modified': record.modified,
+    }
+    if record.secret is not None:
+        record_dict['content_type'] = record.secret.content_type
+
+    return record_dict
+
+
+def _record_from_dict(
+    record_dict: Dict[str, Any],
+    secret: Optional[bytes],
+) -> DumpRecord:
+    try:
+        record_type = record_dict['type']
+        if record_type == _COLLECTION_TYPE:
+            return DumpedCollection(
+                record_dict['path'],
+                record_dict['label'],
+                record_dict['aliases'],
+                record_dict['created'],
+                record_dict['modified'],
+            )
+
+        if record_type == _ITEM_TYPE:
+            return DumpedItem(
+                record_dict['path'],
+                record_dict['collection'],
+                record_dict['label'],
+                record_dict['attributes'],
+                record_dict['locked'],
+                record_dict['created'],
+                record_dict['modified'],
+                (
+                    SecretValue(secret, record_dict['content_type'])
+                    if secret is not None
+                    else None
+                ),
+            )
+    except KeyError as exc:
+        raise ValueError(f'Record is missing {exc}') from None
+
+    raise ValueError(f'Unknown record type {record_type!r}')
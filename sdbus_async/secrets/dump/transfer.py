@@ -0,0 +1,295 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from asyncio import FIRST_COMPLETED, Task, gather, get_running_loop, wait
+from typing import Dict, Iterable, List, Optional, Set
+
+from sdbus.sd_bus_internals import SdBus
+
+from ..bulk import DEFAULT_CHUNK_SIZE, DEFAULT_MAX_CONCURRENT_CALLS
+from ..encryption import PLAIN_ALGORITHM, PlainSessionCipher
+from ..objects import SecretCollection, SecretService
+from ..prompts import NO_PROMPT_PATH, await_prompt
+from ..sessions import SecretSessionManager
+from ..snapshots import snapshot_collection, snapshot_items
+from .formats import DumpedCollection, DumpedItem, DumpRecord, DumpWriter
+
+DEFAULT_ALIAS = 'default'
+
+
+class PromptDismissedError(Exception):
+    """Prompt shown while importing was dismissed."""
+
+
+async def export_keyring(
+    writer: DumpWriter,
+    include_secrets: bool = False,
+    bus: Optional[SdBus] = None,
+    algorithm: str = PLAIN_ALGORITHM,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_concurrent_calls: int = DEFAULT_MAX_CONCURRENT_CALLS,
+) -> int:
+    """Write every collection and its items to the dump.
+
+    Items are processed in chunks of ``chunk_size`` so memory use
+    does not depend on the number of items. Properties of the chunk
+    items are read concurrently with a single
+    :py:meth:`SecretServiceInterface.get_secrets` call for their
+    secrets.
+
+    Secrets of locked items are not exported.
+
+    :param DumpWriter writer: Writer of the dump format.
+    :param bool include_secrets: Export secret values.
+    :param SdBus bus: Use specific bus or session bus by default.
+    :param str algorithm: Session algorithm used to get secrets.
+    :param int chunk_size: Maximum number of items per chunk.
+    :param int max_concurrent_calls: Maximum number of calls
+        waiting for reply at the same time.
+    :returns: Number of exported items.
+    :rtype: int
+    """
+    secrets_service = SecretService(bus)
+    default_collection_path = await secrets_service.read_alias(DEFAULT_ALIAS)
+    exported_items = 0
+
+    async with SecretSessionManager(bus) as session_manager:
+        cipher = (
+            await session_manager.get_cipher(algorithm)
+            if include_secrets
+            else None
+        )
+
+        for collection_path in await secrets_service.collections:
+            collection = await snapshot_collection(collection_path, bus)
+            writer.write(DumpedCollection(
+                collection.path,
+                collection.label,
+                (
+                    [DEFAULT_ALIAS]
+                    if collection.path == default_collection_path
+                    else []
+                ),
+                collection.created,
+                collection.modified,
+            ))
+
+            for chunk_start in range(0, len(collection.items), chunk_size):
+                exported_items += await _export_chunk(
+                    writer,
+                    collection.path,
+                    collection.items[chunk_start:chunk_start + chunk_size],
+                    cipher,
+                    secrets_service,
+                    bus,
+                    max_concurrent_calls,
+                )
+
+            writer.flush()
+
+    return exported_items
+
+
+async def _export_chunk(
+    writer: DumpWriter,
+    collection_path: str,
+    items_paths: List[str],
+    cipher: Optional[PlainSessionCipher],
+    secrets_service: SecretService,
+    bus: Optional[SdBus],
+    max_concurrent_calls: int,
+) -> int:
+    if cipher is not None:
+        items_properties, secrets = await gather(
+            snapshot_items(items_paths, bus, max_concurrent_calls),
+            secrets_service.get_secrets(items_paths, cipher.session_path),
+        )
+        decoded_secrets = cipher.decode_many(secrets)
+    else:
+        items_properties = await snapshot_items(
+            items_paths, bus, max_concurrent_calls)
+        decoded_secrets = {}
+
+    for item in items_properties:
+        secret = decoded_secrets.pop(item.path, None)
+        writer.write(DumpedItem(
+            item.path,
+            collection_path,
+            item.label,
+            item.attributes,
+            item.locked,
+            item.created,
+            item.modified,
+            secret,
+        ))
+        if secret is not None:
+            secret.close()
+
+    return len(items_properties)
+
+
+async def import_keyring(
+    records: Iterable[DumpRecord],
+    bus: Optional[SdBus] = None,
+    algorithm: str = PLAIN_ALGORITHM,
+    replace: bool = False,
+    max_concurrent_calls: int = DEFAULT_MAX_CONCURRENT_CALLS,
+) -> int:
+    """Create collections and items from the dump records.
+
+    Records are read one at a time and up to ``max_concurrent_calls``
+    :py:meth:`SecretCollectionInterface.create_item` calls are
+    waiting for reply at the same time. Reading is paused until
+    a call completes so memory use does not depend on
+    the number of items.
+
+    Collection with ``default`` alias is imported in to the current
+    default collection. Other collections are imported in to the
+    existing collection with the same label or a new collection
+    is created.
+
+    Items exported without secrets are created with empty secrets.
+    Such items can not be imported with ``replace`` because existing
+    secrets would be overwritten with empty ones. Records are not read
+    ahead so items that precede the refused one are already imported.
+    Creation and modification times are not preserved.
+
+    :param Iterable[DumpRecord] records: Records returned by
+        :py:func:`read_json_lines` or :py:func:`read_binary`.
+    :param SdBus bus: Use specific bus or session bus by default.
+    :param str algorithm: Session algorithm used to send secrets.
+    :param bool replace: Replace existing items with
+        the same attributes.
+    :param int max_concurrent_calls: Maximum number of calls
+        waiting for reply at the same time.
+    :returns: Number of imported items.
+    :rtype: int
+    :raises ValueError: Item record precedes its collection record
+        or has no secret while ``replace`` is set.
+    :raises PromptDismissedError: Prompt to create collection or
+        item was dismissed.
+    """
+    # Exported collection path to the imported collection
+    collections: Dict[str, SecretCollection] = {}
+    pending_calls: Set[Task[None]] = set()
+    imported_items = 0
+    loop = get_running_loop()
+
+    async with SecretSessionManager(bus) as session_manager:
+        cipher = await session_manager.get_cipher(algorithm)
+
+        try:
+            for record in records:
+                if isinstance(record, DumpedCollection):
+                    collections[record.path] = SecretCollection(
+                        await _import_collection(record, bus),
+                        bus,
+                    )
+                    continue
+
+                try:
+                    collection = collections[record.collection]
+                except KeyError:
+                    raise ValueError(
+                        f'Item {record.path} precedes its collection'
+                    ) from None
+
+                if replace and record.secret is None:
+                    raise ValueError(
+                        f'Item {record.path} has no secret to replace with'
+                    )
+
+                if len(pending_calls) >= max_concurrent_calls:
+                    done_calls, pending_calls = await wait(
+                        pending_calls, return_when=FIRST_COMPLETED)
+                    for done_call in done_calls:
+                        done_call.result()
+
+                pending_calls.add(loop.create_task(
+                    _import_item(record, collection, cipher, replace, bus)))
+                imported_items += 1
+
+            await gather(*pending_calls)
+        except BaseException:
+            for pending_call in pending_calls:
+                pending_call.cancel()
+
+            await gather(*pending_calls, return_exceptions=True)
+            raise
+
+    return imported_items
+
+
+async def _import_collection(
+    record: DumpedCollection,
+    bus: Optional[SdBus],
+) -> str:
+    secrets_service = SecretService(bus)
+
+    if DEFAULT_ALIAS in record.aliases:
+        default_collection_path = await secrets_service.read_alias(
+            DEFAULT_ALIAS)
+        if default_collection_path != NO_PROMPT_PATH:
+            return default_collection_path
+
+    for collection_path in await secrets_service.collections:
+        if await SecretCollection(collection_path, bus).label == record.label:
+            return collection_path
+
+    collection_path, prompt_path = await secrets_service.create_collection(
+        {'org.freedesktop.Secret.Collection.Label': ('s', record.label)},
+        record.aliases[0] if record.aliases else '',
+    )
+    if collection_path == NO_PROMPT_PATH:
+        dismissed, collection_path = await await_prompt(prompt_path, bus=bus)
+        if dismissed:
+            raise PromptDismissedError(
+                f'Creating collection {record.label!r} was dismissed')
+
+    return collection_path
+
+
+async def _import_item(
+    record: DumpedItem,
+    collection: SecretCollection,
+    cipher: PlainSessionCipher,
+    replace: bool,
+    bus: Optional[SdBus],
+) -> None:
+    secret = record.secret
+    try:
+        item_path, prompt_path = await collection.create_item(
+            {
+                'org.freedesktop.Secret.Item.Label': ('s', record.label),
+                'org.freedesktop.Secret.Item.Attributes': (
+                    'a{ss}', record.attributes),
+            },
+            cipher.encode(secret if secret is not None else b''),
+            replace,
+        )
+        if item_path == NO_PROMPT_PATH:
+            dismissed, _ = await await_prompt(prompt_path, bus=bus)
+            if dismissed:
+                raise PromptDismissedError(
+                    f'Creating item {record.label!r} was dismissed')
+    finally:
+        if secret is not None:
+            secret.close()
@@ -0,0 +1,346 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from hashlib import sha256
+from hmac import new as hmac_new
+from os import urandom
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher
+    from cryptography.hazmat.primitives.ciphers.algorithms import AES
+    from cryptography.hazmat.primitives.ciphers.modes import CBC
+except ImportError:
+    Cipher = None  # type: ignore
+
+from .values import DEFAULT_CONTENT_TYPE, SecretBuffer, SecretValue
+
+PLAIN_ALGORITHM = 'plain'
+DH_AES_ALGORITHM = 'dh-ietf1024-sha256-aes128-cbc-pkcs7'
+
+# Second Oakley group from RFC 2409
+DH_PRIME = int(
+    'FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD1'
+    '29024E088A67CC74020BBEA63B139B22514A08798E3404DD'
+    'EF9519B3CD3A431B302B0A6DF25F14374FE1356D6D51C245'
+    'E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7ED'
+    'EE386BFB5A899FA5AE9F24117C4B1FE649286651ECE65381'
+    'FFFFFFFFFFFFFFFF',
+    16,
+)
+DH_GENERATOR = 2
+DH_KEY_LENGTH = 128
+
+AES_BLOCK_SIZE = 16
+AES_KEY_LENGTH = 16
+
+DEFAULT_DECODE_BATCH_SIZE = 256
+
+
+class PlainSessionCipher:
+    """Session without in-transit encryption.
+
+    Base class of session ciphers. Session ciphers hold the state
+    negotiated by :py:meth:`SecretServiceInterface.open_session` and
+    convert between secret values and secret data tuples.
+    """
+
+    algorithm = PLAIN_ALGORITHM
+
+    def __init__(self) -> None:
+        self.session_path = ''
+
+    @property
+    def input(self) -> Tuple[str, Any]:
+        """Input argument of the algorithm for
+        :py:meth:`SecretServiceInterface.open_session`."""
+        return ('s', '')
+
+    def negotiate(self, output: Tuple[str, Any], session_path: str) -> None:
+        """Finish the algorithm negotiation.
+
+        :param Tuple[str,Any] output: Output of the algorithm negotiation.
+        :param str session_path: Object path of the new session.
+        """
+        self.session_path = session_path
+
+    def encode(
+        self,
+        value: SecretBuffer,
+        content_type: Optional[str] = None,
+    ) -> Tuple[str, bytes, bytes, str]:
+        """Create secret data from secret value.
+
+        :param SecretValue value: Secret value. Any bytes-like
+            object is accepted. Byte arrays are not copied.
+        :param str content_type: Content type of the value.
+            Content type of :py:class:`SecretValue` or
+            ``text/plain; charset=utf8`` by default.
+        :returns: Secret data tuple.
+        :rtype: Tuple[str,bytes,bytes,str]
+        """
+        # sd-bus accepts byte arrays as well as bytes
+        if isinstance(value, memoryview):
+            value = value.tobytes()
+
+        return (  # type: ignore[return-value]
+            self.session_path,
+            b'',
+            value,
+            _content_type(value, content_type),
+        )
+
+    def decode(self, secret: Tuple[str, bytes, bytes, str]) -> SecretValue:
+        """Extract secret value from secret data.
+
+        :param Tuple[str,bytes,bytes,str] secret: Secret data tuple.
+        :returns: Secret value.
+        :rtype: SecretValue
+        """
+        return SecretValue(secret[2], secret[3])
+
+    def decode_many(
+        self,
+        secrets: Dict[str, Tuple[str, bytes, bytes, str]],
+        batch_size: int = DEFAULT_DECODE_BATCH_SIZE,
+    ) -> Dict[str, SecretValue]:
+        """Extract secret values from the result of
+        :py:meth:`SecretServiceInterface.get_secrets`.
+
+        :param Dict[str,Tuple[str,bytes,bytes,str]] secrets: Dictionary
+            of item paths to secret data tuples.
+        :param int batch_size: Number of secrets decoded at once.
+        :returns: Dictionary of item paths to secret values.
+        :rtype: Dict[str,SecretValue]
+        """
+        return {
+            item_path: SecretValue(secret[2], secret[3])
+            for item_path, secret in secrets.items()
+        }
+
+
+class DhAesSessionCipher(PlainSessionCipher):
+    """Session encrypted with ``dh-ietf1024-sha256-aes128-cbc-pkcs7``.
+
+    Diffie-Hellman exchange is performed once on negotiation and
+    the derived AES key is kept for the session lifetime.
+
+    Requires the ``cryptography`` package.
+    """
+
+    algorithm = DH_AES_ALGORITHM
+
+    def __init__(self) -> None:
+        if Cipher is None:
+            raise ImportError(
+                'Encrypted sessions require the cryptography package'
+            )
+
+        super().__init__()
+        self._private_key = (
+            int.from_bytes(urandom(DH_KEY_LENGTH), 'big') % (DH_PRIME - 2)
+            + 1
+        )
+        self._public_key = pow(
+            DH_GENERATOR, self._private_key, DH_PRIME
+        ).to_bytes(DH_KEY_LENGTH, 'big')
+        self._aes: Any = None
+
+    @property
+    def input(self) -> Tuple[str, Any]:
+        return ('ay', self._public_key)
+
+    def negotiate(self, output: Tuple[str, Any], session_path: str) -> None:
+        signature, server_public_key = output
+        if signature != 'ay':
+            raise ValueError(
+                f'Expected byte array as negotiation output, '
+                f'got {signature!r}'
+            )
+
+        shared_secret = pow(
+            int.from_bytes(server_public_key, 'big'),
+            self._private_key,
+            DH_PRIME,
+        ).to_bytes(DH_KEY_LENGTH, 'big')
+
+        self._aes = AES(_hkdf_sha256(shared_secret, AES_KEY_LENGTH))
+        super().negotiate(output, session_path)
+
+    def encode(
+        self,
+        value: SecretBuffer,
+        content_type: Optional[str] = None,
+    ) -> Tuple[str, bytes, bytes, str]:
+        iv = urandom(AES_BLOCK_SIZE)
+        value_view = memoryview(value).cast('B')
+        full_blocks_length = len(value_view) - len(value_view) % AES_BLOCK_SIZE
+        padding_length = AES_BLOCK_SIZE - len(value_view) % AES_BLOCK_SIZE
+
+        # Only the last partial block is copied to be padded
+        with SecretValue(value_view[full_blocks_length:]) as last_block:
+            last_block.extend(bytes((padding_length, )) * padding_length)
+
+            encryptor = Cipher(self._aes, CBC(iv)).encryptor()
+            encrypted_value = (
+                encryptor.update(value_view[:full_blocks_length])
+                + encryptor.update(last_block)
+                + encryptor.finalize()
+            )
+
+        return (
+            self.session_path,
+            iv,
+            encrypted_value,
+            _content_type(value, content_type),
+        )
+
+    def decode(self, secret: Tuple[str, bytes, bytes, str]) -> SecretValue:
+        _, iv, encrypted_value, content_type = secret
+        _check_encrypted(iv, encrypted_value)
+
+        # Decrypt directly in to the returned buffer
+        decrypted = SecretValue(
+            bytes(len(encrypted_value) + AES_BLOCK_SIZE - 1),
+            content_type,
+        )
+        decryptor = Cipher(self._aes, CBC(iv)).decryptor()
+        decryptor.update_into(encrypted_value, decrypted)
+        decryptor.finalize()
+
+        del decrypted[len(encrypted_value):]
+        del decrypted[len(decrypted) - _padding_length(decrypted):]
+        return decrypted
+
+    def decode_many(
+        self,
+        secrets: Dict[str, Tuple[str, bytes, bytes, str]],
+        batch_size: int = DEFAULT_DECODE_BATCH_SIZE,
+    ) -> Dict[str, SecretValue]:
+        # Secrets of a batch are decrypted as a single CBC stream
+        # to avoid creating a new cipher context for every secret.
+        # First block of every following secret was chained to the
+        # last cipher block of the previous secret instead of its own
+        # initialization vector and is corrected in place.
+        # Plain text is only written to a buffer that is wiped.
+        decoded: Dict[str, SecretValue] = {}
+        secrets_list = list(secrets.items())
+
+        for batch_start in range(0, len(secrets_list), batch_size):
+            batch = secrets_list[batch_start:batch_start + batch_size]
+
+            for _, (_, iv, encrypted_value, _) in batch:
+                _check_encrypted(iv, encrypted_value)
+
+            cipher_text = b''.join(secret[2] for _, secret in batch)
+
+            with SecretValue(
+                bytes(len(cipher_text) + AES_BLOCK_SIZE - 1)
+            ) as plain_text:
+                decryptor = Cipher(self._aes, CBC(batch[0][1][1])).decryptor()
+                decryptor.update_into(cipher_text, plain_text)
+                decryptor.finalize()
+
+                offset = 0
+                previous_block = batch[0][1][1]
+                for item_path, (_, iv, encrypted_value, content_type) in (
+                    batch
+                ):
+                    for index in range(AES_BLOCK_SIZE):
+                        plain_text[offset + index] ^= (
+                            previous_block[index] ^ iv[index])
+
+                    with memoryview(plain_text) as plain_text_view:
+                        padded_value = plain_text_view[
+                            offset:offset + len(encrypted_value)]
+                        decoded[item_path] = SecretValue(
+                            padded_value[:-_padding_length(padded_value)],
+                            content_type,
+                        )
+                        del padded_value
+
+                    offset += len(encrypted_value)
+                    previous_block = encrypted_value[-AES_BLOCK_SIZE:]
+
+        return decoded
+
+
+def new_session_cipher(algorithm: str) -> PlainSessionCipher:
+    """Create session cipher for the algorithm.
+
+    :param str algorithm: Session algorithm.
+    :returns: New session cipher.
+    :rtype: PlainSessionCipher
+    :raises ValueError: Algorithm is not supported.
+    """
+    if algorithm == PLAIN_ALGORITHM:
+        return PlainSessionCipher()
+    elif algorithm == DH_AES_ALGORITHM:
+        return DhAesSessionCipher()
+    else:
+        raise ValueError(f'Unsupported session algorithm {algorithm!r}')
+
+
+def _hkdf_sha256(input_key: bytes, length: int) -> bytes:
+    # RFC 5869 with empty salt and info
+    pseudo_random_key = hmac_new(
+        bytes(sha256().digest_size), input_key, sha256).digest()
+
+    output = b''
+    block = b''
+    counter = 1
+    while len(output) < length:
+        block = hmac_new(
+            pseudo_random_key, block + bytes((counter, )), sha256).digest()
+        output += block
+        counter += 1
+
+    return output[:length]
+
+
+def _check_encrypted(iv: bytes, encrypted_value: bytes) -> None:
+    if len(iv) != AES_BLOCK_SIZE:
+        raise ValueError('Invalid length of initialization vector')
+
+    if not encrypted_value or len(encrypted_value) % AES_BLOCK_SIZE:
+        raise ValueError('Invalid length of encrypted secret')
+
+
+def _padding_length(padded_value: SecretBuffer) -> int:
+    padding_length = padded_value[-1]
+    if (
+        not 0 < padding_length <= AES_BLOCK_SIZE
+        or padded_value[-padding_length:]
+        != bytes((padding_length, )) * padding_length
+    ):
+        raise ValueError('Invalid padding of decrypted secret')
+
+    return padding_length
+
+
+def _content_type(value: SecretBuffer, content_type: Optional[str]) -> str:
+    if content_type is not None:
+        return content_type
+
+    if isinstance(value, SecretValue):
+        return value.content_type
+
+    return DEFAULT_CONTENT_TYPE
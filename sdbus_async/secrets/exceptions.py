@@ -0,0 +1,40 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from sdbus import DbusFailedError
+
+
+class SecretIsLockedError(DbusFailedError):
+    """The object must be unlocked before this action can be carried out."""
+
+    dbus_error_name = 'org.freedesktop.Secret.Error.IsLocked'
+
+
+class SecretNoSessionError(DbusFailedError):
+    """The session does not exist."""
+
+    dbus_error_name = 'org.freedesktop.Secret.Error.NoSession'
+
+
+class SecretNoSuchObjectError(DbusFailedError):
+    """No such item or collection exists."""
+
+    dbus_error_name = 'org.freedesktop.Secret.Error.NoSuchObject'
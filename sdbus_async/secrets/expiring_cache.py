@@ -0,0 +1,106 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from collections import OrderedDict
+from time import monotonic
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class ExpiringLruCache(Generic[K, V]):
+    """Size bound mapping with per entry time to live.
+
+    Least recently used entries are evicted once ``max_size``
+    is reached. Counts hits and misses of :py:meth:`get`.
+
+    Every :py:meth:`discard` or :py:meth:`clear` increments
+    :py:attr:`generation`. Values fetched while the generation changed
+    could be stale and should not be stored.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        """
+        :param int max_size: Maximum number of entries.
+        :param float ttl: Seconds before an entry expires.
+        """
+        if max_size < 1:
+            raise ValueError('Cache size should be at least 1')
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries: OrderedDict[K, Tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Get entry value and mark it as recently used.
+
+        Expired entries are removed and counted as misses.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: K, value: V, generation: Optional[int] = None) -> None:
+        """Store entry evicting the least recently used one if full.
+
+        :param int generation: Value of :py:attr:`generation` before
+            the value was fetched. Entry is not stored if the cache
+            was invalidated in the meantime.
+        """
+        if generation is not None and generation != self.generation:
+            return
+
+        self._entries[key] = (monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: K) -> None:
+        """Remove entry if present."""
+        self.generation += 1
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self.generation += 1
+        self._entries.clear()
+
+    def keys(self) -> Tuple[K, ...]:
+        return tuple(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
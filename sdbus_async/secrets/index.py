@@ -0,0 +1,272 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from asyncio import (
+    CancelledError,
+    Event,
+    Queue,
+    Semaphore,
+    Task,
+    gather,
+    get_running_loop,
+    sleep,
+)
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from sdbus import SdBusBaseError
+from sdbus.sd_bus_internals import SdBus
+
+from .attribute_index import AttributeIndex
+from .interfaces import SecretCollectionInterface, SecretServiceInterface
+from .objects import (
+    SECRET_SERVICE_BUS_NAME,
+    SecretCollection,
+    SecretItem,
+    SecretService,
+)
+
+if TYPE_CHECKING:
+    from sdbus.dbus_proxy_async_signal import DbusSignalAsync
+
+DEFAULT_MAX_CONCURRENT_CALLS = 32
+
+_ITEM_CREATED = 'item_created'
+_ITEM_CHANGED = 'item_changed'
+_ITEM_DELETED = 'item_deleted'
+_COLLECTION_CREATED = 'collection_created'
+_COLLECTION_CHANGED = 'collection_changed'
+_COLLECTION_DELETED = 'collection_deleted'
+
+
+class SecretsIndex:
+    """Local index of items attributes.
+
+    Loads ``attributes`` property of every item once and answers
+    :py:meth:`search_items` without calling the secrets daemon.
+
+    Index is kept current by listening to items signals of every
+    collection and collections signals of the service.
+
+    Can be used as an async context manager which loads the index
+    on enter and stops listening to signals on exit.
+
+    If the index stops following signals because of an unexpected
+    error the error is raised by :py:meth:`close`.
+    """
+
+    def __init__(
+        self,
+        bus: Optional[SdBus] = None,
+        max_concurrent_calls: int = DEFAULT_MAX_CONCURRENT_CALLS,
+    ) -> None:
+        """
+        :param SdBus bus: Use specific bus or session bus by default.
+        :param int max_concurrent_calls: Maximum number of property
+            reads waiting for reply at the same time while loading.
+        """
+        self._bus = bus
+        self._max_concurrent_calls = max_concurrent_calls
+        self._index = AttributeIndex()
+        self._tasks: List[Task[None]] = []
+
+    async def load(self) -> None:
+        """Subscribe to signals and load all collections and items.
+
+        If loading fails signals are no longer followed and
+        the index can be loaded again.
+        """
+        if self._tasks:
+            raise RuntimeError('Index is already loaded')
+
+        self._calls_semaphore = Semaphore(self._max_concurrent_calls)
+        self._events: Queue[Tuple[str, str, str]] = Queue()
+        self._loaded = Event()
+
+        loop = get_running_loop()
+        self._tasks = [
+            loop.create_task(self._watch(
+                SecretCollectionInterface.item_created, _ITEM_CREATED)),
+            loop.create_task(self._watch(
+                SecretCollectionInterface.item_changed, _ITEM_CHANGED)),
+            loop.create_task(self._watch(
+                SecretCollectionInterface.item_deleted, _ITEM_DELETED)),
+            loop.create_task(self._watch(
+                SecretServiceInterface.collection_created,
+                _COLLECTION_CREATED)),
+            loop.create_task(self._watch(
+                SecretServiceInterface.collection_changed,
+                _COLLECTION_CHANGED)),
+            loop.create_task(self._watch(
+                SecretServiceInterface.collection_deleted,
+                _COLLECTION_DELETED)),
+            loop.create_task(self._process_events()),
+        ]
+        try:
+            # Let the watchers send their match rules before any
+            # property is read so that no change is missed.
+            await sleep(0)
+
+            collections_paths = await SecretService(self._bus).collections
+            await gather(*(
+                self._load_collection(collection_path)
+                for collection_path in collections_paths
+            ))
+        except BaseException:
+            tasks = self._tasks
+            self._tasks = []
+
+            for task in tasks:
+                task.cancel()
+
+            await gather(*tasks, return_exceptions=True)
+            self._index.clear()
+            raise
+
+        self._loaded.set()
+
+    def search_items(
+        self,
+        attributes: Dict[str, str],
+    ) -> Tuple[List[str], List[str]]:
+        """Find items in any collection.
+
+        Same as :py:meth:`SecretServiceInterface.search_items`
+        but answered locally.
+
+        :param Dict[str,str] attributes: Attributes that should match.
+        :returns: Two arrays of matched object paths.
+            First arrays contains unlocked items and second locked ones.
+        :rtype: Tuple[List[str],List[str]]
+        """
+        return self._index.search_items(attributes)
+
+    def search_collection_items(
+        self,
+        collection_path: str,
+        attributes: Dict[str, str],
+    ) -> List[str]:
+        """Search for items in a collection.
+
+        Same as :py:meth:`SecretCollectionInterface.search_items`
+        but answered locally.
+
+        :param str collection_path: Object path to collection.
+        :param Dict[str,str] attributes: Attributes that should match.
+        :returns: List of matched items object paths.
+        :rtype: List[str]
+        """
+        return self._index.search_collection_items(
+            collection_path, attributes)
+
+    def get_attributes(self, item_path: str) -> Optional[Dict[str, str]]:
+        """Get indexed attributes of the item.
+
+        :param str item_path: Object path to item.
+        :returns: Item attributes or None if item is not indexed.
+        :rtype: Optional[Dict[str,str]]
+        """
+        return self._index.get_attributes(item_path)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    async def close(self) -> None:
+        """Stop listening to signals and clear the index.
+
+        :raises Exception: Error that stopped the index from
+            following signals.
+        """
+        tasks = self._tasks
+        self._tasks = []
+
+        for task in tasks:
+            task.cancel()
+
+        results = await gather(*tasks, return_exceptions=True)
+        self._index.clear()
+
+        for result in results:
+            if (isinstance(result, BaseException)
+                    and not isinstance(result, CancelledError)):
+                raise result
+
+    async def __aenter__(self) -> SecretsIndex:
+        await self.load()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def _watch(self, signal: DbusSignalAsync[str], event: str) -> None:
+        async for signal_path, object_path in signal.catch_anywhere(
+                SECRET_SERVICE_BUS_NAME, self._bus):
+            self._events.put_nowait((event, signal_path, object_path))
+
+    async def _process_events(self) -> None:
+        # Events received while loading are applied after load
+        # to not be overwritten by older property values.
+        await self._loaded.wait()
+
+        while True:
+            event, signal_path, object_path = await self._events.get()
+
+            try:
+                if event in (_ITEM_CREATED, _ITEM_CHANGED):
+                    await self._load_item(object_path, signal_path)
+                elif event == _ITEM_DELETED:
+                    self._index.remove_item(object_path)
+                elif event == _COLLECTION_CREATED:
+                    await self._load_collection(object_path)
+                elif event == _COLLECTION_CHANGED:
+                    await self._load_collection_locked(object_path)
+                elif event == _COLLECTION_DELETED:
+                    self._index.remove_collection(object_path)
+            except SdBusBaseError:
+                # Object might have been deleted before its
+                # properties were read. Its deleted signal
+                # will follow.
+                ...
+
+    async def _load_collection(self, collection_path: str) -> None:
+        collection = SecretCollection(collection_path, self._bus)
+
+        async with self._calls_semaphore:
+            locked = await collection.locked
+            items_paths = await collection.items
+
+        self._index.set_collection_locked(collection_path, locked)
+        await gather(*(
+            self._load_item(item_path, collection_path)
+            for item_path in items_paths
+        ))
+
+    async def _load_collection_locked(self, collection_path: str) -> None:
+        async with self._calls_semaphore:
+            locked = await SecretCollection(
+                collection_path, self._bus).locked
+
+        self._index.set_collection_locked(collection_path, locked)
+
+    async def _load_item(self, item_path: str, collection_path: str) -> None:
+        async with self._calls_semaphore:
+            attributes = await SecretItem(item_path, self._bus).attributes
+
+        self._index.set_item(item_path, collection_path, attributes)
@@ -0,0 +1,259 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from inspect import getattr_static
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from sdbus.dbus_common_elements import DbusMethodCommon, DbusPropertyCommon
+
+# Upper bounds of latency histogram buckets in seconds
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0,
+    10.0, 25.0,
+)
+
+METHOD_MEMBER = 'method'
+PROPERTY_MEMBER = 'property'
+
+# Proxy class -> attribute name -> member kind and name
+_classes_members: Dict[type, Dict[str, Optional[Tuple[str, str]]]] = {}
+
+
+class MetricsSink(ABC):
+    """Receiver of D-Bus calls measurements.
+
+    Subclass to forward measurements to a monitoring system.
+    Called from the thread that made the call.
+    """
+
+    @abstractmethod
+    def record(
+        self,
+        member: str,
+        seconds: float,
+        request_size: int,
+        reply_size: int,
+        error: Optional[BaseException],
+    ) -> None:
+        """Record a finished call.
+
+        :param str member: Full D-Bus member name, for example
+            ``org.freedesktop.Secret.Service.SearchItems``.
+        :param float seconds: Call latency.
+        :param int request_size: Approximate size of arguments in bytes.
+        :param int reply_size: Approximate size of reply in bytes.
+        :param BaseException error: Exception raised by the call or None.
+        """
+        raise NotImplementedError
+
+
+class MemberStats:
+    """Statistics of calls to a single D-Bus member."""
+
+    def __init__(
+        self,
+        buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        self.buckets = buckets
+        """Upper bounds of latency histogram buckets in seconds."""
+        self.bucket_counts: List[int] = [0] * (len(buckets) + 1)
+        """Number of calls in every bucket. Last bucket counts calls
+        slower than the largest bound."""
+        self.calls = 0
+        """Number of calls."""
+        self.errors = 0
+        """Number of calls that raised an error."""
+        self.request_bytes = 0
+        """Total approximate size of arguments."""
+        self.reply_bytes = 0
+        """Total approximate size of replies."""
+        self.total_seconds = 0.0
+        """Total time spent waiting for replies."""
+        self.max_seconds = 0.0
+        """Slowest call latency."""
+
+    def add(
+        self,
+        seconds: float,
+        request_size: int,
+        reply_size: int,
+        error: bool,
+    ) -> None:
+        """Add a call measurement."""
+        self.bucket_counts[bisect_left(self.buckets, seconds)] += 1
+        self.calls += 1
+        self.errors += error
+        self.request_bytes += request_size
+        self.reply_bytes += reply_size
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    @property
+    def mean_seconds(self) -> float:
+        """Average call latency."""
+        return self.total_seconds / self.calls if self.calls else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        """Estimate latency percentile from the histogram.
+
+        :param float fraction: Percentile between 0 and 1,
+            for example 0.99.
+        :returns: Upper bound of the bucket containing the percentile.
+            Slowest latency if it is in the last bucket.
+        :rtype: float
+        """
+        rank = fraction * self.calls
+        calls_so_far = 0
+        for bucket_bound, bucket_count in zip(
+                self.buckets, self.bucket_counts):
+            calls_so_far += bucket_count
+            if calls_so_far >= rank and calls_so_far:
+                return min(bucket_bound, self.max_seconds)
+
+        return self.max_seconds
+
+
+class InMemoryMetricsSink(MetricsSink):
+    """Sink that keeps statistics of every member in memory.
+
+    Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        """
+        :param Tuple[float,...] buckets: Upper bounds of latency
+            histogram buckets in seconds.
+        """
+        self._buckets = buckets
+        self._members_stats: Dict[str, MemberStats] = {}
+        self._lock = Lock()
+
+    def record(
+        self,
+        member: str,
+        seconds: float,
+        request_size: int,
+        reply_size: int,
+        error: Optional[BaseException],
+    ) -> None:
+        with self._lock:
+            member_stats = self._members_stats.get(member)
+            if member_stats is None:
+                member_stats = MemberStats(self._buckets)
+                self._members_stats[member] = member_stats
+
+            member_stats.add(
+                seconds, request_size, reply_size, error is not None)
+
+    def stats(self, member: str) -> MemberStats:
+        """Get statistics of the member.
+
+        :param str member: Full D-Bus member name.
+        :returns: Member statistics. Empty if member was never called.
+        :rtype: MemberStats
+        """
+        with self._lock:
+            return self._members_stats.get(member, MemberStats(self._buckets))
+
+    def members(self) -> List[str]:
+        """Names of all called members.
+
+        :rtype: List[str]
+        """
+        with self._lock:
+            return list(self._members_stats)
+
+    def reset(self) -> None:
+        """Remove all statistics."""
+        with self._lock:
+            self._members_stats.clear()
+
+
+def payload_size(value: Any) -> int:
+    """Approximate size of D-Bus arguments or reply in bytes.
+
+    :param Any value: Arguments or reply.
+    :rtype: int
+    """
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    elif isinstance(value, (list, tuple)):
+        return sum(payload_size(element) for element in value)
+    elif isinstance(value, dict):
+        return sum(
+            payload_size(key) + payload_size(element)
+            for key, element in value.items()
+        )
+    elif value is None:
+        return 0
+    else:
+        return 8
+
+
+def dbus_member(
+    proxy_class: type,
+    attribute_name: str,
+) -> Optional[Tuple[str, str]]:
+    """Find the D-Bus member behind a proxy attribute.
+
+    Result is cached for every class and attribute.
+
+    :param type proxy_class: Class of the proxy.
+    :param str attribute_name: Python attribute name.
+    :returns: Member kind and full D-Bus member name or
+        None if attribute is not a method or property.
+    :rtype: Tuple[str,str]
+    """
+    try:
+        return _classes_members[proxy_class][attribute_name]
+    except KeyError:
+        ...
+
+    member: Optional[Tuple[str, str]] = None
+    try:
+        class_attribute = getattr_static(proxy_class, attribute_name)
+    except AttributeError:
+        class_attribute = None
+
+    if isinstance(class_attribute, DbusMethodCommon):
+        member = (
+            METHOD_MEMBER,
+            f'{class_attribute.interface_name}.{class_attribute.method_name}',
+        )
+    elif isinstance(class_attribute, DbusPropertyCommon):
+        member = (
+            PROPERTY_MEMBER,
+            f'{class_attribute.interface_name}.'
+            f'{class_attribute.property_name}',
+        )
+
+    _classes_members.setdefault(proxy_class, {})[attribute_name] = member
+    return member
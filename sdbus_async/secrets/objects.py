@@ -19,10 +19,11 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
 from __future__ import annotations
 
-from typing import Optional
+from typing import Dict, List, Optional
 
 from sdbus.sd_bus_internals import SdBus
 
+from .encryption import PlainSessionCipher
 from .interfaces import (
     SecretCollectionInterface,
     SecretItemInterface,
@@ -30,9 +31,11 @@ from .interfaces import (
     SecretServiceInterface,
     SecretSessionInterface,
 )
+from .records import ItemInfo, SearchResult, Secret
 
 SECRET_SERVICE_BUS_NAME = 'org.freedesktop.secrets'
 SECRET_SERVICE_PATH = '/org/freedesktop/secrets'
+SECRET_ITEM_INTERFACE_NAME = 'org.freedesktop.Secret.Item'
 
 
 class SecretService(SecretServiceInterface):
@@ -53,6 +56,38 @@ class SecretService(SecretServiceInterface):
             SECRET_SERVICE_PATH,
             bus)
 
+    async def search_items_typed(
+        self,
+        attributes: Dict[str, str],
+    ) -> SearchResult:
+        """Typed variant of :py:meth:`SecretServiceInterface.search_items`.
+
+        :param Dict[str,str] attributes: Attributes that should match.
+        :returns: Unlocked and locked items.
+        :rtype: SearchResult
+        """
+        return SearchResult(*await self.search_items(attributes))
+
+    async def get_secrets_typed(
+        self,
+        items: List[str],
+        cipher: PlainSessionCipher,
+    ) -> Dict[str, Secret]:
+        """Typed variant of :py:meth:`SecretServiceInterface.get_secrets`.
+
+        :param List[str] items: List of object paths to items.
+        :param PlainSessionCipher cipher: Cipher of current session.
+        :returns: Dictionary of item paths to decoded secrets.
+        :rtype: Dict[str,Secret]
+        """
+        secrets = cipher.decode_many(
+            await self.get_secrets(items, cipher.session_path))
+        return {
+            item_path: Secret(
+                cipher.session_path, secret, secret.content_type)
+            for item_path, secret in secrets.items()
+        }
+
 
 class SecretCollection(SecretCollectionInterface):
     """Secrets collection.
@@ -94,6 +129,29 @@ class SecretItem(SecretItemInterface):
             SECRET_SERVICE_BUS_NAME,
             item_path,
             bus)
+        self._item_path = item_path
+
+    async def get_secret_typed(self, cipher: PlainSessionCipher) -> Secret:
+        """Typed variant of :py:meth:`SecretItemInterface.get_secret`.
+
+        :param PlainSessionCipher cipher: Cipher of current session.
+        :returns: Decoded item secret.
+        :rtype: Secret
+        """
+        secret = cipher.decode(await self.get_secret(cipher.session_path))
+        return Secret(cipher.session_path, secret, secret.content_type)
+
+    async def get_info_typed(self) -> ItemInfo:
+        """Read all item properties with a single call.
+
+        :returns: Item metadata.
+        :rtype: ItemInfo
+        """
+        # Raw GetAll reply avoids converting every property name
+        return ItemInfo.from_dbus_properties(
+            self._item_path,
+            await self._properties_get_all(SECRET_ITEM_INTERFACE_NAME),
+        )
 
 
 class SecretPrompt(SecretPromptInterface):
@@ -0,0 +1,108 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from asyncio import Task, get_running_loop, shield, sleep, wait_for
+from typing import Any, Optional, Tuple
+
+from sdbus import SdBusBaseError
+from sdbus.sd_bus_internals import SdBus
+
+from .objects import SecretPrompt
+
+NO_PROMPT_PATH = '/'
+
+
+async def await_prompt(
+    prompt_path: str,
+    window_id: str = '',
+    timeout: Optional[float] = None,
+    bus: Optional[SdBus] = None,
+) -> Tuple[bool, Any]:
+    """Show the prompt and wait for it to complete.
+
+    Subscribes to :py:meth:`SecretPromptInterface.completed` before
+    calling :py:meth:`SecretPromptInterface.prompt` so that the
+    completion can not be missed.
+
+    If the wait is cancelled or times out the prompt is dismissed.
+
+    :param str prompt_path: Object path to prompt as returned by
+        methods such as :py:meth:`SecretServiceInterface.unlock`.
+        If the path is ``/`` no prompt is necessary and
+        the function returns immediately.
+    :param str window_id: Platform specific window handle to use
+        for showing the prompt.
+    :param float timeout: Seconds to wait for the prompt to be shown
+        and completed. By default waits forever.
+    :param SdBus bus: Use specific bus or session bus by default.
+        Should be the same bus the prompt was received from.
+    :returns: Tuple of whether the prompt was dismissed and
+        the operation specific result.
+        Result is None if no prompt was necessary.
+    :rtype: Tuple[bool,Any]
+    :raises asyncio.TimeoutError: Prompt did not complete in time.
+    """
+    if prompt_path == NO_PROMPT_PATH:
+        return False, None
+
+    prompt = SecretPrompt(prompt_path, bus)
+
+    completed_task = get_running_loop().create_task(
+        _wait_completed(prompt))
+    try:
+        # Let the task send its match rule before the prompt is
+        # shown. Messages are sent in order so the signal
+        # can not arrive before the subscription.
+        await sleep(0)
+        dismissed, (_, result) = await wait_for(
+            _show_and_wait(prompt, window_id, completed_task), timeout)
+    except BaseException:
+        completed_task.cancel()
+        await shield(_dismiss(prompt))
+        raise
+
+    return dismissed, result
+
+
+async def _show_and_wait(
+    prompt: SecretPrompt,
+    window_id: str,
+    completed_task: Task[Tuple[bool, Tuple[str, Any]]],
+) -> Tuple[bool, Tuple[str, Any]]:
+    await prompt.prompt(window_id)
+    return await completed_task
+
+
+async def _wait_completed(
+    prompt: SecretPrompt,
+) -> Tuple[bool, Tuple[str, Any]]:
+    async for completed_data in prompt.completed.catch():
+        return completed_data
+
+    raise RuntimeError('Prompt signals stopped')
+
+
+async def _dismiss(prompt: SecretPrompt) -> None:
+    try:
+        await prompt.dismiss()
+    except SdBusBaseError:
+        # Prompt might have already completed or been removed.
+        ...
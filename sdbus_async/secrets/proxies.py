@@ -0,0 +1,181 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from asyncio import Task, gather, get_running_loop, shield, sleep
+from typing import Any, List, Optional
+from weakref import WeakValueDictionary
+
+from sdbus.sd_bus_internals import SdBus
+from sdbus_async.dbus_daemon import FreedesktopDbus
+
+from .interfaces import SecretCollectionInterface, SecretServiceInterface
+from .objects import SECRET_SERVICE_BUS_NAME, SecretCollection, SecretItem
+
+
+class SecretProxyFactory:
+    """Returns the same proxy object for the same object path.
+
+    Proxies are bound to one bus and held through weak references
+    so unused proxies are garbage collected.
+
+    Proxies are forgotten as soon as ``ItemDeleted`` or
+    ``CollectionDeleted`` signals are received for them.
+
+    Can be used as an async context manager which waits until
+    the signals are subscribed on enter and stops watching them
+    on exit. Without it signals are subscribed on the first call
+    and objects deleted right after it may not be forgotten.
+    """
+
+    def __init__(self, bus: Optional[SdBus] = None) -> None:
+        """
+        :param SdBus bus: Use specific bus or session bus by default.
+        """
+        self._bus = bus
+        self._items: WeakValueDictionary[str, SecretItem] = (
+            WeakValueDictionary())
+        self._collections: WeakValueDictionary[str, SecretCollection] = (
+            WeakValueDictionary())
+        self._watch_tasks: List[Task[None]] = []
+        self._watch_started: Optional[Task[None]] = None
+
+    async def start(self) -> None:
+        """Subscribe to signals.
+
+        Objects deleted after this method returns are guaranteed
+        to be forgotten.
+        """
+        await shield(self._ensure_watch())
+
+    def item(self, item_path: str) -> SecretItem:
+        """Get proxy to the item.
+
+        :param str item_path: Object path to item.
+        :returns: Item proxy.
+        :rtype: SecretItem
+        """
+        self._ensure_watch()
+
+        item = self._items.get(item_path)
+        if item is None:
+            item = SecretItem(item_path, self._bus)
+            self._items[item_path] = item
+
+        return item
+
+    def items(self, items_paths: List[str]) -> List[SecretItem]:
+        """Get proxies to many items.
+
+        :param List[str] items_paths: List of object paths to items.
+        :returns: List of items proxies in the same order
+            as ``items_paths``.
+        :rtype: List[SecretItem]
+        """
+        return [self.item(item_path) for item_path in items_paths]
+
+    def collection(self, collection_path: str) -> SecretCollection:
+        """Get proxy to the collection.
+
+        :param str collection_path: Object path to collection.
+        :returns: Collection proxy.
+        :rtype: SecretCollection
+        """
+        self._ensure_watch()
+
+        collection = self._collections.get(collection_path)
+        if collection is None:
+            collection = SecretCollection(collection_path, self._bus)
+            self._collections[collection_path] = collection
+
+        return collection
+
+    def forget(self, object_path: str) -> None:
+        """Forget proxy of the item or the collection and its items.
+
+        :param str object_path: Object path to item or collection.
+        """
+        self._items.pop(object_path, None)
+        self._collections.pop(object_path, None)
+
+        items_prefix = object_path + '/'
+        for item_path in list(self._items.keys()):
+            if item_path.startswith(items_prefix):
+                self._items.pop(item_path, None)
+
+    def __len__(self) -> int:
+        return len(self._items) + len(self._collections)
+
+    async def close(self) -> None:
+        """Stop watching signals and forget all proxies."""
+        watch_tasks = self._watch_tasks
+        self._watch_tasks = []
+        if self._watch_started is not None:
+            watch_tasks.append(self._watch_started)
+            self._watch_started = None
+
+        for watch_task in watch_tasks:
+            watch_task.cancel()
+
+        await gather(*watch_tasks, return_exceptions=True)
+        self._items.clear()
+        self._collections.clear()
+
+    async def __aenter__(self) -> SecretProxyFactory:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    def _ensure_watch(self) -> Task[None]:
+        watch_started = self._watch_started
+        if watch_started is None:
+            watch_started = get_running_loop().create_task(
+                self._start_watch())
+            self._watch_started = watch_started
+
+        return watch_started
+
+    async def _start_watch(self) -> None:
+        loop = get_running_loop()
+        self._watch_tasks = [
+            loop.create_task(self._watch_items()),
+            loop.create_task(self._watch_collections()),
+        ]
+        # Let the tasks send their match rules. Messages of
+        # a connection are processed in order so once a reply to
+        # the following call arrives the match rules are active.
+        await sleep(0)
+        await FreedesktopDbus(self._bus).get_id()
+
+    async def _watch_items(self) -> None:
+        async for _, item_path in (
+            SecretCollectionInterface.item_deleted.catch_anywhere(
+                SECRET_SERVICE_BUS_NAME, self._bus)
+        ):
+            self._items.pop(item_path, None)
+
+    async def _watch_collections(self) -> None:
+        async for _, collection_path in (
+            SecretServiceInterface.collection_deleted.catch_anywhere(
+                SECRET_SERVICE_BUS_NAME, self._bus)
+        ):
+            self.forget(collection_path)
@@ -0,0 +1,236 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, NamedTuple, Tuple
+
+from .values import SecretValue
+
+
+class ItemProperties(NamedTuple):
+    """Properties of an item read at once."""
+
+    path: str
+    """Object path to item."""
+    label: str
+    """Item display name."""
+    attributes: Dict[str, str]
+    """Item attributes."""
+    locked: bool
+    """Is secret locked?"""
+    created: int
+    """Unix time of creation."""
+    modified: int
+    """Unix time of last modified."""
+
+    @classmethod
+    def from_properties(
+        cls,
+        item_path: str,
+        properties: Dict[str, Any],
+    ) -> ItemProperties:
+        """Create from the result of ``properties_get_all_dict``."""
+        return cls(
+            item_path,
+            properties['label'],
+            properties['attributes'],
+            properties['locked'],
+            properties['created'],
+            properties['modified'],
+        )
+
+
+class CollectionProperties(NamedTuple):
+    """Properties of a collection read at once."""
+
+    path: str
+    """Object path to collection."""
+    label: str
+    """Display name of this collection."""
+    items: List[str]
+    """List of object paths of items in this collection."""
+    locked: bool
+    """Whether the collection is locked or not."""
+    created: int
+    """Unix time of creation."""
+    modified: int
+    """Unix time of last modified."""
+
+    @classmethod
+    def from_properties(
+        cls,
+        collection_path: str,
+        properties: Dict[str, Any],
+    ) -> CollectionProperties:
+        """Create from the result of ``properties_get_all_dict``."""
+        return cls(
+            collection_path,
+            properties['label'],
+            properties['items'],
+            properties['locked'],
+            properties['created'],
+            properties['modified'],
+        )
+
+
+class _SlotsRecord:
+    # Records returned by typed methods. Unlike named tuples
+    # fields can not be accessed by position.
+    __slots__: Dict[str, str] = {}
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+
+        return all(
+            getattr(self, field_name) == getattr(other, field_name)
+            for field_name in self.__slots__
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        fields = ', '.join(
+            f'{field_name}={getattr(self, field_name)!r}'
+            for field_name in self.__slots__
+        )
+        return f'{self.__class__.__name__}({fields})'
+
+
+class Secret(_SlotsRecord):
+    """Decoded secret returned by typed methods.
+
+    Can be used as a context manager which wipes the value on exit.
+    """
+
+    __slots__ = {
+        'session': 'Object path of the session used to transfer the secret.',
+        'value': 'Decoded secret value.',
+        'content_type': 'Content type of the secret value.',
+    }
+
+    session: str
+    value: SecretValue
+    content_type: str
+
+    def __init__(
+        self,
+        session: str,
+        value: SecretValue,
+        content_type: str,
+    ) -> None:
+        self.session = session
+        self.value = value
+        self.content_type = content_type
+
+    def close(self) -> None:
+        """Wipe the secret value."""
+        self.value.close()
+
+    def __enter__(self) -> Secret:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+class SearchResult(_SlotsRecord):
+    """Result of the typed variant of
+    :py:meth:`SecretServiceInterface.search_items`."""
+
+    __slots__ = {
+        'unlocked': 'Object paths of unlocked items.',
+        'locked': 'Object paths of locked items.',
+    }
+
+    unlocked: List[str]
+    locked: List[str]
+
+    def __init__(self, unlocked: List[str], locked: List[str]) -> None:
+        self.unlocked = unlocked
+        self.locked = locked
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over all matched items, unlocked first."""
+        yield from self.unlocked
+        yield from self.locked
+
+    def __len__(self) -> int:
+        return len(self.unlocked) + len(self.locked)
+
+
+class ItemInfo(_SlotsRecord):
+    """Item metadata returned by typed methods.
+
+    Same fields as :py:class:`ItemProperties` in a smaller
+    object without positional access.
+    """
+
+    __slots__ = {
+        'path': 'Object path to item.',
+        'label': 'Item display name.',
+        'attributes': 'Item attributes.',
+        'locked': 'Is secret locked?',
+        'created': 'Unix time of creation.',
+        'modified': 'Unix time of last modified.',
+    }
+
+    path: str
+    label: str
+    attributes: Dict[str, str]
+    locked: bool
+    created: int
+    modified: int
+
+    def __init__(
+        self,
+        path: str,
+        label: str,
+        attributes: Dict[str, str],
+        locked: bool,
+        created: int,
+        modified: int,
+    ) -> None:
+        self.path = path
+        self.label = label
+        self.attributes = attributes
+        self.locked = locked
+        self.created = created
+        self.modified = modified
+
+    @classmethod
+    def from_dbus_properties(
+        cls,
+        item_path: str,
+        dbus_properties: Dict[str, Tuple[str, Any]],
+    ) -> ItemInfo:
+        """Create from the reply of D-Bus ``GetAll`` method.
+
+        Variants are read directly without building
+        a dictionary of Python names.
+        """
+        return cls(
+            item_path,
+            dbus_properties['Label'][1],
+            dbus_properties['Attributes'][1],
+            dbus_properties['Locked'][1],
+            dbus_properties['Created'][1],
+            dbus_properties['Modified'][1],
+        )
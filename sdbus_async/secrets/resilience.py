@@ -0,0 +1,183 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from asyncio import CancelledError, TimeoutError, sleep, wait_for
+from time import monotonic
+from types import FunctionType, MethodType
+from typing import Any, Awaitable, Callable, TypeVar, cast
+
+from .call_policy import CallPolicy, DeadlineExceededError
+from .metrics import METHOD_MEMBER, dbus_member
+
+T = TypeVar('T')
+
+
+def with_policy(proxy: T, policy: CallPolicy) -> T:
+    """Apply deadline, retries and circuit breaker to proxy calls.
+
+    Every D-Bus method call and property access made through the
+    returned proxy is bounded by the policy deadline. Idempotent methods
+    and properties reads are retried when the daemon does not reply.
+    Cancelling the calling task cancels the pending call.
+
+    :param proxy: Any proxy object, for example :py:class:`SecretService`.
+    :param CallPolicy policy: Policy to apply.
+    :returns: Proxy with the same interface.
+    """
+    return cast(T, _PolicyProxy(proxy, policy))
+
+
+async def call_with_policy(
+    policy: CallPolicy,
+    call: Callable[[], Awaitable[T]],
+    idempotent: bool,
+) -> T:
+    """Make the call under the policy.
+
+    :param CallPolicy policy: Policy to apply.
+    :param call: Function that starts a new attempt of the call.
+    :param bool idempotent: Can the call be retried.
+    :returns: Result of the call.
+    :raises DeadlineExceededError: Deadline passed.
+    :raises CircuitOpenError: Circuit breaker rejected the call.
+    """
+    deadline = policy.deadline()
+    circuit_breaker = policy.circuit_breaker
+    attempt = 0
+
+    while True:
+        timeout = None if deadline is None else deadline - monotonic()
+        if circuit_breaker is not None:
+            circuit_breaker.before_call()
+
+        try:
+            result = await wait_for(call(), timeout)
+        except TimeoutError:
+            if circuit_breaker is not None:
+                circuit_breaker.record_failure()
+
+            raise DeadlineExceededError(
+                f'No reply in {policy.timeout} seconds') from None
+        except policy.transient_errors:
+            if circuit_breaker is not None:
+                circuit_breaker.record_failure()
+
+            if not idempotent or attempt >= policy.retries:
+                raise
+
+            delay = policy.backoff_delay(attempt)
+            if deadline is not None and monotonic() + delay >= deadline:
+                raise
+        except CancelledError:
+            if circuit_breaker is not None:
+                circuit_breaker.release()
+
+            raise
+        except Exception:
+            # Daemon replied with an error so it is available
+            if circuit_breaker is not None:
+                circuit_breaker.record_success()
+
+            raise
+        else:
+            if circuit_breaker is not None:
+                circuit_breaker.record_success()
+
+            return result
+
+        await sleep(delay)
+        attempt += 1
+
+
+class _PolicyProxy:
+    def __init__(self, proxy: Any, policy: CallPolicy) -> None:
+        object.__setattr__(self, '_proxy', proxy)
+        object.__setattr__(self, '_policy', policy)
+
+    def __getattr__(self, name: str) -> Any:
+        proxy = self._proxy
+        member = dbus_member(type(proxy), name)
+        if member is None:
+            value = getattr(proxy, name)
+            if (
+                isinstance(value, MethodType)
+                and value.__self__ is proxy
+                and isinstance(value.__func__, FunctionType)
+            ):
+                return MethodType(value.__func__, self)
+
+            return value
+
+        member_kind, member_name = member
+        if member_kind == METHOD_MEMBER:
+            return _PolicyMethod(
+                getattr(proxy, name),
+                self._policy,
+                member_name in self._policy.idempotent_methods,
+            )
+        else:
+            return _PolicyProperty(getattr(proxy, name), self._policy)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._proxy, name, value)
+
+    def __repr__(self) -> str:
+        return f'with_policy({self._proxy!r}, {self._policy!r})'
+
+
+class _PolicyMethod:
+    __slots__ = ('_method', '_policy', '_idempotent')
+
+    def __init__(
+        self,
+        method: Any,
+        policy: CallPolicy,
+        idempotent: bool,
+    ) -> None:
+        self._method = method
+        self._policy = policy
+        self._idempotent = idempotent
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return await call_with_policy(
+            self._policy,
+            lambda: self._method(*args, **kwargs),
+            self._idempotent,
+        )
+
+
+class _PolicyProperty:
+    __slots__ = ('_property', '_policy')
+
+    def __init__(self, dbus_property: Any, policy: CallPolicy) -> None:
+        self._property = dbus_property
+        self._policy = policy
+
+    def __await__(self) -> Any:
+        return self.get_async().__await__()
+
+    async def get_async(self) -> Any:
+        return await call_with_policy(
+            self._policy, self._property.get_async, True)
+
+    async def set_async(self, value: Any) -> None:
+        await call_with_policy(
+            self._policy, lambda: self._property.set_async(value), False)
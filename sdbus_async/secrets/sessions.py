@@ -0,0 +1,165 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from asyncio import Task, get_running_loop, shield
+from typing import Any, Dict, Optional
+
+from sdbus.sd_bus_internals import SdBus
+from sdbus_async.dbus_daemon import FreedesktopDbus
+
+from .encryption import (
+    PLAIN_ALGORITHM,
+    PlainSessionCipher,
+    new_session_cipher,
+)
+from .objects import SECRET_SERVICE_BUS_NAME, SecretService, SecretSession
+
+
+class SecretSessionManager:
+    """Shared sessions to the secrets daemon.
+
+    Opens at most one session per algorithm on the bus and hands
+    the same session to every caller. Key material of encrypted
+    sessions is negotiated once and kept for the session lifetime.
+
+    Watches the owner of ``org.freedesktop.secrets`` name and
+    forgets the sessions if the daemon restarts. New session will be
+    opened on next request.
+
+    Can be used as an async context manager which closes all
+    sessions on exit.
+    """
+
+    def __init__(self, bus: Optional[SdBus] = None) -> None:
+        """
+        :param SdBus bus: Use specific bus or session bus by default.
+        """
+        self._bus = bus
+        self._service = SecretService(bus)
+        self._sessions: Dict[str, Task[PlainSessionCipher]] = {}
+        self._watch_task: Optional[Task[None]] = None
+
+    async def get_session(
+        self,
+        algorithm: str = PLAIN_ALGORITHM,
+    ) -> str:
+        """Get object path of the shared session.
+
+        Session is opened on the first call. Concurrent callers
+        wait for the same :py:meth:`SecretServiceInterface.open_session`
+        call.
+
+        :param str algorithm: Session algorithm.
+        :returns: Object path of the session.
+        :rtype: str
+        """
+        return (await self.get_cipher(algorithm)).session_path
+
+    async def get_cipher(
+        self,
+        algorithm: str = PLAIN_ALGORITHM,
+    ) -> PlainSessionCipher:
+        """Get cipher of the shared session.
+
+        Cipher is used to encode and decode secret data of the session.
+
+        :param str algorithm: Session algorithm.
+            See :py:func:`new_session_cipher` for supported algorithms.
+        :returns: Cipher with negotiated session.
+        :rtype: PlainSessionCipher
+        """
+        self._ensure_owner_watch()
+
+        session_task = self._sessions.get(algorithm)
+        if session_task is None:
+            session_task = get_running_loop().create_task(
+                self._open_session(new_session_cipher(algorithm)))
+            session_task.add_done_callback(self._on_open_done)
+            self._sessions[algorithm] = session_task
+
+        return await shield(session_task)
+
+    def invalidate(self, algorithm: Optional[str] = None) -> None:
+        """Forget sessions without closing them.
+
+        Use this if the daemon reported that the session
+        no longer exists.
+
+        :param str algorithm: Only forget the session of this
+            algorithm. By default all sessions are forgotten.
+        """
+        if algorithm is None:
+            self._sessions.clear()
+        else:
+            self._sessions.pop(algorithm, None)
+
+    async def close(self) -> None:
+        """Close all opened sessions and stop watching the daemon."""
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+        sessions = self._sessions
+        self._sessions = {}
+
+        for session_task in sessions.values():
+            if not session_task.done():
+                session_task.cancel()
+                continue
+
+            if session_task.cancelled() or session_task.exception():
+                continue
+
+            await SecretSession(
+                session_task.result().session_path, self._bus).close()
+
+    async def __aenter__(self) -> SecretSessionManager:
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def _open_session(
+        self,
+        cipher: PlainSessionCipher,
+    ) -> PlainSessionCipher:
+        output, session_path = await self._service.open_session(
+            cipher.algorithm, cipher.input)
+        cipher.negotiate(output, session_path)
+        return cipher
+
+    def _on_open_done(self, session_task: Task[PlainSessionCipher]) -> None:
+        if session_task.cancelled() or session_task.exception():
+            for algorithm, task in tuple(self._sessions.items()):
+                if task is session_task:
+                    del self._sessions[algorithm]
+
+    def _ensure_owner_watch(self) -> None:
+        if self._watch_task is None:
+            self._watch_task = get_running_loop().create_task(
+                self._watch_owner())
+
+    async def _watch_owner(self) -> None:
+        dbus_daemon = FreedesktopDbus(self._bus)
+
+        async for name, _, _ in dbus_daemon.name_owner_changed:
+            if name == SECRET_SERVICE_BUS_NAME:
+                self.invalidate()
@@ -0,0 +1,183 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from asyncio import Task, get_running_loop, shield
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    cast,
+)
+
+from sdbus.sd_bus_internals import SdBus
+
+from .encryption import PlainSessionCipher
+from .objects import SecretCollection, SecretItem, SecretService
+from .values import SecretValue
+
+T = TypeVar('T')
+
+
+class _Flight:
+    def __init__(self, task: Task[Any]) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SecretSingleflight:
+    """Share a pending call between identical concurrent requests.
+
+    Requests are keyed by the D-Bus method and its canonicalized
+    arguments. While a call is pending every identical request waits
+    for it instead of making a new call. Results are not kept after the
+    call completes so the next request always makes a new call.
+
+    Call is cancelled only once every waiting request is cancelled.
+    """
+
+    def __init__(self, bus: Optional[SdBus] = None) -> None:
+        """
+        :param SdBus bus: Use specific bus or session bus by default.
+        """
+        self._bus = bus
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    @property
+    def pending(self) -> int:
+        """Number of pending calls."""
+        return len(self._flights)
+
+    async def search_items(
+        self,
+        attributes: Dict[str, str],
+    ) -> Tuple[List[str], List[str]]:
+        """Deduplicated :py:meth:`SecretServiceInterface.search_items`.
+
+        :param Dict[str,str] attributes: Attributes that should match.
+        :returns: Unlocked and locked items.
+        :rtype: Tuple[List[str],List[str]]
+        """
+        unlocked, locked = await self.call(
+            ('SearchItems', frozenset(attributes.items())),
+            lambda: SecretService(self._bus).search_items(attributes),
+        )
+        return list(unlocked), list(locked)
+
+    async def search_collection_items(
+        self,
+        collection_path: str,
+        attributes: Dict[str, str],
+    ) -> List[str]:
+        """Deduplicated :py:meth:`SecretCollectionInterface.search_items`.
+
+        :param str collection_path: Object path to collection.
+        :param Dict[str,str] attributes: Attributes that should match.
+        :returns: Matched items.
+        :rtype: List[str]
+        """
+        return list(await self.call(
+            ('Collection.SearchItems', collection_path,
+             frozenset(attributes.items())),
+            lambda: SecretCollection(
+                collection_path, self._bus).search_items(attributes),
+        ))
+
+    async def get_secret(
+        self,
+        item_path: str,
+        cipher: PlainSessionCipher,
+    ) -> SecretValue:
+        """Deduplicated :py:meth:`SecretItemInterface.get_secret`.
+
+        Every request receives its own decoded value.
+
+        :param str item_path: Object path to item.
+        :param PlainSessionCipher cipher: Cipher of current session.
+        :returns: Decoded secret.
+        :rtype: SecretValue
+        """
+        session = cipher.session_path
+        return cipher.decode(await self.call(
+            ('GetSecret', item_path, session),
+            lambda: SecretItem(item_path, self._bus).get_secret(session),
+        ))
+
+    async def get_secrets(
+        self,
+        items: List[str],
+        cipher: PlainSessionCipher,
+    ) -> Dict[str, SecretValue]:
+        """Deduplicated :py:meth:`SecretServiceInterface.get_secrets`.
+
+        Order of items does not matter. Every request receives its
+        own decoded values.
+
+        :param List[str] items: List of object paths to items.
+        :param PlainSessionCipher cipher: Cipher of current session.
+        :returns: Dictionary of item paths to decoded secrets.
+        :rtype: Dict[str,SecretValue]
+        """
+        session = cipher.session_path
+        return cipher.decode_many(await self.call(
+            ('GetSecrets', frozenset(items), session),
+            lambda: SecretService(self._bus).get_secrets(items, session),
+        ))
+
+    async def call(
+        self,
+        key: Hashable,
+        start_call: Callable[[], Awaitable[T]],
+    ) -> T:
+        """Wait for the pending call with the same key or start a new one.
+
+        :param Hashable key: Canonical key of the call.
+        :param start_call: Function that starts the call.
+        :returns: Result of the call. Shared by all requests.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(
+                get_running_loop().create_task(self._fly(key, start_call)))
+            self._flights[key] = flight
+
+        flight.waiters += 1
+        try:
+            return cast(T, await shield(flight.task))
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                flight.task.cancel()
+
+    async def _fly(
+        self,
+        key: Hashable,
+        start_call: Callable[[], Awaitable[T]],
+    ) -> T:
+        try:
+            return await start_call()
+        finally:
+            del self._flights[key]
@@ -0,0 +1,93 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from asyncio import Semaphore, gather
+from typing import List, Optional
+
+from sdbus.sd_bus_internals import SdBus
+
+from .objects import SecretCollection, SecretItem
+from .records import CollectionProperties, ItemProperties
+
+DEFAULT_MAX_CONCURRENT_CALLS = 32
+
+
+async def snapshot_item(
+    item_path: str,
+    bus: Optional[SdBus] = None,
+) -> ItemProperties:
+    """Read all properties of the item with a single call.
+
+    :param str item_path: Object path to item.
+    :param SdBus bus: Use specific bus or session bus by default.
+    :returns: Item properties.
+    :rtype: ItemProperties
+    """
+    properties = await SecretItem(item_path, bus).properties_get_all_dict(
+        on_unknown_member='ignore')
+
+    return ItemProperties.from_properties(item_path, properties)
+
+
+async def snapshot_collection(
+    collection_path: str,
+    bus: Optional[SdBus] = None,
+) -> CollectionProperties:
+    """Read all properties of the collection with a single call.
+
+    :param str collection_path: Object path to collection.
+    :param SdBus bus: Use specific bus or session bus by default.
+    :returns: Collection properties.
+    :rtype: CollectionProperties
+    """
+    properties = await SecretCollection(
+        collection_path, bus).properties_get_all_dict(
+            on_unknown_member='ignore')
+
+    return CollectionProperties.from_properties(collection_path, properties)
+
+
+async def snapshot_items(
+    items_paths: List[str],
+    bus: Optional[SdBus] = None,
+    max_concurrent_calls: int = DEFAULT_MAX_CONCURRENT_CALLS,
+) -> List[ItemProperties]:
+    """Read all properties of many items.
+
+    Up to ``max_concurrent_calls`` items are read at the same time.
+
+    :param List[str] items_paths: List of object paths to items.
+    :param SdBus bus: Use specific bus or session bus by default.
+    :param int max_concurrent_calls: Maximum number of calls
+        waiting for reply at the same time.
+    :returns: List of items properties in the same order
+        as ``items_paths``.
+    :rtype: List[ItemProperties]
+    """
+    calls_semaphore = Semaphore(max_concurrent_calls)
+
+    async def snapshot_one(item_path: str) -> ItemProperties:
+        async with calls_semaphore:
+            return await snapshot_item(item_path, bus)
+
+    return list(await gather(*(
+        snapshot_one(item_path) for item_path in items_paths
+    )))
@@ -0,0 +1,536 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from asyncio import Semaphore, gather
+from hashlib import sha256
+from json import dump, dumps, load
+from os import replace
+from os.path import exists
+from time import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sdbus import DbusUnknownMethodError, DbusUnknownObjectError
+from sdbus.sd_bus_internals import SdBus
+
+from .bulk import DEFAULT_CHUNK_SIZE, DEFAULT_MAX_CONCURRENT_CALLS
+from .dump.formats import (
+    DumpedCollection,
+    DumpedItem,
+    JsonLinesWriter,
+    open_private_file,
+    read_json_lines,
+)
+from .dump.transfer import PromptDismissedError
+from .encryption import PLAIN_ALGORITHM, PlainSessionCipher
+from .exceptions import SecretNoSuchObjectError
+from .objects import SecretCollection, SecretItem, SecretService
+from .prompts import NO_PROMPT_PATH, await_prompt
+from .records import ItemProperties
+from .sessions import SecretSessionManager
+from .snapshots import snapshot_collection, snapshot_items
+from .values import SecretValue
+
+SYNC_STATE_VERSION = 1
+
+
+def attributes_fingerprint(label: str, attributes: Dict[str, str]) -> str:
+    """Digest of item label and attributes.
+
+    :param str label: Item display name.
+    :param Dict[str,str] attributes: Item attributes.
+    :returns: Hex digest that changes if label or any attribute changes.
+    :rtype: str
+    """
+    return sha256(
+        dumps([label, sorted(attributes.items())]).encode()
+    ).hexdigest()
+
+
+class SyncedItem(NamedTuple):
+    """Source item state recorded by the last sync."""
+
+    created: int
+    """Unix time of creation."""
+    modified: int
+    """Unix time of last modified."""
+    fingerprint: str
+    """Digest of label and attributes."""
+    target_id: str
+    """Identifier of the copy returned by the target."""
+
+
+class SyncResult(NamedTuple):
+    """Number of items processed by a sync run."""
+
+    created: int
+    """Items copied for the first time."""
+    updated: int
+    """Changed items copied again."""
+    deleted: int
+    """Items removed from the target."""
+    unchanged: int
+    """Items that did not need to be copied."""
+    skipped: int
+    """Changed items that could not be copied because they are locked
+    or disappeared. They are retried on the next run."""
+
+
+class SyncState:
+    """Watermark and items of the last successful sync.
+
+    Watermark is the time the last successful sync started. Items
+    modified at or after the watermark are always copied because
+    timestamps only have a precision of a second.
+    """
+
+    def __init__(
+        self,
+        watermark: int = 0,
+        items: Optional[Dict[str, SyncedItem]] = None,
+    ) -> None:
+        """
+        :param int watermark: Unix time of the last successful sync.
+        :param Dict[str,SyncedItem] items: Synced items by source
+            object path.
+        """
+        self.watermark = watermark
+        self.items: Dict[str, SyncedItem] = (
+            items if items is not None else {})
+
+    @classmethod
+    def load(cls, path: str) -> SyncState:
+        """Read the state saved by :py:meth:`save`.
+
+        :param str path: Path to state file. If the file does not
+            exist an empty state is returned.
+        :returns: Sync state.
+        :rtype: SyncState
+        :raises ValueError: File has unknown format.
+        """
+        if not exists(path):
+            return cls()
+
+        with open(path, encoding='utf-8') as state_file:
+            state_dict = load(state_file)
+
+        if state_dict.get('version') != SYNC_STATE_VERSION:
+            raise ValueError('Unknown sync state version')
+
+        return cls(
+            state_dict['watermark'],
+            {
+                item_path: SyncedItem(*synced_item)
+                for item_path, synced_item in state_dict['items'].items()
+            },
+        )
+
+    def save(self, path: str) -> None:
+        """Atomically replace the state file.
+
+        :param str path: Path to state file.
+        """
+        temporary_path = path + '.tmp'
+        with open_private_file(
+                temporary_path, encoding='utf-8') as state_file:
+            dump(
+                {
+                    'version': SYNC_STATE_VERSION,
+                    'watermark': self.watermark,
+                    'items': self.items,
+                },
+                state_file,
+            )
+
+        replace(temporary_path, path)
+
+
+class SyncTarget(ABC):
+    """Base class of sync targets."""
+
+    @abstractmethod
+    async def put_item(
+        self,
+        item: DumpedItem,
+        target_id: Optional[str],
+    ) -> str:
+        """Create or update the copy of the item.
+
+        Secret is wiped once the call returns and should be copied
+        if it has to be kept.
+
+        :param DumpedItem item: Source item with its secret.
+        :param str target_id: Identifier returned by the previous
+            call for the same item or None if the item is new.
+        :returns: Identifier of the copy.
+        :rtype: str
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_item(self, target_id: str) -> None:
+        """Delete the copy of the item.
+
+        :param str target_id: Identifier returned by
+            :py:meth:`put_item`.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def commit(self, collection: DumpedCollection) -> None:
+        """Persist the changes.
+
+        Called after all changes of the run are applied.
+
+        :param DumpedCollection collection: Source collection.
+        """
+        raise NotImplementedError
+
+
+class CollectionSyncTarget(SyncTarget):
+    """Copies items to another collection.
+
+    Copies are identified by object paths and updated in place.
+    Dismissed prompt to create or delete a copy raises
+    :py:exc:`PromptDismissedError` so the item is not recorded
+    and is copied again on the next run.
+    """
+
+    def __init__(
+        self,
+        collection_path: str,
+        bus: Optional[SdBus] = None,
+        algorithm: str = PLAIN_ALGORITHM,
+    ) -> None:
+        """
+        :param str collection_path: Object path to target collection.
+        :param SdBus bus: Use specific bus or session bus by default.
+        :param str algorithm: Session algorithm used to send secrets.
+        """
+        self._collection = SecretCollection(collection_path, bus)
+        self._bus = bus
+        self._session_manager = SecretSessionManager(bus)
+        self._algorithm = algorithm
+
+    async def put_item(
+        self,
+        item: DumpedItem,
+        target_id: Optional[str],
+    ) -> str:
+        cipher = await self._session_manager.get_cipher(self._algorithm)
+
+        if target_id is not None:
+            try:
+                await self._update_item(target_id, item, cipher)
+                return target_id
+            except (
+                SecretNoSuchObjectError,
+                DbusUnknownObjectError,
+                DbusUnknownMethodError,
+            ):
+                # Copy was deleted from the target
+                pass
+
+        item_path, prompt_path = await self._collection.create_item(
+            {
+                'org.freedesktop.Secret.Item.Label': ('s', item.label),
+                'org.freedesktop.Secret.Item.Attributes': (
+                    'a{ss}', item.attributes),
+            },
+            self._encode(item, cipher),
+            False,
+        )
+        if item_path == NO_PROMPT_PATH:
+            dismissed, item_path = await await_prompt(
+                prompt_path, bus=self._bus)
+            if dismissed:
+                raise PromptDismissedError(
+                    f'Creating copy of {item.path} was dismissed')
+
+        return item_path
+
+    async def delete_item(self, target_id: str) -> None:
+        try:
+            prompt_path = await SecretItem(target_id, self._bus).delete()
+        except (
+            SecretNoSuchObjectError,
+            DbusUnknownObjectError,
+            DbusUnknownMethodError,
+        ):
+            return
+
+        dismissed, _ = await await_prompt(prompt_path, bus=self._bus)
+        if dismissed:
+            raise PromptDismissedError(
+                f'Deleting copy {target_id} was dismissed')
+
+    async def commit(self, collection: DumpedCollection) -> None:
+        await self._session_manager.close()
+
+    async def _update_item(
+        self,
+        item_path: str,
+        item: DumpedItem,
+        cipher: PlainSessionCipher,
+    ) -> None:
+        target_item = SecretItem(item_path, self._bus)
+        await target_item.set_secret(self._encode(item, cipher))
+        await target_item.label.set_async(item.label)
+        await target_item.attributes.set_async(item.attributes)
+
+    def _encode(
+        self,
+        item: DumpedItem,
+        cipher: PlainSessionCipher,
+    ) -> Tuple[str, bytes, bytes, str]:
+        return cipher.encode(item.secret if item.secret is not None else b'')
+
+
+class SnapshotSyncTarget(SyncTarget):
+    """Mirrors the collection to a JSON Lines dump file.
+
+    File can be imported with ``python -m sdbus_async.secrets.dump``.
+    Whole file is kept in memory and rewritten if anything changed.
+    File is created readable only by the owner.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param str path: Path to dump file.
+        """
+        self.path = path
+        self._items: Optional[Dict[str, DumpedItem]] = None
+        self._changed = False
+
+    async def put_item(
+        self,
+        item: DumpedItem,
+        target_id: Optional[str],
+    ) -> str:
+        items = self._get_items()
+        if target_id is not None:
+            self._discard(items, target_id)
+
+        secret = item.secret
+        if secret is not None:
+            secret = SecretValue(secret, secret.content_type)
+
+        items[item.path] = item._replace(secret=secret)
+        self._changed = True
+        return item.path
+
+    async def delete_item(self, target_id: str) -> None:
+        self._discard(self._get_items(), target_id)
+        self._changed = True
+
+    async def commit(self, collection: DumpedCollection) -> None:
+        if not self._changed and exists(self.path):
+            return
+
+        temporary_path = self.path + '.tmp'
+        with open_private_file(
+                temporary_path, encoding='utf-8') as dump_file:
+            writer = JsonLinesWriter(dump_file)
+            writer.write(collection)
+            for item in self._get_items().values():
+                writer.write(item)
+
+        replace(temporary_path, self.path)
+        self._changed = False
+
+    def _get_items(self) -> Dict[str, DumpedItem]:
+        if self._items is None:
+            self._items = {}
+            if exists(self.path):
+                with open(self.path, encoding='utf-8') as dump_file:
+                    for record in read_json_lines(dump_file):
+                        if isinstance(record, DumpedItem):
+                            self._items[record.path] = record
+
+        return self._items
+
+    def _discard(self, items: Dict[str, DumpedItem], item_path: str) -> None:
+        old_item = items.pop(item_path, None)
+        if old_item is not None and old_item.secret is not None:
+            old_item.secret.close()
+
+
+async def sync_collection(
+    collection_path: str,
+    target: SyncTarget,
+    state_path: str,
+    bus: Optional[SdBus] = None,
+    algorithm: str = PLAIN_ALGORITHM,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_concurrent_calls: int = DEFAULT_MAX_CONCURRENT_CALLS,
+) -> SyncResult:
+    """Copy items changed since the last run to the target.
+
+    Properties of every source item are read in chunks of
+    ``chunk_size``. An item is copied if it is new, its creation
+    or modification time differs from the recorded one, it was
+    modified after the watermark or the fingerprint of its label
+    and attributes changed. Secrets of changed items of a chunk are
+    retrieved with a single :py:meth:`SecretServiceInterface.get_secrets`
+    call. Items that no longer exist are deleted from the target.
+
+    State is saved only after the target committed the changes.
+    If the run fails the next run copies the same items again.
+
+    :param str collection_path: Object path to source collection.
+    :param SyncTarget target: Target that receives the changes.
+    :param str state_path: Path to file with the sync state.
+    :param SdBus bus: Use specific bus or session bus by default.
+    :param str algorithm: Session algorithm used to get secrets.
+    :param int chunk_size: Maximum number of items per chunk.
+    :param int max_concurrent_calls: Maximum number of calls
+        waiting for reply at the same time.
+    :returns: Number of processed items.
+    :rtype: SyncResult
+    """
+    state = SyncState.load(state_path)
+    started_at = int(time())
+    collection = await snapshot_collection(collection_path, bus)
+    new_items: Dict[str, SyncedItem] = {}
+    created = updated = unchanged = skipped = 0
+
+    async with SecretSessionManager(bus) as session_manager:
+        cipher = await session_manager.get_cipher(algorithm)
+
+        for chunk_start in range(0, len(collection.items), chunk_size):
+            chunk_properties = await snapshot_items(
+                collection.items[chunk_start:chunk_start + chunk_size],
+                bus,
+                max_concurrent_calls,
+            )
+
+            changed_items: List[ItemProperties] = []
+            for item in chunk_properties:
+                synced_item = state.items.get(item.path)
+                if (
+                    synced_item is not None
+                    and not _is_changed(item, synced_item, state.watermark)
+                ):
+                    new_items[item.path] = synced_item
+                    unchanged += 1
+                elif item.locked:
+                    if synced_item is not None:
+                        new_items[item.path] = synced_item
+                    skipped += 1
+                else:
+                    changed_items.append(item)
+
+            if not changed_items:
+                continue
+
+            secrets = cipher.decode_many(
+                await SecretService(bus).get_secrets(
+                    [item.path for item in changed_items],
+                    cipher.session_path,
+                )
+            )
+
+            calls_semaphore = Semaphore(max_concurrent_calls)
+
+            async def put_item(item: ItemProperties) -> bool:
+                synced_item = state.items.get(item.path)
+                secret = secrets.pop(item.path, None)
+                if secret is None:
+                    if synced_item is not None:
+                        new_items[item.path] = synced_item
+                    return False
+
+                try:
+                    async with calls_semaphore:
+                        target_id = await target.put_item(
+                            DumpedItem(
+                                item.path,
+                                collection.path,
+                                item.label,
+                                item.attributes,
+                                item.locked,
+                                item.created,
+                                item.modified,
+                                secret,
+                            ),
+                            (
+                                synced_item.target_id
+                                if synced_item is not None
+                                else None
+                            ),
+                        )
+                finally:
+                    secret.close()
+
+                new_items[item.path] = SyncedItem(
+                    item.created,
+                    item.modified,
+                    attributes_fingerprint(item.label, item.attributes),
+                    target_id,
+                )
+                return True
+
+            for item, is_put in zip(changed_items, await gather(*(
+                put_item(item) for item in changed_items
+            ))):
+                if not is_put:
+                    skipped += 1
+                elif item.path in state.items:
+                    updated += 1
+                else:
+                    created += 1
+
+    existing_items = set(collection.items)
+    deleted_items = [
+        synced_item for item_path, synced_item in state.items.items()
+        if item_path not in existing_items
+    ]
+    for synced_item in deleted_items:
+        await target.delete_item(synced_item.target_id)
+
+    await target.commit(DumpedCollection(
+        collection.path,
+        collection.label,
+        [],
+        collection.created,
+        collection.modified,
+    ))
+
+    state.watermark = started_at
+    state.items = new_items
+    state.save(state_path)
+
+    return SyncResult(
+        created, updated, len(deleted_items), unchanged, skipped)
+
+
+def _is_changed(
+    item: ItemProperties,
+    synced_item: SyncedItem,
+    watermark: int,
+) -> bool:
+    return (
+        item.created != synced_item.created
+        or item.modified != synced_item.modified
+        or item.modified >= watermark
+        or attributes_fingerprint(item.label, item.attributes)
+        != synced_item.fingerprint
+    )
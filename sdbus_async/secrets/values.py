@@ -0,0 +1,104 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from typing import Any, Union
+
+DEFAULT_CONTENT_TYPE = 'text/plain; charset=utf8'
+DEFAULT_CHARSET = 'utf-8'
+
+SecretBuffer = Union[bytes, bytearray, memoryview]
+
+
+class SecretValue(bytearray):
+    """Secret value that can be wiped from memory.
+
+    Mutable byte array that supports the buffer protocol so it can be
+    passed to D-Bus calls, files and sockets without copying.
+    Text is only decoded when :py:attr:`text` is accessed.
+
+    Buffer is overwritten with zeros by :py:meth:`close`, on context
+    manager exit or when the value is garbage collected.
+    Immutable copies such as ``bytes(value)`` or :py:attr:`text`
+    can not be wiped.
+    """
+
+    __slots__ = ('content_type', )
+
+    def __init__(
+        self,
+        value: SecretBuffer = b'',
+        content_type: str = DEFAULT_CONTENT_TYPE,
+    ) -> None:
+        """
+        :param bytes value: Secret value. Copied in to the new buffer.
+        :param str content_type: Content type of the value.
+        """
+        super().__init__(value)
+        self.content_type = content_type
+
+    @property
+    def charset(self) -> str:
+        """Character set from the content type parameters.
+        UTF-8 if not specified."""
+        for parameter in self.content_type.split(';')[1:]:
+            name, _, value = parameter.partition('=')
+            if name.strip().lower() == 'charset':
+                return value.strip().strip('"')
+
+        return DEFAULT_CHARSET
+
+    @property
+    def text(self) -> str:
+        """Value decoded with the character set of the content type.
+
+        Decoded on every access so no decoded copy is kept.
+        """
+        return self.decode(self.charset)
+
+    def close(self) -> None:
+        """Overwrite the value with zeros and release the buffer.
+
+        Buffer can not be released while it is exported,
+        for example while a ``memoryview`` of it exists,
+        but it is still overwritten.
+        """
+        self[:] = bytes(len(self))
+        try:
+            del self[:]
+        except BufferError:
+            ...
+
+    def __enter__(self) -> SecretValue:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}(<{len(self)} bytes>, '
+            f'content_type={self.content_type!r})'
+        )
+
+    __str__ = __repr__
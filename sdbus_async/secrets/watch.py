@@ -0,0 +1,383 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from asyncio import (
+    Future,
+    Task,
+    TimerHandle,
+    gather,
+    get_running_loop,
+    sleep,
+)
+from collections import deque
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from sdbus.sd_bus_internals import SdBus
+from sdbus_async.dbus_daemon import FreedesktopDbus
+
+from .interfaces import SecretCollectionInterface, SecretServiceInterface
+from .objects import SECRET_SERVICE_BUS_NAME
+
+if TYPE_CHECKING:
+    from sdbus.dbus_proxy_async_signal import DbusSignalAsync
+
+DEFAULT_MAX_QUEUE_SIZE = 1024
+DEFAULT_DEBOUNCE = 0.0
+
+OVERFLOW_DROP_OLDEST = 'drop-oldest'
+OVERFLOW_DROP_NEWEST = 'drop-newest'
+OVERFLOW_RAISE = 'raise'
+
+_OVERFLOW_POLICIES = (
+    OVERFLOW_DROP_OLDEST,
+    OVERFLOW_DROP_NEWEST,
+    OVERFLOW_RAISE,
+)
+
+
+class EventQueueOverflowError(Exception):
+    """Events were dropped because the queue was full.
+
+    Consumer should reload the state it keeps. Iteration
+    can be continued and receives events after the overflow.
+    """
+
+
+class ItemCreated(NamedTuple):
+    """Item was created."""
+
+    collection_path: str
+    """Object path to collection of the item."""
+    item_path: str
+    """Object path to item."""
+
+
+class ItemChanged(NamedTuple):
+    """Item properties or secret changed."""
+
+    collection_path: str
+    """Object path to collection of the item."""
+    item_path: str
+    """Object path to item."""
+
+
+class ItemDeleted(NamedTuple):
+    """Item was deleted."""
+
+    collection_path: str
+    """Object path to collection of the item."""
+    item_path: str
+    """Object path to item."""
+
+
+class CollectionCreated(NamedTuple):
+    """Collection was created."""
+
+    collection_path: str
+    """Object path to collection."""
+
+
+class CollectionChanged(NamedTuple):
+    """Collection properties changed."""
+
+    collection_path: str
+    """Object path to collection."""
+
+
+class CollectionDeleted(NamedTuple):
+    """Collection was deleted."""
+
+    collection_path: str
+    """Object path to collection."""
+
+
+SecretEvent = Union[
+    ItemCreated,
+    ItemChanged,
+    ItemDeleted,
+    CollectionCreated,
+    CollectionChanged,
+    CollectionDeleted,
+]
+
+# Signal and function creating the event from
+# the emitting object path and signal data
+_SIGNALS_EVENTS: Tuple[
+    Tuple[DbusSignalAsync[str], Callable[[str, str], SecretEvent]], ...
+] = (
+    (SecretCollectionInterface.item_created, ItemCreated),
+    (SecretCollectionInterface.item_changed, ItemChanged),
+    (SecretCollectionInterface.item_deleted, ItemDeleted),
+    (SecretServiceInterface.collection_created,
+     lambda _, collection_path: CollectionCreated(collection_path)),
+    (SecretServiceInterface.collection_changed,
+     lambda _, collection_path: CollectionChanged(collection_path)),
+    (SecretServiceInterface.collection_deleted,
+     lambda _, collection_path: CollectionDeleted(collection_path)),
+)
+
+
+class SecretEventWatcher:
+    """Async iterator of changes of all collections and items.
+
+    Items signals are received from every collection including
+    collections created after the watcher started.
+
+    Events are buffered in a queue of ``max_queue_size`` events.
+    If the consumer falls behind the ``overflow`` policy applies:
+
+    * ``drop-oldest`` discards the oldest queued event.
+    * ``drop-newest`` discards the received event.
+    * ``raise`` discards all queued events and raises
+      :py:exc:`EventQueueOverflowError` on the next iteration.
+
+    If ``debounce`` is positive :py:class:`ItemChanged` and
+    :py:class:`CollectionChanged` events are delayed by that many
+    seconds and repeated changes of the same object in that window
+    are delivered as one event. Pending change is discarded if
+    the object is deleted.
+
+    Can be used as an async context manager which starts watching
+    on enter and stops on exit. Otherwise watching starts on
+    the first iteration and continues until :py:meth:`close`.
+    """
+
+    def __init__(
+        self,
+        bus: Optional[SdBus] = None,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+        overflow: str = OVERFLOW_DROP_OLDEST,
+        debounce: float = DEFAULT_DEBOUNCE,
+    ) -> None:
+        """
+        :param SdBus bus: Use specific bus or session bus by default.
+        :param int max_queue_size: Maximum number of queued events.
+        :param str overflow: ``drop-oldest``, ``drop-newest``
+            or ``raise``.
+        :param float debounce: Seconds to coalesce repeated
+            change events of the same object.
+        """
+        if overflow not in _OVERFLOW_POLICIES:
+            raise ValueError(f'Unknown overflow policy {overflow!r}')
+
+        if max_queue_size < 1:
+            raise ValueError('Queue size must be positive')
+
+        self.max_queue_size = max_queue_size
+        self.overflow = overflow
+        self.debounce = debounce
+        self.dropped = 0
+        """Number of events dropped because the queue was full."""
+        self.coalesced = 0
+        """Number of change events merged with a pending one."""
+        self._bus = bus
+        self._events: Deque[SecretEvent] = deque()
+        self._pending_changes: Dict[SecretEvent, TimerHandle] = {}
+        self._tasks: List[Task[None]] = []
+        self._waiter: Optional[Future[None]] = None
+        self._overflowed = False
+        self._closed = False
+
+    async def start(self) -> None:
+        """Subscribe to signals.
+
+        Changes made after this method returns are guaranteed
+        to be delivered.
+        """
+        if self._tasks:
+            raise RuntimeError('Watcher is already started')
+
+        if self._closed:
+            raise RuntimeError('Watcher is closed')
+
+        loop = get_running_loop()
+        self._tasks = [
+            loop.create_task(self._watch(signal, create_event))
+            for signal, create_event in _SIGNALS_EVENTS
+        ]
+        # Let the tasks send their match rules. Messages of
+        # a connection are processed in order so once a reply to
+        # the following call arrives the match rules are active.
+        await sleep(0)
+        await FreedesktopDbus(self._bus).get_id()
+
+    async def close(self) -> None:
+        """Stop watching and discard queued events.
+
+        Pending iteration raises :py:exc:`StopAsyncIteration`.
+        """
+        self._closed = True
+        tasks = self._tasks
+        self._tasks = []
+
+        for task in tasks:
+            task.cancel()
+
+        for timer_handle in self._pending_changes.values():
+            timer_handle.cancel()
+
+        self._pending_changes.clear()
+        self._events.clear()
+        self._wake_up()
+
+        await gather(*tasks, return_exceptions=True)
+
+    def __aiter__(self) -> SecretEventWatcher:
+        return self
+
+    async def __anext__(self) -> SecretEvent:
+        if self._closed:
+            raise StopAsyncIteration
+
+        if not self._tasks:
+            await self.start()
+
+        while not self._events:
+            if self._overflowed:
+                break
+
+            self._waiter = get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+
+            if self._closed:
+                raise StopAsyncIteration
+
+        if self._overflowed:
+            self._overflowed = False
+            raise EventQueueOverflowError
+
+        return self._events.popleft()
+
+    async def __aenter__(self) -> SecretEventWatcher:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def _watch(
+        self,
+        signal: DbusSignalAsync[str],
+        create_event: Callable[[str, str], SecretEvent],
+    ) -> None:
+        async for signal_path, object_path in signal.catch_anywhere(
+                SECRET_SERVICE_BUS_NAME, self._bus):
+            self._receive(create_event(signal_path, object_path))
+
+    def _receive(self, event: SecretEvent) -> None:
+        if isinstance(event, (ItemDeleted, CollectionDeleted)):
+            self._discard_pending_changes(event)
+        elif (
+            self.debounce > 0
+            and isinstance(event, (ItemChanged, CollectionChanged))
+        ):
+            if event in self._pending_changes:
+                self.coalesced += 1
+            else:
+                self._pending_changes[event] = get_running_loop().call_later(
+                    self.debounce, self._emit_pending_change, event)
+            return
+
+        self._put(event)
+
+    def _emit_pending_change(self, event: SecretEvent) -> None:
+        del self._pending_changes[event]
+        self._put(event)
+
+    def _discard_pending_changes(
+        self,
+        event: Union[ItemDeleted, CollectionDeleted],
+    ) -> None:
+        if isinstance(event, ItemDeleted):
+            changed_events: List[SecretEvent] = [
+                ItemChanged(*event)]
+        else:
+            # Items of the collection are deleted with it
+            changed_events = [
+                pending_event for pending_event in self._pending_changes
+                if pending_event[0] == event.collection_path
+            ]
+
+        for changed_event in changed_events:
+            timer_handle = self._pending_changes.pop(changed_event, None)
+            if timer_handle is not None:
+                timer_handle.cancel()
+
+    def _put(self, event: SecretEvent) -> None:
+        if len(self._events) >= self.max_queue_size:
+            self.dropped += 1
+
+            if self.overflow == OVERFLOW_DROP_NEWEST:
+                return
+            elif self.overflow == OVERFLOW_DROP_OLDEST:
+                self._events.popleft()
+            else:
+                self.dropped += len(self._events)
+                self._events.clear()
+                self._overflowed = True
+                self._wake_up()
+                return
+
+        self._events.append(event)
+        self._wake_up()
+
+    def _wake_up(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+
+def watch(
+    bus: Optional[SdBus] = None,
+    max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+    overflow: str = OVERFLOW_DROP_OLDEST,
+    debounce: float = DEFAULT_DEBOUNCE,
+) -> SecretEventWatcher:
+    """Create a watcher of all secrets changes.
+
+    .. code-block:: python
+
+        async with watch(debounce=0.5) as events:
+            async for event in events:
+                ...
+
+    :param SdBus bus: Use specific bus or session bus by default.
+    :param int max_queue_size: Maximum number of queued events.
+    :param str overflow: ``drop-oldest``, ``drop-newest`` or ``raise``.
+    :param float debounce: Seconds to coalesce repeated
+        change events of the same object.
+    :returns: Watcher that starts on enter or first iteration.
+    :rtype: SecretEventWatcher
+    """
+    return SecretEventWatcher(bus, max_queue_size, overflow, debounce)
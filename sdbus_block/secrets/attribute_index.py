@@ -0,0 +1 @@
+../../sdbus_async/secrets/attribute_index.py
\ No newline at end of file
@@ -0,0 +1,96 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from sdbus.sd_bus_internals import SdBus
+
+from .encryption import PlainSessionCipher
+from .objects import SecretService
+from .values import SecretValue
+
+DEFAULT_CHUNK_SIZE = 128
+
+
+def get_secrets_in_chunks(
+    items: List[str],
+    cipher: PlainSessionCipher,
+    bus: Optional[SdBus] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, SecretValue]:
+    """Retrieve secrets of many items.
+
+    Items are split in to chunks of ``chunk_size`` and each chunk is
+    retrieved with a single :py:meth:`SecretServiceInterface.get_secrets`
+    call. Chunks are retrieved one after another and decoded
+    as soon as they are received.
+
+    :param List[str] items: List of object paths to items.
+    :param PlainSessionCipher cipher: Cipher of current session.
+    :param SdBus bus: Use specific bus or session bus by default.
+    :param int chunk_size: Maximum number of items per call.
+    :returns: Dictionary with keys as requested object paths
+        and values as decoded secrets.
+    :rtype: Dict[str,SecretValue]
+    """
+    secrets_service = SecretService(bus)
+
+    secrets: Dict[str, SecretValue] = {}
+    for chunk_start in range(0, len(items), chunk_size):
+        secrets.update(cipher.decode_many(
+            secrets_service.get_secrets(
+                items[chunk_start:chunk_start + chunk_size],
+                cipher.session_path,
+            )
+        ))
+
+    return secrets
+
+
+def fetch_secrets(
+    attributes: Dict[str, str],
+    cipher: PlainSessionCipher,
+    bus: Optional[SdBus] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, SecretValue]:
+    """Find items in any collection and retrieve their secrets.
+
+    Combines :py:meth:`SecretServiceInterface.search_items` with
+    :py:func:`get_secrets_in_chunks`. Locked items are skipped and
+    should be unlocked first.
+
+    :param Dict[str,str] attributes: Attributes that should match.
+    :param PlainSessionCipher cipher: Cipher of current session.
+    :param SdBus bus: Use specific bus or session bus by default.
+    :param int chunk_size: Maximum number of items per
+        :py:meth:`SecretServiceInterface.get_secrets` call.
+    :returns: Dictionary with keys as matched object paths
+        and values as decoded secrets.
+    :rtype: Dict[str,SecretValue]
+    """
+    unlocked_items, _ = SecretService(bus).search_items(attributes)
+
+    return get_secrets_in_chunks(
+        unlocked_items,
+        cipher,
+        bus,
+        chunk_size,
+    )
@@ -0,0 +1,204 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from threading import Lock
+from typing import Any, Optional, Tuple
+
+from sdbus.sd_bus_internals import SdBus
+
+from .encryption import PLAIN_ALGORITHM
+from .expiring_cache import ExpiringLruCache
+from .objects import SecretItem
+from .records import ItemProperties
+from .sessions import SecretSessionManager
+from .signals import (
+    COLLECTION_DELETED,
+    ITEM_CHANGED,
+    ITEM_DELETED,
+    SecretSignalDispatcher,
+)
+from .snapshots import snapshot_item
+from .values import SecretValue
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 60.0
+
+
+class SecretsCache:
+    """Client side cache of secrets and items properties.
+
+    Entries are evicted after ``ttl`` seconds or when the cache is
+    full and the entry is least recently used.
+
+    Blocking interfaces do not have signals. If ``dispatcher`` is passed
+    entries are invalidated as soon as ``ItemChanged`` or ``ItemDeleted``
+    signals are received for the item or ``CollectionDeleted`` signal
+    is received for its collection. Otherwise changed items are not
+    noticed until the entry expires or :py:meth:`invalidate` is called.
+
+    Can be used as a context manager which stops watching signals
+    and removes all entries on exit.
+    """
+
+    def __init__(
+        self,
+        session_manager: SecretSessionManager,
+        algorithm: str = PLAIN_ALGORITHM,
+        bus: Optional[SdBus] = None,
+        max_size: int = DEFAULT_CACHE_SIZE,
+        ttl: float = DEFAULT_CACHE_TTL,
+        dispatcher: Optional[SecretSignalDispatcher] = None,
+    ) -> None:
+        """
+        :param SecretSessionManager session_manager: Session manager
+            used to retrieve secrets.
+        :param str algorithm: Session algorithm.
+        :param SdBus bus: Use specific bus or session bus by default.
+        :param int max_size: Maximum number of cached secrets and
+            maximum number of cached items properties.
+        :param float ttl: Seconds before an entry expires.
+        :param SecretSignalDispatcher dispatcher: Started signal
+            dispatcher used to receive changed and deleted signals.
+        """
+        self._session_manager = session_manager
+        self._algorithm = algorithm
+        self._bus = bus
+        self._dispatcher = dispatcher
+        # Signals are received from the dispatcher thread
+        self._lock = Lock()
+        self._secrets: ExpiringLruCache[str, Tuple[SecretValue, str]] = (
+            ExpiringLruCache(max_size, ttl))
+        self._properties: ExpiringLruCache[str, ItemProperties] = (
+            ExpiringLruCache(max_size, ttl))
+
+        if dispatcher is not None:
+            dispatcher.connect(ITEM_CHANGED, self._on_item_changed)
+            dispatcher.connect(ITEM_DELETED, self._on_item_changed)
+            dispatcher.connect(
+                COLLECTION_DELETED, self._on_collection_deleted)
+
+    @property
+    def hits(self) -> int:
+        """Number of lookups answered from cache."""
+        return self._secrets.hits + self._properties.hits
+
+    @property
+    def misses(self) -> int:
+        """Number of lookups that called the secrets daemon."""
+        return self._secrets.misses + self._properties.misses
+
+    def get_secret(self, item_path: str) -> Tuple[SecretValue, str]:
+        """Get decoded secret of the item.
+
+        Every call returns a new copy of the cached value that
+        the caller can close. Cached value is wiped once evicted.
+
+        :param str item_path: Object path to item.
+        :returns: Tuple of secret value and content type.
+        :rtype: Tuple[SecretValue,str]
+        """
+        with self._lock:
+            cached_secret = self._secrets.get(item_path)
+            generation = self._secrets.generation
+
+        if cached_secret is None:
+            cipher = self._session_manager.get_cipher(self._algorithm)
+            secret = SecretItem(item_path, self._bus).get_secret(
+                cipher.session_path)
+
+            cached_secret = (cipher.decode(secret), secret[3])
+            with self._lock:
+                self._secrets.put(item_path, cached_secret, generation)
+
+        value, content_type = cached_secret
+        return SecretValue(value, value.content_type), content_type
+
+    def get_properties(self, item_path: str) -> ItemProperties:
+        """Get properties of the item.
+
+        :param str item_path: Object path to item.
+        :returns: Item properties.
+        :rtype: ItemProperties
+        """
+        with self._lock:
+            cached_properties = self._properties.get(item_path)
+            generation = self._properties.generation
+
+        if cached_properties is not None:
+            return cached_properties
+
+        properties = snapshot_item(item_path, self._bus)
+
+        with self._lock:
+            self._properties.put(item_path, properties, generation)
+
+        return properties
+
+    def invalidate(self, item_path: Optional[str] = None) -> None:
+        """Remove cached entries.
+
+        :param str item_path: Only remove entries of this item.
+            By default all entries are removed.
+        """
+        with self._lock:
+            if item_path is None:
+                self._secrets.clear()
+                self._properties.clear()
+            else:
+                self._secrets.discard(item_path)
+                self._properties.discard(item_path)
+
+    def invalidate_collection(self, collection_path: str) -> None:
+        """Remove cached entries of all items in the collection.
+
+        :param str collection_path: Object path to collection.
+        """
+        items_prefix = collection_path + '/'
+        with self._lock:
+            for cache in (self._secrets, self._properties):
+                for item_path in cache.keys():
+                    if item_path.startswith(items_prefix):
+                        cache.discard(item_path)
+
+    def close(self) -> None:
+        """Stop watching signals and remove all entries."""
+        dispatcher = self._dispatcher
+        self._dispatcher = None
+
+        if dispatcher is not None:
+            dispatcher.disconnect(ITEM_CHANGED, self._on_item_changed)
+            dispatcher.disconnect(ITEM_DELETED, self._on_item_changed)
+            dispatcher.disconnect(
+                COLLECTION_DELETED, self._on_collection_deleted)
+
+        self.invalidate()
+
+    def __enter__(self) -> SecretsCache:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _on_item_changed(self, _: str, item_path: str) -> None:
+        self.invalidate(item_path)
+
+    def _on_collection_deleted(self, _: str, collection_path: str) -> None:
+        self.invalidate_collection(collection_path)
@@ -0,0 +1 @@
+../../sdbus_async/secrets/call_policy.py
\ No newline at end of file
@@ -0,0 +1,270 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from os import getpid, register_at_fork
+from threading import Thread, current_thread
+from typing import Any, Callable, Iterable, Optional, Tuple
+from weakref import ref
+
+from sdbus import sd_bus_open
+from sdbus.sd_bus_internals import SdBus
+
+from .cache import DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL, SecretsCache
+from .encryption import PLAIN_ALGORITHM, PlainSessionCipher
+from .objects import SecretService
+from .sessions import SecretSessionManager
+from .values import SecretValue
+
+
+class _ClientState:
+    # Everything that belongs to a connection of a single process.
+    __slots__ = ('pid', 'bus', 'service', 'sessions', 'cache')
+
+    def __init__(
+        self,
+        bus: SdBus,
+        algorithm: str,
+        cache_size: int,
+        cache_ttl: float,
+    ) -> None:
+        self.pid = getpid()
+        self.bus = bus
+        self.service = SecretService(bus)
+        self.sessions = SecretSessionManager(bus)
+        self.cache = SecretsCache(
+            self.sessions, algorithm, bus, cache_size, cache_ttl)
+
+
+class SecretsClient:
+    """Process aware connection, sessions and cache.
+
+    Connection is opened on first use. If the process was forked
+    since then the inherited connection, sessions and cached
+    secrets are discarded without touching them and the child
+    process opens its own connection on first use.
+
+    Objects returned by the client should not be kept across
+    forks. Get them from the client again instead.
+
+    Can be used as a context manager which closes the sessions
+    on exit.
+    """
+
+    def __init__(
+        self,
+        bus_factory: Callable[[], SdBus] = sd_bus_open,
+        algorithm: str = PLAIN_ALGORITHM,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        cache_ttl: float = DEFAULT_CACHE_TTL,
+    ) -> None:
+        """
+        :param Callable[[],SdBus] bus_factory: Function that opens
+            a new connection.
+            By default connects to the same bus as default bus.
+        :param str algorithm: Session algorithm used to get secrets.
+        :param int cache_size: Maximum number of cached secrets.
+        :param float cache_ttl: Seconds before a cached secret expires.
+        """
+        self.algorithm = algorithm
+        self._bus_factory = bus_factory
+        self._cache_size = cache_size
+        self._cache_ttl = cache_ttl
+        self._state: Optional[_ClientState] = None
+        self._warm_up_thread: Optional[Thread] = None
+        self._warm_up_item_paths: Optional[Tuple[str, ...]] = None
+        self._closed = False
+
+    @property
+    def bus(self) -> SdBus:
+        """Connection of the current process."""
+        return self._get_state().bus
+
+    @property
+    def service(self) -> SecretService:
+        """Secret service object using the connection."""
+        return self._get_state().service
+
+    @property
+    def sessions(self) -> SecretSessionManager:
+        """Session manager of the current process."""
+        return self._get_state().sessions
+
+    @property
+    def cache(self) -> SecretsCache:
+        """Secrets cache of the current process."""
+        return self._get_state().cache
+
+    def get_session(self) -> str:
+        """Get object path of the session of the current process.
+
+        :returns: Object path of the session.
+        :rtype: str
+        """
+        return self.sessions.get_session(self.algorithm)
+
+    def get_cipher(self) -> PlainSessionCipher:
+        """Get cipher of the session of the current process.
+
+        :returns: Cipher with negotiated session.
+        :rtype: PlainSessionCipher
+        """
+        return self.sessions.get_cipher(self.algorithm)
+
+    def get_secret(self, item_path: str) -> Tuple[SecretValue, str]:
+        """Get decoded secret of the item through the cache.
+
+        Returned value is a copy owned by the caller and can be
+        closed without affecting the cache.
+
+        :param str item_path: Object path to item.
+        :returns: Tuple of secret value and content type.
+        :rtype: Tuple[SecretValue,str]
+        """
+        return self.cache.get_secret(item_path)
+
+    def warm_up(self, item_paths: Iterable[str] = ()) -> None:
+        """Open the connection and the session and prefetch secrets.
+
+        :param Iterable[str] item_paths: Items which secrets should
+            be cached.
+        """
+        state = self._get_state()
+        state.sessions.get_cipher(self.algorithm)
+
+        for item_path in item_paths:
+            state.cache.get_secret(item_path)
+
+    def warm_up_after_fork(self, item_paths: Iterable[str] = ()) -> None:
+        """Warm up every forked child in a background thread.
+
+        Call in the parent process before forking workers.
+        Each child starts :py:meth:`warm_up` as soon as it is forked
+        so workers warm up concurrently with their own startup
+        instead of on the first request. Calls made by the child
+        while warm up is running wait for it to finish.
+
+        Fork hook is registered once per client. Calling again
+        replaces the items to prefetch. Hook does not keep
+        the client alive. Children forked after :py:meth:`close`
+        do not warm up until this method is called again.
+
+        Errors during warm up are ignored. The child then
+        connects on first use.
+
+        :param Iterable[str] item_paths: Items which secrets should
+            be cached.
+        """
+        already_registered = self._warm_up_item_paths is not None
+        self._warm_up_item_paths = tuple(item_paths)
+        self._closed = False
+
+        if already_registered:
+            return
+
+        # Fork hooks can not be unregistered
+        client_ref = ref(self)
+
+        def start_warm_up() -> None:
+            client = client_ref()
+            if client is not None:
+                client._start_warm_up()
+
+        register_at_fork(after_in_child=start_warm_up)
+
+    def reset(self) -> None:
+        """Discard the connection, sessions and cache without closing.
+
+        Next call opens a new connection.
+        """
+        self._state = None
+
+    def close(self) -> None:
+        """Close sessions of the current process and remove cache.
+
+        Stops warming up children forked later.
+        """
+        state = self._get_existing_state()
+        self._state = None
+        self._closed = True
+
+        if state is not None:
+            state.cache.close()
+            state.sessions.close()
+
+    def __enter__(self) -> SecretsClient:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _get_existing_state(self) -> Optional[_ClientState]:
+        warm_up_thread = self._warm_up_thread
+        if (
+            warm_up_thread is not None
+            and warm_up_thread is not current_thread()
+        ):
+            warm_up_thread.join()
+            self._warm_up_thread = None
+
+        state = self._state
+        if state is not None and state.pid != getpid():
+            # Inherited from the parent process
+            self._state = state = None
+
+        return state
+
+    def _get_state(self) -> _ClientState:
+        state = self._get_existing_state()
+        if state is None:
+            state = _ClientState(
+                self._bus_factory(),
+                self.algorithm,
+                self._cache_size,
+                self._cache_ttl,
+            )
+            self._state = state
+
+        return state
+
+    def _start_warm_up(self) -> None:
+        # Forked child only has the thread that called fork so
+        # any warm up thread belonged to the parent.
+        self._warm_up_thread = None
+        self._state = None
+
+        item_paths = self._warm_up_item_paths
+        if self._closed or item_paths is None:
+            return
+
+        warm_up_thread = Thread(
+            target=self._warm_up_quietly,
+            args=(item_paths, ),
+            name='secrets-warm-up',
+            daemon=True,
+        )
+        self._warm_up_thread = warm_up_thread
+        warm_up_thread.start()
+
+    def _warm_up_quietly(self, item_paths: Tuple[str, ...]) -> None:
+        try:
+            self.warm_up(item_paths)
+        except Exception:
+            self._state = None
@@ -0,0 +1 @@
+../../sdbus_async/secrets/encryption.py
\ No newline at end of file
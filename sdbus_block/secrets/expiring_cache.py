@@ -0,0 +1 @@
+../../sdbus_async/secrets/expiring_cache.py
\ No newline at end of file
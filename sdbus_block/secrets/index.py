@@ -0,0 +1,226 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from functools import partial
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from sdbus import SdBusBaseError
+from sdbus.sd_bus_internals import SdBus
+
+from .attribute_index import AttributeIndex
+from .objects import SecretCollection, SecretItem, SecretService
+from .signals import (
+    COLLECTION_CHANGED,
+    COLLECTION_CREATED,
+    COLLECTION_DELETED,
+    ITEM_CHANGED,
+    ITEM_CREATED,
+    ITEM_DELETED,
+    SecretSignalDispatcher,
+    SignalCallback,
+)
+
+_INDEX_SIGNALS = (
+    ITEM_CREATED,
+    ITEM_CHANGED,
+    ITEM_DELETED,
+    COLLECTION_CREATED,
+    COLLECTION_CHANGED,
+    COLLECTION_DELETED,
+)
+
+
+class SecretsIndex:
+    """Local index of items attributes.
+
+    Loads ``attributes`` property of every item once and answers
+    :py:meth:`search_items` without calling the secrets daemon.
+
+    Blocking interfaces do not have signals. If ``dispatcher`` is
+    passed items and collections signals are queued as they are
+    received and applied by the next lookup from the calling thread,
+    because the connection of the index can not be used from
+    the dispatcher thread. Otherwise the index does not notice
+    changes until :py:meth:`load` is called again.
+
+    Can be used as a context manager which loads the index on enter
+    and stops watching signals on exit.
+    """
+
+    def __init__(
+        self,
+        bus: Optional[SdBus] = None,
+        dispatcher: Optional[SecretSignalDispatcher] = None,
+    ) -> None:
+        """
+        :param SdBus bus: Use specific bus or session bus by default.
+        :param SecretSignalDispatcher dispatcher: Started signal
+            dispatcher used to receive items and collections signals.
+        """
+        self._bus = bus
+        self._index = AttributeIndex()
+        self._dispatcher = dispatcher
+        # Signals are received from the dispatcher thread
+        self._lock = Lock()
+        self._events: List[Tuple[str, str, str]] = []
+        self._callbacks: Dict[str, SignalCallback] = {}
+
+        if dispatcher is not None:
+            for signal_name in _INDEX_SIGNALS:
+                callback = partial(self._queue_event, signal_name)
+                dispatcher.connect(signal_name, callback)
+                self._callbacks[signal_name] = callback
+
+    def load(self) -> None:
+        """Load all collections and items replacing current index."""
+        # Signals received while loading are applied after load
+        # to not be overwritten by older property values.
+        with self._lock:
+            self._events = []
+
+        self._index.clear()
+
+        for collection_path in SecretService(self._bus).collections:
+            self._load_collection(collection_path)
+
+    def search_items(
+        self,
+        attributes: Dict[str, str],
+    ) -> Tuple[List[str], List[str]]:
+        """Find items in any collection.
+
+        Same as :py:meth:`SecretServiceInterface.search_items`
+        but answered locally.
+
+        :param Dict[str,str] attributes: Attributes that should match.
+        :returns: Two arrays of matched object paths.
+            First arrays contains unlocked items and second locked ones.
+        :rtype: Tuple[List[str],List[str]]
+        """
+        self._apply_events()
+        return self._index.search_items(attributes)
+
+    def search_collection_items(
+        self,
+        collection_path: str,
+        attributes: Dict[str, str],
+    ) -> List[str]:
+        """Search for items in a collection.
+
+        Same as :py:meth:`SecretCollectionInterface.search_items`
+        but answered locally.
+
+        :param str collection_path: Object path to collection.
+        :param Dict[str,str] attributes: Attributes that should match.
+        :returns: List of matched items object paths.
+        :rtype: List[str]
+        """
+        self._apply_events()
+        return self._index.search_collection_items(
+            collection_path, attributes)
+
+    def get_attributes(self, item_path: str) -> Optional[Dict[str, str]]:
+        """Get indexed attributes of the item.
+
+        :param str item_path: Object path to item.
+        :returns: Item attributes or None if item is not indexed.
+        :rtype: Optional[Dict[str,str]]
+        """
+        self._apply_events()
+        return self._index.get_attributes(item_path)
+
+    def __len__(self) -> int:
+        self._apply_events()
+        return len(self._index)
+
+    def close(self) -> None:
+        """Stop watching signals and clear the index."""
+        dispatcher = self._dispatcher
+        self._dispatcher = None
+
+        if dispatcher is not None:
+            for signal_name, callback in self._callbacks.items():
+                dispatcher.disconnect(signal_name, callback)
+
+        self._callbacks = {}
+        with self._lock:
+            self._events = []
+
+        self._index.clear()
+
+    def __enter__(self) -> SecretsIndex:
+        self.load()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _load_collection(self, collection_path: str) -> None:
+        collection = SecretCollection(collection_path, self._bus)
+
+        self._index.set_collection_locked(collection_path, collection.locked)
+
+        for item_path in collection.items:
+            self._index.set_item(
+                item_path,
+                collection_path,
+                SecretItem(item_path, self._bus).attributes,
+            )
+
+    def _queue_event(
+        self,
+        event: str,
+        signal_path: str,
+        object_path: str,
+    ) -> None:
+        with self._lock:
+            self._events.append((event, signal_path, object_path))
+
+    def _apply_events(self) -> None:
+        with self._lock:
+            events = self._events
+            self._events = []
+
+        for event, signal_path, object_path in events:
+            try:
+                if event in (ITEM_CREATED, ITEM_CHANGED):
+                    self._index.set_item(
+                        object_path,
+                        signal_path,
+                        SecretItem(object_path, self._bus).attributes,
+                    )
+                elif event == ITEM_DELETED:
+                    self._index.remove_item(object_path)
+                elif event == COLLECTION_CREATED:
+                    self._load_collection(object_path)
+                elif event == COLLECTION_CHANGED:
+                    self._index.set_collection_locked(
+                        object_path,
+                        SecretCollection(object_path, self._bus).locked,
+                    )
+                elif event == COLLECTION_DELETED:
+                    self._index.remove_collection(object_path)
+            except SdBusBaseError:
+                # Object might have been deleted before its
+                # properties were read. Its deleted signal
+                # will follow.
+                ...
@@ -0,0 +1,159 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from time import perf_counter
+from types import FunctionType, MethodType
+from typing import Any, Optional, TypeVar, cast
+
+from .metrics import METHOD_MEMBER, MetricsSink, dbus_member, payload_size
+
+T = TypeVar('T')
+
+
+def instrument(proxy: T, sink: Optional[MetricsSink]) -> T:
+    """Measure every D-Bus call made through the proxy.
+
+    Methods calls and properties reads and writes are recorded in
+    the sink with latency, request and reply sizes and raised errors.
+    Other methods of the proxy are called with the instrumented proxy
+    so calls they make are measured too.
+
+    :param proxy: Any proxy object, for example :py:class:`SecretService`.
+    :param MetricsSink sink: Sink to record measurements in.
+        If None the proxy is returned unchanged so disabled metrics
+        cost nothing.
+    :returns: Instrumented proxy with the same interface.
+    """
+    if sink is None:
+        return proxy
+
+    return cast(T, _InstrumentedProxy(proxy, sink))
+
+
+class _InstrumentedProxy:
+    def __init__(self, proxy: Any, sink: MetricsSink) -> None:
+        object.__setattr__(self, '_proxy', proxy)
+        object.__setattr__(self, '_sink', sink)
+
+    def __getattr__(self, name: str) -> Any:
+        proxy = self._proxy
+        member = dbus_member(type(proxy), name)
+        if member is None:
+            value = getattr(proxy, name)
+            if (
+                isinstance(value, MethodType)
+                and value.__self__ is proxy
+                and isinstance(value.__func__, FunctionType)
+            ):
+                return MethodType(value.__func__, self)
+
+            return value
+
+        member_kind, member_name = member
+        if member_kind == METHOD_MEMBER:
+            return _InstrumentedMethod(
+                getattr(proxy, name), member_name, self._sink)
+
+        start_time = perf_counter()
+        try:
+            value = getattr(proxy, name)
+        except Exception as error:
+            self._sink.record(
+                member_name, perf_counter() - start_time, 0, 0, error)
+            raise
+
+        self._sink.record(
+            member_name,
+            perf_counter() - start_time,
+            0,
+            payload_size(value),
+            None,
+        )
+        return value
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        proxy = self._proxy
+        member = dbus_member(type(proxy), name)
+        if member is None:
+            setattr(proxy, name, value)
+            return
+
+        _, member_name = member
+        start_time = perf_counter()
+        try:
+            setattr(proxy, name, value)
+        except Exception as error:
+            self._sink.record(
+                member_name,
+                perf_counter() - start_time,
+                payload_size(value),
+                0,
+                error,
+            )
+            raise
+
+        self._sink.record(
+            member_name,
+            perf_counter() - start_time,
+            payload_size(value),
+            0,
+            None,
+        )
+
+    def __repr__(self) -> str:
+        return f'instrument({self._proxy!r}, {self._sink!r})'
+
+
+class _InstrumentedMethod:
+    __slots__ = ('_method', '_member_name', '_sink')
+
+    def __init__(
+        self,
+        method: Any,
+        member_name: str,
+        sink: MetricsSink,
+    ) -> None:
+        self._method = method
+        self._member_name = member_name
+        self._sink = sink
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        start_time = perf_counter()
+        try:
+            reply = self._method(*args, **kwargs)
+        except Exception as error:
+            self._sink.record(
+                self._member_name,
+                perf_counter() - start_time,
+                payload_size((args, kwargs)),
+                0,
+                error,
+            )
+            raise
+
+        self._sink.record(
+            self._member_name,
+            perf_counter() - start_time,
+            payload_size((args, kwargs)),
+            payload_size(reply),
+            None,
+        )
+        return reply
@@ -0,0 +1 @@
+../../sdbus_async/secrets/metrics.py
\ No newline at end of file
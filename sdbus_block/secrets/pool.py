@@ -0,0 +1,338 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from contextlib import contextmanager
+from threading import Condition
+from time import monotonic
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional
+
+from sdbus import DbusDisconnectedError, sd_bus_open
+from sdbus.sd_bus_internals import SdBus
+
+from .encryption import PLAIN_ALGORITHM, PlainSessionCipher
+from .objects import SecretService
+from .sessions import SecretSessionManager
+
+DEFAULT_POOL_SIZE = 8
+
+
+class PoolTimeoutError(TimeoutError):
+    """No connection was returned to the pool in time."""
+
+
+class PoolStats(NamedTuple):
+    """Usage statistics of a connection pool read at once."""
+
+    max_size: int
+    """Maximum number of connections."""
+    size: int
+    """Number of opened connections."""
+    in_use: int
+    """Number of checked out connections."""
+    checkouts: int
+    """Total number of checkouts."""
+    waits: int
+    """Number of checkouts that waited for a free connection."""
+    timeouts: int
+    """Number of checkouts that gave up waiting."""
+    total_wait_seconds: float
+    """Total time spent waiting for free connections."""
+    max_wait_seconds: float
+    """Longest wait for a free connection."""
+
+    @property
+    def utilization(self) -> float:
+        """Share of the maximum connections that are checked out."""
+        return self.in_use / self.max_size
+
+    @property
+    def mean_wait_seconds(self) -> float:
+        """Average wait of checkouts that had to wait."""
+        if not self.waits:
+            return 0.0
+
+        return self.total_wait_seconds / self.waits
+
+
+class PooledConnection:
+    """Connection owned by a pool.
+
+    Must only be used by the thread that checked it out and
+    only until it is returned to the pool.
+    """
+
+    def __init__(self, bus: SdBus) -> None:
+        """
+        :param SdBus bus: Connection to the bus.
+        """
+        self.bus = bus
+        """Connection to the bus."""
+        self.sessions = SecretSessionManager(bus)
+        """Session manager of this connection."""
+        self.service = SecretService(bus)
+        """Secret service object using this connection."""
+
+    def get_session(self, algorithm: str = PLAIN_ALGORITHM) -> str:
+        """Get object path of the session cached by this connection.
+
+        :param str algorithm: Session algorithm.
+        :returns: Object path of the session.
+        :rtype: str
+        """
+        return self.sessions.get_session(algorithm)
+
+    def get_cipher(
+        self,
+        algorithm: str = PLAIN_ALGORITHM,
+    ) -> PlainSessionCipher:
+        """Get cipher of the session cached by this connection.
+
+        :param str algorithm: Session algorithm.
+        :returns: Cipher with negotiated session.
+        :rtype: PlainSessionCipher
+        """
+        return self.sessions.get_cipher(algorithm)
+
+    def close(self) -> None:
+        """Close sessions opened by this connection and the connection."""
+        try:
+            self.sessions.close()
+        finally:
+            self.bus.close()
+
+
+class SecretConnectionPool:
+    """Bounded pool of connections for multi-threaded programs.
+
+    A connection can not be used by several threads at once.
+    The pool opens up to ``max_size`` connections on demand and
+    lends each one to a single thread at a time. Every connection
+    keeps its own sessions so checking out a connection does not
+    negotiate a new session.
+
+    Threads wait for a connection to be returned once all
+    connections are checked out.
+
+    Can be used as a context manager which closes all
+    connections on exit.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_POOL_SIZE,
+        bus_factory: Callable[[], SdBus] = sd_bus_open,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        :param int max_size: Maximum number of connections.
+        :param Callable[[],SdBus] bus_factory: Function that opens
+            a new connection.
+            By default connects to the same bus as default bus.
+        :param float timeout: Default number of seconds to wait
+            for a free connection. By default waits forever.
+        """
+        if max_size < 1:
+            raise ValueError('Pool size must be positive')
+
+        self.max_size = max_size
+        self.timeout = timeout
+        self._bus_factory = bus_factory
+        self._condition = Condition()
+        self._idle: List[PooledConnection] = []
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    @property
+    def stats(self) -> PoolStats:
+        """Current usage statistics."""
+        with self._condition:
+            return PoolStats(
+                self.max_size,
+                self._size,
+                self._in_use,
+                self._checkouts,
+                self._waits,
+                self._timeouts,
+                self._total_wait_seconds,
+                self._max_wait_seconds,
+            )
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Check out a connection.
+
+        Prefer :py:meth:`connection` which always returns
+        the connection to the pool.
+
+        :param float timeout: Seconds to wait for a free connection.
+            By default uses the pool timeout.
+        :returns: Connection for exclusive use of the calling thread.
+        :rtype: PooledConnection
+        :raises PoolTimeoutError: No connection became free in time.
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        with self._condition:
+            self._check_open()
+
+            if not self._idle and self._size >= self.max_size:
+                self._wait(timeout)
+
+            self._checkouts += 1
+            self._in_use += 1
+
+            if self._idle:
+                return self._idle.pop()
+
+            # Reserve the slot so other threads do not
+            # open more than max_size connections.
+            self._size += 1
+
+        try:
+            return PooledConnection(self._bus_factory())
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, connection: PooledConnection) -> None:
+        """Return a connection to the pool.
+
+        :param PooledConnection connection: Connection returned
+            by :py:meth:`acquire`.
+        """
+        with self._condition:
+            self._in_use -= 1
+
+            if not self._closed:
+                self._idle.append(connection)
+                self._condition.notify()
+                return
+
+            self._size -= 1
+
+        connection.close()
+
+    def discard(self, connection: PooledConnection) -> None:
+        """Close a broken connection instead of returning it.
+
+        Next checkout opens a new connection in its place.
+
+        :param PooledConnection connection: Connection returned
+            by :py:meth:`acquire`.
+        """
+        with self._condition:
+            self._in_use -= 1
+            self._size -= 1
+            self._condition.notify()
+
+        # Sessions can not be closed over a broken connection
+        connection.sessions.invalidate()
+        connection.bus.close()
+
+    @contextmanager
+    def connection(
+        self,
+        timeout: Optional[float] = None,
+    ) -> Iterator[PooledConnection]:
+        """Check out a connection for the duration of the block.
+
+        Connection is discarded if the block raises
+        :py:exc:`sdbus.DbusDisconnectedError`.
+
+        .. code-block:: python
+
+            with pool.connection() as connection:
+                connection.service.search_items({'Attr': 'value'})
+
+        :param float timeout: Seconds to wait for a free connection.
+            By default uses the pool timeout.
+        :raises PoolTimeoutError: No connection became free in time.
+        """
+        pooled_connection = self.acquire(timeout)
+        try:
+            yield pooled_connection
+        except DbusDisconnectedError:
+            self.discard(pooled_connection)
+            raise
+        except BaseException:
+            self.release(pooled_connection)
+            raise
+
+        self.release(pooled_connection)
+
+    def close(self) -> None:
+        """Close idle connections.
+
+        Checked out connections are closed once returned.
+        """
+        with self._condition:
+            self._closed = True
+            idle = self._idle
+            self._idle = []
+            self._size -= len(idle)
+            self._condition.notify_all()
+
+        for connection in idle:
+            connection.close()
+
+    def __enter__(self) -> SecretConnectionPool:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _check_open(self) -> None:
+        if self._closed:
+            raise RuntimeError('Pool is closed')
+
+    def _wait(self, timeout: Optional[float]) -> None:
+        started_at = monotonic()
+        self._waits += 1
+
+        try:
+            is_free = self._condition.wait_for(
+                lambda: (
+                    self._closed
+                    or bool(self._idle)
+                    or self._size < self.max_size
+                ),
+                timeout,
+            )
+        finally:
+            waited = monotonic() - started_at
+            self._total_wait_seconds += waited
+            self._max_wait_seconds = max(self._max_wait_seconds, waited)
+
+        if not is_free:
+            self._timeouts += 1
+            raise PoolTimeoutError('No free connection in the pool')
+
+        self._check_open()
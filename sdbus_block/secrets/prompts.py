@@ -0,0 +1,113 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from asyncio import get_running_loop, run
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Optional, Tuple
+
+from sdbus import sd_bus_open
+from sdbus.sd_bus_internals import SdBus
+from sdbus_async.secrets.prompts import await_prompt as _await_prompt_async
+
+if TYPE_CHECKING:
+    from .signals import SecretSignalDispatcher
+
+NO_PROMPT_PATH = '/'
+
+
+def await_prompt(
+    prompt_path: str,
+    window_id: str = '',
+    timeout: Optional[float] = None,
+    bus: Optional[SdBus] = None,
+    dispatcher: Optional[SecretSignalDispatcher] = None,
+) -> Tuple[bool, Any]:
+    """Show the prompt and block until it completes.
+
+    Blocking API can not receive signals so the prompt is shown and
+    waited on by a temporary event loop. By default the loop uses
+    a private connection to the default bus that is closed once
+    the prompt completes. Daemons that only send
+    :py:meth:`SecretPromptInterface.completed` to the connection
+    that requested the prompt should be waited on with the ``bus``
+    the prompt was received from.
+
+    If the calling thread already runs an event loop the temporary
+    loop runs in a separate thread.
+
+    If a :py:class:`sdbus_block.secrets.signals.SecretSignalDispatcher`
+    is passed its connection and thread are used instead and
+    no temporary event loop is created.
+
+    If the wait is interrupted or times out the prompt is dismissed.
+
+    :param str prompt_path: Object path to prompt as returned by
+        methods such as :py:meth:`SecretServiceInterface.unlock`.
+        If the path is ``/`` no prompt is necessary and
+        the function returns immediately.
+    :param str window_id: Platform specific window handle to use
+        for showing the prompt.
+    :param float timeout: Seconds to wait for the prompt to complete.
+        By default waits forever.
+    :param SdBus bus: Show and wait for the prompt on this connection.
+        Connection should not be used by other threads until
+        the function returns.
+    :param SecretSignalDispatcher dispatcher: Started dispatcher
+        to wait for the prompt with.
+    :returns: Tuple of whether the prompt was dismissed and
+        the operation specific result.
+        Result is None if no prompt was necessary.
+    :rtype: Tuple[bool,Any]
+    :raises asyncio.TimeoutError: Prompt did not complete in time.
+    """
+    if prompt_path == NO_PROMPT_PATH:
+        return False, None
+
+    if dispatcher is not None:
+        return dispatcher.await_prompt(prompt_path, window_id, timeout)
+
+    coroutine = _await_prompt_on_bus(prompt_path, window_id, timeout, bus)
+    try:
+        get_running_loop()
+    except RuntimeError:
+        return run(coroutine)
+
+    # Event loop can not be started from a running one
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(run, coroutine).result()
+
+
+async def _await_prompt_on_bus(
+    prompt_path: str,
+    window_id: str,
+    timeout: Optional[float],
+    bus: Optional[SdBus],
+) -> Tuple[bool, Any]:
+    if bus is not None:
+        return await _await_prompt_async(
+            prompt_path, window_id, timeout, bus)
+
+    private_bus = sd_bus_open()
+    try:
+        return await _await_prompt_async(
+            prompt_path, window_id, timeout, private_bus)
+    finally:
+        private_bus.close()
@@ -0,0 +1,146 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from threading import Lock
+from typing import Any, List, Optional
+from weakref import WeakValueDictionary
+
+from sdbus.sd_bus_internals import SdBus
+
+from .objects import SecretCollection, SecretItem
+from .signals import COLLECTION_DELETED, ITEM_DELETED, SecretSignalDispatcher
+
+
+class SecretProxyFactory:
+    """Returns the same proxy object for the same object path.
+
+    Proxies are bound to one bus and held through weak references
+    so unused proxies are garbage collected.
+
+    Blocking API can not receive signals. If ``dispatcher`` is passed
+    proxies are forgotten as soon as ``ItemDeleted`` or
+    ``CollectionDeleted`` signals are received for them.
+
+    Can be used as a context manager which stops watching signals
+    on exit.
+    """
+
+    def __init__(
+        self,
+        bus: Optional[SdBus] = None,
+        dispatcher: Optional[SecretSignalDispatcher] = None,
+    ) -> None:
+        """
+        :param SdBus bus: Use specific bus or session bus by default.
+        :param SecretSignalDispatcher dispatcher: Started signal
+            dispatcher used to receive deleted signals.
+        """
+        self._bus = bus
+        self._dispatcher = dispatcher
+        # Signals are received from the dispatcher thread
+        self._lock = Lock()
+        self._items: WeakValueDictionary[str, SecretItem] = (
+            WeakValueDictionary())
+        self._collections: WeakValueDictionary[str, SecretCollection] = (
+            WeakValueDictionary())
+
+        if dispatcher is not None:
+            dispatcher.connect(ITEM_DELETED, self._on_deleted)
+            dispatcher.connect(COLLECTION_DELETED, self._on_deleted)
+
+    def item(self, item_path: str) -> SecretItem:
+        """Get proxy to the item.
+
+        :param str item_path: Object path to item.
+        :returns: Item proxy.
+        :rtype: SecretItem
+        """
+        with self._lock:
+            item = self._items.get(item_path)
+            if item is None:
+                item = SecretItem(item_path, self._bus)
+                self._items[item_path] = item
+
+        return item
+
+    def items(self, items_paths: List[str]) -> List[SecretItem]:
+        """Get proxies to many items.
+
+        :param List[str] items_paths: List of object paths to items.
+        :returns: List of items proxies in the same order
+            as ``items_paths``.
+        :rtype: List[SecretItem]
+        """
+        return [self.item(item_path) for item_path in items_paths]
+
+    def collection(self, collection_path: str) -> SecretCollection:
+        """Get proxy to the collection.
+
+        :param str collection_path: Object path to collection.
+        :returns: Collection proxy.
+        :rtype: SecretCollection
+        """
+        with self._lock:
+            collection = self._collections.get(collection_path)
+            if collection is None:
+                collection = SecretCollection(collection_path, self._bus)
+                self._collections[collection_path] = collection
+
+        return collection
+
+    def forget(self, object_path: str) -> None:
+        """Forget proxy of the item or the collection and its items.
+
+        :param str object_path: Object path to item or collection.
+        """
+        with self._lock:
+            self._items.pop(object_path, None)
+            self._collections.pop(object_path, None)
+
+            items_prefix = object_path + '/'
+            for item_path in list(self._items.keys()):
+                if item_path.startswith(items_prefix):
+                    self._items.pop(item_path, None)
+
+    def __len__(self) -> int:
+        return len(self._items) + len(self._collections)
+
+    def close(self) -> None:
+        """Stop watching signals and forget all proxies."""
+        dispatcher = self._dispatcher
+        self._dispatcher = None
+
+        if dispatcher is not None:
+            dispatcher.disconnect(ITEM_DELETED, self._on_deleted)
+            dispatcher.disconnect(COLLECTION_DELETED, self._on_deleted)
+
+        with self._lock:
+            self._items.clear()
+            self._collections.clear()
+
+    def __enter__(self) -> SecretProxyFactory:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _on_deleted(self, _: str, object_path: str) -> None:
+        self.forget(object_path)
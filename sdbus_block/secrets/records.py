@@ -0,0 +1 @@
+../../sdbus_async/secrets/records.py
\ No newline at end of file
@@ -0,0 +1,167 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from time import monotonic, sleep
+from types import FunctionType, MethodType
+from typing import Any, Callable, TypeVar, cast
+
+from .call_policy import CallPolicy, DeadlineExceededError
+from .metrics import METHOD_MEMBER, dbus_member
+
+T = TypeVar('T')
+
+
+def with_policy(proxy: T, policy: CallPolicy) -> T:
+    """Apply deadline, retries and circuit breaker to proxy calls.
+
+    Idempotent methods and properties reads are retried when the daemon
+    does not reply. Blocking calls can not be interrupted so the policy
+    deadline is checked between attempts. Set the bus
+    ``method_call_timeout_usec`` to limit a single attempt.
+
+    :param proxy: Any proxy object, for example :py:class:`SecretService`.
+    :param CallPolicy policy: Policy to apply.
+    :returns: Proxy with the same interface.
+    """
+    return cast(T, _PolicyProxy(proxy, policy))
+
+
+def call_with_policy(
+    policy: CallPolicy,
+    call: Callable[[], T],
+    idempotent: bool,
+) -> T:
+    """Make the call under the policy.
+
+    :param CallPolicy policy: Policy to apply.
+    :param call: Function that makes a new attempt of the call.
+    :param bool idempotent: Can the call be retried.
+    :returns: Result of the call.
+    :raises DeadlineExceededError: Deadline passed.
+    :raises CircuitOpenError: Circuit breaker rejected the call.
+    """
+    deadline = policy.deadline()
+    circuit_breaker = policy.circuit_breaker
+    attempt = 0
+
+    while True:
+        if deadline is not None and monotonic() >= deadline:
+            raise DeadlineExceededError(
+                f'No reply in {policy.timeout} seconds')
+
+        if circuit_breaker is not None:
+            circuit_breaker.before_call()
+
+        try:
+            result = call()
+        except policy.transient_errors:
+            if circuit_breaker is not None:
+                circuit_breaker.record_failure()
+
+            if not idempotent or attempt >= policy.retries:
+                raise
+
+            delay = policy.backoff_delay(attempt)
+            if deadline is not None and monotonic() + delay >= deadline:
+                raise
+        except Exception:
+            # Daemon replied with an error so it is available
+            if circuit_breaker is not None:
+                circuit_breaker.record_success()
+
+            raise
+        except BaseException:
+            if circuit_breaker is not None:
+                circuit_breaker.release()
+
+            raise
+        else:
+            if circuit_breaker is not None:
+                circuit_breaker.record_success()
+
+            return result
+
+        sleep(delay)
+        attempt += 1
+
+
+class _PolicyProxy:
+    def __init__(self, proxy: Any, policy: CallPolicy) -> None:
+        object.__setattr__(self, '_proxy', proxy)
+        object.__setattr__(self, '_policy', policy)
+
+    def __getattr__(self, name: str) -> Any:
+        proxy = self._proxy
+        member = dbus_member(type(proxy), name)
+        if member is None:
+            value = getattr(proxy, name)
+            if (
+                isinstance(value, MethodType)
+                and value.__self__ is proxy
+                and isinstance(value.__func__, FunctionType)
+            ):
+                return MethodType(value.__func__, self)
+
+            return value
+
+        member_kind, member_name = member
+        if member_kind == METHOD_MEMBER:
+            return _PolicyMethod(
+                getattr(proxy, name),
+                self._policy,
+                member_name in self._policy.idempotent_methods,
+            )
+
+        return call_with_policy(
+            self._policy, lambda: getattr(proxy, name), True)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        proxy = self._proxy
+        if dbus_member(type(proxy), name) is None:
+            setattr(proxy, name, value)
+            return
+
+        call_with_policy(
+            self._policy, lambda: setattr(proxy, name, value), False)
+
+    def __repr__(self) -> str:
+        return f'with_policy({self._proxy!r}, {self._policy!r})'
+
+
+class _PolicyMethod:
+    __slots__ = ('_method', '_policy', '_idempotent')
+
+    def __init__(
+        self,
+        method: Any,
+        policy: CallPolicy,
+        idempotent: bool,
+    ) -> None:
+        self._method = method
+        self._policy = policy
+        self._idempotent = idempotent
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return call_with_policy(
+            self._policy,
+            lambda: self._method(*args, **kwargs),
+            self._idempotent,
+        )
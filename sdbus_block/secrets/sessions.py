@@ -0,0 +1,159 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from time import monotonic
+from typing import Any, Dict, Optional
+
+from sdbus import DbusNameHasNoOwnerError
+from sdbus.sd_bus_internals import SdBus
+from sdbus_block.dbus_daemon import FreedesktopDbus
+
+from .encryption import (
+    PLAIN_ALGORITHM,
+    PlainSessionCipher,
+    new_session_cipher,
+)
+from .objects import SECRET_SERVICE_BUS_NAME, SecretService, SecretSession
+
+
+class SecretSessionManager:
+    """Shared sessions to the secrets daemon.
+
+    Opens at most one session per algorithm on the bus and hands
+    the same session to every caller. Key material of encrypted
+    sessions is negotiated once and kept for the session lifetime.
+
+    Blocking interfaces do not have signals and ``NameOwnerChanged``
+    is not delivered by
+    :py:class:`sdbus_block.secrets.signals.SecretSignalDispatcher`,
+    so the owner of ``org.freedesktop.secrets`` name is checked at most
+    once per ``owner_check_interval`` seconds. If the daemon was
+    restarted the sessions are forgotten and a new session is opened.
+
+    Can be used as a context manager which closes all
+    sessions on exit.
+    """
+
+    def __init__(
+        self,
+        bus: Optional[SdBus] = None,
+        owner_check_interval: float = 1.0,
+    ) -> None:
+        """
+        :param SdBus bus: Use specific bus or session bus by default.
+        :param float owner_check_interval: Minimal number of seconds
+            between checks of the daemon name owner.
+        """
+        self._bus = bus
+        self._service = SecretService(bus)
+        self._dbus_daemon = FreedesktopDbus(bus)
+        self._sessions: Dict[str, PlainSessionCipher] = {}
+        self.owner_check_interval = owner_check_interval
+        self._owner: Optional[str] = None
+        self._owner_checked_at = 0.0
+
+    def get_session(
+        self,
+        algorithm: str = PLAIN_ALGORITHM,
+    ) -> str:
+        """Get object path of the shared session.
+
+        Session is opened on the first call.
+
+        :param str algorithm: Session algorithm.
+        :returns: Object path of the session.
+        :rtype: str
+        """
+        return self.get_cipher(algorithm).session_path
+
+    def get_cipher(
+        self,
+        algorithm: str = PLAIN_ALGORITHM,
+    ) -> PlainSessionCipher:
+        """Get cipher of the shared session.
+
+        Cipher is used to encode and decode secret data of the session.
+
+        :param str algorithm: Session algorithm.
+            See :py:func:`new_session_cipher` for supported algorithms.
+        :returns: Cipher with negotiated session.
+        :rtype: PlainSessionCipher
+        """
+        self._check_owner()
+
+        cipher = self._sessions.get(algorithm)
+        if cipher is not None:
+            return cipher
+
+        cipher = new_session_cipher(algorithm)
+        output, session_path = self._service.open_session(
+            cipher.algorithm, cipher.input)
+        cipher.negotiate(output, session_path)
+        # Opening session might have activated the daemon
+        self._owner = self._get_owner()
+        self._sessions[algorithm] = cipher
+        return cipher
+
+    def invalidate(self, algorithm: Optional[str] = None) -> None:
+        """Forget sessions without closing them.
+
+        Use this if the daemon reported that the session
+        no longer exists.
+
+        :param str algorithm: Only forget the session of this
+            algorithm. By default all sessions are forgotten.
+        """
+        if algorithm is None:
+            self._sessions.clear()
+        else:
+            self._sessions.pop(algorithm, None)
+
+    def close(self) -> None:
+        """Close all opened sessions."""
+        sessions = self._sessions
+        self._sessions = {}
+
+        for cipher in sessions.values():
+            SecretSession(cipher.session_path, self._bus).close()
+
+    def __enter__(self) -> SecretSessionManager:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _check_owner(self) -> None:
+        now = monotonic()
+        if now - self._owner_checked_at < self.owner_check_interval:
+            return
+
+        owner = self._get_owner()
+        if owner != self._owner:
+            self.invalidate()
+            self._owner = owner
+
+        self._owner_checked_at = now
+
+    def _get_owner(self) -> Optional[str]:
+        try:
+            return self._dbus_daemon.get_name_owner(SECRET_SERVICE_BUS_NAME)
+        except DbusNameHasNoOwnerError:
+            return None
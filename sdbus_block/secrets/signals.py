@@ -0,0 +1,332 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+# Copyright (C) 2020, 2021 igo95862
+
+# This file is part of python-sdbus
+
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
+from __future__ import annotations
+
+from asyncio import (
+    AbstractEventLoop,
+    Task,
+    gather,
+    get_running_loop,
+    new_event_loop,
+    run_coroutine_threadsafe,
+    sleep,
+)
+from queue import Queue
+from threading import Thread
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Coroutine,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from sdbus import sd_bus_open
+from sdbus.sd_bus_internals import SdBus
+from sdbus_async.dbus_daemon import FreedesktopDbus
+from sdbus_async.secrets.interfaces import (
+    SecretCollectionInterface,
+    SecretPromptInterface,
+    SecretServiceInterface,
+)
+from sdbus_async.secrets.prompts import await_prompt
+
+from .objects import SECRET_SERVICE_BUS_NAME
+
+if TYPE_CHECKING:
+    from sdbus.dbus_proxy_async_signal import DbusSignalAsync
+
+T = TypeVar('T')
+
+SignalCallback = Callable[[str, Any], None]
+
+ITEM_CREATED = 'item_created'
+ITEM_CHANGED = 'item_changed'
+ITEM_DELETED = 'item_deleted'
+COLLECTION_CREATED = 'collection_created'
+COLLECTION_CHANGED = 'collection_changed'
+COLLECTION_DELETED = 'collection_deleted'
+PROMPT_COMPLETED = 'prompt_completed'
+
+_SIGNALS: Dict[str, DbusSignalAsync[Any]] = {
+    ITEM_CREATED: SecretCollectionInterface.item_created,
+    ITEM_CHANGED: SecretCollectionInterface.item_changed,
+    ITEM_DELETED: SecretCollectionInterface.item_deleted,
+    COLLECTION_CREATED: SecretServiceInterface.collection_created,
+    COLLECTION_CHANGED: SecretServiceInterface.collection_changed,
+    COLLECTION_DELETED: SecretServiceInterface.collection_deleted,
+    PROMPT_COMPLETED: SecretPromptInterface.completed,
+}
+
+
+class SecretSignalDispatcher:
+    """Delivers secrets daemon signals to blocking code.
+
+    Blocking interfaces do not have signals. The dispatcher owns
+    a separate connection that is processed by a background thread
+    and passes received signals to callbacks or queues.
+
+    Signal names are ``item_created``, ``item_changed``,
+    ``item_deleted``, ``collection_created``, ``collection_changed``,
+    ``collection_deleted`` and ``prompt_completed``.
+    Every signal is delivered as a tuple of object path that emitted
+    the signal and signal data. For example, ``item_changed`` is
+    delivered as collection path and item path.
+
+    Callbacks are called from the dispatcher thread and should not
+    block or call dispatcher methods. Exceptions raised by callbacks
+    are passed to the event loop exception handler.
+
+    Can be used as a context manager which starts the dispatcher
+    on enter and stops it on exit.
+
+    Only available in blocking API and not exported from
+    :py:mod:`sdbus_block.secrets`.
+    """
+
+    def __init__(
+        self,
+        bus_factory: Callable[[], SdBus] = sd_bus_open,
+    ) -> None:
+        """
+        :param Callable[[],SdBus] bus_factory: Function that opens
+            the dispatcher connection.
+            By default connects to the same bus as default bus.
+        """
+        self._bus_factory = bus_factory
+        self._loop: Optional[AbstractEventLoop] = None
+        self._thread: Optional[Thread] = None
+        self._bus: Optional[SdBus] = None
+        self._callbacks: Dict[str, List[SignalCallback]] = {}
+        self._tasks: Dict[str, Task[None]] = {}
+        self._queues_callbacks: Dict[
+            Tuple[str, Queue[Tuple[str, Any]]], SignalCallback] = {}
+
+    def start(self) -> None:
+        """Start the dispatcher thread and open the connection."""
+        if self._loop is not None:
+            raise RuntimeError('Dispatcher is already started')
+
+        self._loop = new_event_loop()
+        self._thread = Thread(
+            target=self._loop.run_forever,
+            name='secrets-signals',
+            daemon=True,
+        )
+        self._thread.start()
+
+        try:
+            self._call(self._open())
+        except BaseException:
+            self._stop_thread()
+            raise
+
+    def connect(self, signal_name: str, callback: SignalCallback) -> None:
+        """Call a function for every received signal.
+
+        Signals emitted after this method returns
+        are guaranteed to be delivered.
+
+        :param str signal_name: Name of the signal.
+        :param Callable[[str,Any],None] callback: Function called
+            with object path and signal data.
+        :raises KeyError: Unknown signal name.
+        """
+        if signal_name not in _SIGNALS:
+            raise KeyError(signal_name)
+
+        self._call(self._connect(signal_name, callback))
+
+    def disconnect(self, signal_name: str, callback: SignalCallback) -> None:
+        """Stop calling the function for the signal.
+
+        :param str signal_name: Name of the signal.
+        :param Callable[[str,Any],None] callback: Previously
+            connected function.
+        :raises ValueError: Function is not connected to the signal.
+        """
+        self._call(self._disconnect(signal_name, callback))
+
+    def subscribe(self, signal_name: str) -> Queue[Tuple[str, Any]]:
+        """Get a queue of received signals.
+
+        :param str signal_name: Name of the signal.
+        :returns: Queue that receives tuples of object path and
+            signal data.
+        :rtype: queue.Queue[Tuple[str,Any]]
+        :raises KeyError: Unknown signal name.
+        """
+        signals_queue: Queue[Tuple[str, Any]] = Queue()
+
+        def put_signal(object_path: str, signal_data: Any) -> None:
+            signals_queue.put_nowait((object_path, signal_data))
+
+        self.connect(signal_name, put_signal)
+        self._queues_callbacks[signal_name, signals_queue] = put_signal
+        return signals_queue
+
+    def unsubscribe(
+        self,
+        signal_name: str,
+        signals_queue: Queue[Tuple[str, Any]],
+    ) -> None:
+        """Stop putting signals to the queue.
+
+        :param str signal_name: Name of the signal.
+        :param queue.Queue[Tuple[str,Any]] signals_queue: Queue
+            returned by :py:meth:`subscribe`.
+        :raises ValueError: Queue is not subscribed to the signal.
+        """
+        try:
+            put_signal = self._queues_callbacks.pop(
+                (signal_name, signals_queue))
+        except KeyError:
+            raise ValueError('Queue is not subscribed to the signal')
+
+        self.disconnect(signal_name, put_signal)
+
+    def await_prompt(
+        self,
+        prompt_path: str,
+        window_id: str = '',
+        timeout: Optional[float] = None,
+    ) -> Tuple[bool, Any]:
+        """Show the prompt from the dispatcher connection and wait for it.
+
+        Same as :py:func:`await_prompt` but reuses the dispatcher
+        connection instead of opening a new one.
+
+        :param str prompt_path: Object path to prompt.
+        :param str window_id: Platform specific window handle to use
+            for showing the prompt.
+        :param float timeout: Seconds to wait for the prompt to complete.
+            By default waits forever.
+        :returns: Tuple of whether the prompt was dismissed and
+            the operation specific result.
+        :rtype: Tuple[bool,Any]
+        :raises asyncio.TimeoutError: Prompt did not complete in time.
+        """
+        return self._call(
+            await_prompt(prompt_path, window_id, timeout, self._bus))
+
+    def close(self) -> None:
+        """Stop receiving signals, close the connection and
+        stop the dispatcher thread."""
+        if self._loop is None:
+            return
+
+        try:
+            self._call(self._close())
+        finally:
+            self._stop_thread()
+
+    def __enter__(self) -> SecretSignalDispatcher:
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _call(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        if self._loop is None:
+            coroutine.close()
+            raise RuntimeError('Dispatcher is not started')
+
+        return run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def _stop_thread(self) -> None:
+        loop = self._loop
+        thread = self._thread
+        assert loop is not None
+        assert thread is not None
+
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+        self._loop = None
+        self._thread = None
+
+    async def _open(self) -> None:
+        self._bus = self._bus_factory()
+
+    async def _connect(
+        self,
+        signal_name: str,
+        callback: SignalCallback,
+    ) -> None:
+        self._callbacks.setdefault(signal_name, []).append(callback)
+
+        if signal_name in self._tasks:
+            return
+
+        self._tasks[signal_name] = get_running_loop().create_task(
+            self._watch(signal_name))
+        # Let the task send its match rule. Messages of a connection
+        # are processed in order so once a reply to the following
+        # call arrives the match rule is active.
+        await sleep(0)
+        await FreedesktopDbus(self._bus).get_id()
+
+    async def _disconnect(
+        self,
+        signal_name: str,
+        callback: SignalCallback,
+    ) -> None:
+        callbacks = self._callbacks.get(signal_name, [])
+        callbacks.remove(callback)
+
+        if not callbacks:
+            self._tasks.pop(signal_name).cancel()
+
+    async def _close(self) -> None:
+        tasks = list(self._tasks.values())
+        self._tasks = {}
+        self._callbacks = {}
+        self._queues_callbacks = {}
+
+        for task in tasks:
+            task.cancel()
+
+        await gather(*tasks, return_exceptions=True)
+
+        bus = self._bus
+        self._bus = None
+        if bus is not None:
+            bus.close()
+
+    async def _watch(self, signal_name: str) -> None:
+        loop = get_running_loop()
+
+        async for object_path, signal_data in _SIGNALS[
+                signal_name].catch_anywhere(
+                    SECRET_SERVICE_BUS_NAME, self._bus):
+            for callback in tuple(self._callbacks.get(signal_name, ())):
+                try:
+                    callback(object_path, signal_data)
+                except Exception as exc:
+                    loop.call_exception_handler({
+                        'message': f'Exception in {signal_name} callback',
+                        'exception': exc,
+                    })
@@ -0,0 +1 @@
+../../sdbus_async/secrets/values.py
\ No newline at end of file
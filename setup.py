@@ -53,6 +53,8 @@ setup(
     ],
     packages=[
         'sdbus_async.secrets',
+        'sdbus_async.secrets.daemon',
+        'sdbus_async.secrets.dump',
         'sdbus_block.secrets',
     ],
     package_data={
@@ -65,6 +67,11 @@ setup(
     },
     python_requires='>=3.7',
     install_requires=[
-        'sdbus>=0.8rc2',
+        'sdbus>=0.12.0',
     ],
+    extras_require={
+        'encryption': [
+            'cryptography',
+        ],
+    },
 )
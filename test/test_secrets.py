@@ -19,12 +19,49 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
 from __future__ import annotations
 
+from asyncio import run as run_async
+from concurrent.futures import ThreadPoolExecutor
+from os import _exit, close, fork, pipe, read, waitpid, write
+from subprocess import run
+from sys import executable
+from threading import current_thread
+from threading import enumerate as enumerate_threads
+from time import sleep
+from typing import Any, List, Tuple
 from unittest import TestCase
 
 from sdbus_block.secrets import (
+    DH_AES_ALGORITHM,
+    CallPolicy,
+    CircuitBreaker,
+    CircuitOpenError,
+    InMemoryMetricsSink,
     SecretService,
+    ItemInfo,
+    SearchResult,
+    Secret,
     SecretCollection,
     SecretItem,
+    SecretProxyFactory,
+    SecretServiceInterface,
+    SecretSessionManager,
+    SecretValue,
+    SecretsCache,
+    SecretsClient,
+    SecretsIndex,
+    await_prompt,
+    fetch_secrets,
+    instrument,
+    snapshot_item,
+    with_policy,
+)
+from sdbus import DbusDisconnectedError, DbusServiceUnknownError, sd_bus_open
+from sdbus.sd_bus_internals import SdBus
+from sdbus_block.secrets.pool import PoolTimeoutError, SecretConnectionPool
+from sdbus_block.secrets.signals import (
+    ITEM_CREATED,
+    ITEM_DELETED,
+    SecretSignalDispatcher,
 )
 
 
@@ -97,3 +134,621 @@ class TestSecrets(TestCase):
         print('Secret data: ', secret.get_secret(my_session_path))
 
         secret.delete()
+
+    def test_session_manager(self) -> None:
+        with SecretSessionManager() as session_manager:
+            session_path = session_manager.get_session()
+
+            self.assertEqual(session_path, session_manager.get_session())
+
+            session_manager.invalidate()
+
+            self.assertNotEqual(session_path, session_manager.get_session())
+
+    def test_encrypted_session(self) -> None:
+        secrets_service = SecretService()
+
+        with SecretSessionManager() as session_manager:
+            cipher = session_manager.get_cipher(DH_AES_ALGORITHM)
+
+            default_collection = SecretCollection(
+                secrets_service.read_alias('default'))
+
+            new_secret_path, _ = default_collection.create_item(
+                {'org.freedesktop.Secret.Item.Label': ('s', 'MyItem')},
+                cipher.encode(b'my secret'),
+                False,
+            )
+
+            secret = SecretItem(new_secret_path)
+
+            self.assertEqual(
+                b'my secret',
+                cipher.decode(secret.get_secret(cipher.session_path)),
+            )
+
+            self.assertEqual(
+                {new_secret_path: b'my secret'},
+                cipher.decode_many(
+                    secrets_service.get_secrets(
+                        [new_secret_path],
+                        cipher.session_path,
+                    )
+                ),
+            )
+
+            secret.delete()
+
+    def test_secret_value(self) -> None:
+        secrets_service = SecretService()
+
+        with SecretSessionManager() as session_manager:
+            cipher = session_manager.get_cipher()
+
+            default_collection = SecretCollection(
+                secrets_service.read_alias('default'))
+
+            new_secret_path, _ = default_collection.create_item(
+                {'org.freedesktop.Secret.Item.Label': ('s', 'MyItem')},
+                cipher.encode(SecretValue(
+                    'sécret'.encode('latin-1'),
+                    'text/plain; charset=latin-1',
+                )),
+                False,
+            )
+
+            with cipher.decode(SecretItem(new_secret_path).get_secret(
+                    cipher.session_path)) as value:
+                self.assertEqual('text/plain; charset=latin-1',
+                                 value.content_type)
+                self.assertEqual('sécret', value.text)
+
+            self.assertEqual(b'', value)
+
+            SecretItem(new_secret_path).delete()
+
+    def test_fetch_secrets(self) -> None:
+        secrets_service = SecretService()
+
+        with SecretSessionManager() as session_manager:
+            session_path = session_manager.get_session()
+
+            default_collection = SecretCollection(
+                secrets_service.read_alias('default'))
+
+            new_secrets_paths = [
+                default_collection.create_item(
+                    {
+                        'org.freedesktop.Secret.Item.Label': (
+                            's', f'MyItem{i}'),
+                        'org.freedesktop.Secret.Item.Attributes': (
+                            'a{ss}', {'FetchTest': str(i % 2)}),
+                    },
+                    (session_path, b'', f'secret{i}'.encode(), 'text/plain'),
+                    False,
+                )[0]
+                for i in range(5)
+            ]
+
+            fetched_secrets = fetch_secrets(
+                {'FetchTest': '0'},
+                session_manager.get_cipher(),
+                chunk_size=2,
+            )
+
+            self.assertEqual(
+                {
+                    new_secrets_paths[i]: f'secret{i}'.encode()
+                    for i in (0, 2, 4)
+                },
+                fetched_secrets,
+            )
+
+            for new_secret_path in new_secrets_paths:
+                SecretItem(new_secret_path).delete()
+
+    def test_secrets_cache(self) -> None:
+        secrets_service = SecretService()
+
+        with SecretSessionManager() as session_manager, \
+                SecretsCache(session_manager) as secrets_cache:
+            session_path = session_manager.get_session()
+
+            default_collection = SecretCollection(
+                secrets_service.read_alias('default'))
+
+            new_secret_path, _ = default_collection.create_item(
+                {'org.freedesktop.Secret.Item.Label': ('s', 'MyItem')},
+                (session_path, b'', b'my secret', 'text/plain'),
+                False,
+            )
+
+            for _ in range(3):
+                value, content_type = secrets_cache.get_secret(
+                    new_secret_path)
+                self.assertEqual(
+                    (b'my secret', 'text/plain'),
+                    (value, content_type),
+                )
+                # Returned value is a copy that can be wiped
+                value.close()
+
+            self.assertEqual(2, secrets_cache.hits)
+            self.assertEqual(1, secrets_cache.misses)
+
+            secrets_cache.invalidate(new_secret_path)
+            secrets_cache.get_secret(new_secret_path)
+
+            self.assertEqual(2, secrets_cache.misses)
+
+            SecretItem(new_secret_path).delete()
+
+        # Entries are invalidated by signals from the dispatcher
+        with SecretSessionManager() as session_manager, \
+                SecretSignalDispatcher() as dispatcher, \
+                SecretsCache(
+                    session_manager, dispatcher=dispatcher) as secrets_cache:
+            session_path = session_manager.get_session()
+
+            new_secret_path, _ = default_collection.create_item(
+                {'org.freedesktop.Secret.Item.Label': ('s', 'MyItem')},
+                (session_path, b'', b'my secret', 'text/plain'),
+                False,
+            )
+            self.assertEqual(
+                (b'my secret', 'text/plain'),
+                secrets_cache.get_secret(new_secret_path),
+            )
+
+            SecretItem(new_secret_path).set_secret(
+                (session_path, b'', b'new secret', 'text/plain'))
+
+            for _ in range(100):
+                value, _ = secrets_cache.get_secret(new_secret_path)
+                if value == b'new secret':
+                    break
+
+                sleep(0.01)
+
+            self.assertEqual(
+                (b'new secret', 'text/plain'),
+                secrets_cache.get_secret(new_secret_path),
+            )
+
+            SecretItem(new_secret_path).delete()
+
+    def test_secrets_index(self) -> None:
+        secrets_service = SecretService()
+
+        with SecretSessionManager() as session_manager, \
+                SecretsIndex() as secrets_index:
+            session_path = session_manager.get_session()
+
+            default_collection = SecretCollection(
+                secrets_service.read_alias('default'))
+
+            new_secret_path, _ = default_collection.create_item(
+                {
+                    'org.freedesktop.Secret.Item.Label': ('s', 'MyItem'),
+                    'org.freedesktop.Secret.Item.Attributes': (
+                        'a{ss}', {'IndexTest': 'yes'}),
+                },
+                (session_path, b'', b'my secret', 'text/plain'),
+                False,
+            )
+
+            secrets_index.load()
+
+            self.assertEqual(
+                secrets_service.search_items({'IndexTest': 'yes'}),
+                secrets_index.search_items({'IndexTest': 'yes'}),
+            )
+
+            SecretItem(new_secret_path).delete()
+
+        # Index follows signals from the dispatcher
+        with SecretSessionManager() as session_manager, \
+                SecretSignalDispatcher() as dispatcher, \
+                SecretsIndex(dispatcher=dispatcher) as secrets_index:
+            session_path = session_manager.get_session()
+
+            new_secret_path, _ = default_collection.create_item(
+                {
+                    'org.freedesktop.Secret.Item.Label': ('s', 'MyItem'),
+                    'org.freedesktop.Secret.Item.Attributes': (
+                        'a{ss}', {'IndexTest': 'yes'}),
+                },
+                (session_path, b'', b'my secret', 'text/plain'),
+                False,
+            )
+
+            for _ in range(100):
+                if secrets_index.get_attributes(new_secret_path):
+                    break
+
+                sleep(0.01)
+
+            self.assertEqual(
+                {'IndexTest': 'yes'},
+                secrets_index.get_attributes(new_secret_path),
+            )
+
+            SecretItem(new_secret_path).delete()
+
+            for _ in range(100):
+                if not secrets_index.get_attributes(new_secret_path):
+                    break
+
+                sleep(0.01)
+
+            self.assertIsNone(secrets_index.get_attributes(new_secret_path))
+
+    def test_snapshot_item(self) -> None:
+        secrets_service = SecretService()
+
+        with SecretSessionManager() as session_manager:
+            default_collection = SecretCollection(
+                secrets_service.read_alias('default'))
+
+            new_secret_path, _ = default_collection.create_item(
+                {
+                    'org.freedesktop.Secret.Item.Label': ('s', 'MyItem'),
+                    'org.freedesktop.Secret.Item.Attributes': (
+                        'a{ss}', {'SnapshotTest': 'yes'}),
+                },
+                (session_manager.get_session(), b'', b'my secret',
+                 'text/plain'),
+                False,
+            )
+
+            secret = SecretItem(new_secret_path)
+            item_properties = snapshot_item(new_secret_path)
+
+            self.assertEqual(secret.label, item_properties.label)
+            self.assertEqual(secret.attributes, item_properties.attributes)
+            self.assertEqual(secret.locked, item_properties.locked)
+            self.assertEqual(secret.created, item_properties.created)
+            self.assertEqual(secret.modified, item_properties.modified)
+
+            secret.delete()
+
+    def test_typed_results(self) -> None:
+        secrets_service = SecretService()
+
+        with SecretSessionManager() as session_manager:
+            session_path = session_manager.get_session()
+
+            default_collection = SecretCollection(
+                secrets_service.read_alias('default'))
+
+            new_secret_path, _ = default_collection.create_item(
+                {
+                    'org.freedesktop.Secret.Item.Label': ('s', 'MyItem'),
+                    'org.freedesktop.Secret.Item.Attributes': (
+                        'a{ss}', {'TypedTest': 'yes'}),
+                },
+                (session_path, b'', b'my secret', 'text/plain'),
+                False,
+            )
+
+            secret = SecretItem(new_secret_path)
+
+            self.assertEqual(
+                SearchResult([new_secret_path], []),
+                secrets_service.search_items_typed({'TypedTest': 'yes'}),
+            )
+            cipher = session_manager.get_cipher()
+            self.assertEqual(
+                Secret(session_path, SecretValue(b'my secret'), 'text/plain'),
+                secret.get_secret_typed(cipher),
+            )
+            self.assertEqual(
+                {new_secret_path: secret.get_secret_typed(cipher)},
+                secrets_service.get_secrets_typed([new_secret_path], cipher),
+            )
+
+            item_info = secret.get_info_typed()
+            self.assertIsInstance(item_info, ItemInfo)
+            self.assertEqual(
+                snapshot_item(new_secret_path),
+                (
+                    item_info.path,
+                    item_info.label,
+                    item_info.attributes,
+                    item_info.locked,
+                    item_info.created,
+                    item_info.modified,
+                ),
+            )
+
+            secret.delete()
+
+    def test_await_prompt(self) -> None:
+        secrets_service = SecretService()
+
+        default_collection_path = secrets_service.read_alias('default')
+        secrets_service.lock([default_collection_path])
+
+        _, prompt_path = secrets_service.unlock([default_collection_path])
+
+        dismissed, _ = await_prompt(prompt_path, timeout=60)
+
+        self.assertFalse(dismissed)
+        self.assertFalse(SecretCollection(default_collection_path).locked)
+
+        # Prompt shown on a specific connection that stays usable
+        bus = sd_bus_open()
+        secrets_service.lock([default_collection_path])
+        _, prompt_path = secrets_service.unlock([default_collection_path])
+
+        dismissed, _ = await_prompt(prompt_path, timeout=60, bus=bus)
+
+        self.assertFalse(dismissed)
+        self.assertFalse(SecretCollection(default_collection_path, bus).locked)
+
+        # Called from a thread running an event loop
+        async def await_prompt_in_loop() -> Tuple[bool, Any]:
+            _, prompt_path = secrets_service.unlock([default_collection_path])
+            return await_prompt(prompt_path, timeout=60)
+
+        secrets_service.lock([default_collection_path])
+        dismissed, _ = run_async(await_prompt_in_loop())
+
+        self.assertFalse(dismissed)
+        self.assertFalse(SecretCollection(default_collection_path).locked)
+
+        # Prompt waited on with the dispatcher connection
+        with SecretSignalDispatcher() as dispatcher:
+            secrets_service.lock([default_collection_path])
+            _, prompt_path = secrets_service.unlock([default_collection_path])
+
+            dismissed, _ = await_prompt(
+                prompt_path, timeout=60, dispatcher=dispatcher)
+
+        self.assertFalse(dismissed)
+        self.assertFalse(SecretCollection(default_collection_path).locked)
+
+    def test_signal_dispatcher(self) -> None:
+        secrets_service = SecretService()
+
+        with SecretSessionManager() as session_manager, \
+                SecretSignalDispatcher() as dispatcher:
+            created_queue = dispatcher.subscribe(ITEM_CREATED)
+            deleted_signals: List[Tuple[str, Any]] = []
+            dispatcher.connect(ITEM_DELETED, lambda *args: (
+                deleted_signals.append(args)))
+
+            default_collection_path = secrets_service.read_alias('default')
+
+            new_secret_path, _ = SecretCollection(
+                default_collection_path).create_item(
+                {
+                    'org.freedesktop.Secret.Item.Label': ('s', 'MyItem'),
+                    'org.freedesktop.Secret.Item.Attributes': (
+                        'a{ss}', {'SignalTest': 'yes'}),
+                },
+                (session_manager.get_session(), b'', b'my secret',
+                 'text/plain'),
+                False,
+            )
+
+            self.assertEqual(
+                (default_collection_path, new_secret_path),
+                created_queue.get(timeout=5),
+            )
+
+            dispatcher.unsubscribe(ITEM_CREATED, created_queue)
+            SecretItem(new_secret_path).delete()
+
+            for _ in range(100):
+                if deleted_signals:
+                    break
+
+                sleep(0.01)
+
+            self.assertEqual(
+                [(default_collection_path, new_secret_path)],
+                deleted_signals,
+            )
+
+    def test_connection_pool(self) -> None:
+        with SecretConnectionPool(max_size=2) as pool:
+
+            def read_default(_: int) -> str:
+                with pool.connection() as connection:
+                    connection.get_session()
+                    return connection.service.read_alias('default')
+
+            with ThreadPoolExecutor(8) as executor:
+                default_collections = set(
+                    executor.map(read_default, range(32)))
+
+            self.assertEqual(
+                {SecretService().read_alias('default')},
+                default_collections,
+            )
+
+            stats = pool.stats
+            self.assertEqual(32, stats.checkouts)
+            self.assertLessEqual(stats.size, 2)
+            self.assertEqual(0, stats.in_use)
+
+            with pool.connection() as first, pool.connection() as second:
+                self.assertIsNot(first, second)
+                self.assertEqual(1.0, pool.stats.utilization)
+
+                with self.assertRaises(PoolTimeoutError):
+                    pool.acquire(timeout=0.01)
+
+            self.assertEqual(1, pool.stats.timeouts)
+
+            with pool.connection() as connection:
+                self.assertIn(connection, (first, second))
+
+            # Disconnected connection is replaced by a new one
+            with self.assertRaises(DbusDisconnectedError):
+                with pool.connection() as connection:
+                    raise DbusDisconnectedError('Disconnected')
+
+            self.assertEqual(1, pool.stats.size)
+            with pool.connection() as first, pool.connection() as second:
+                self.assertNotIn(connection, (first, second))
+
+    def test_fork_safe_client(self) -> None:
+        opened_buses: List[SdBus] = []
+
+        def open_bus() -> SdBus:
+            opened_buses.append(sd_bus_open())
+            return opened_buses[-1]
+
+        with SecretsClient(open_bus) as client:
+            parent_bus = client.bus
+            parent_session = client.get_session()
+            default_collection_path = client.service.read_alias('default')
+
+            client.warm_up_after_fork()
+
+            read_fd, write_fd = pipe()
+            pid = fork()
+            if pid == 0:
+                try:
+                    is_reconnected = (
+                        client.bus is not parent_bus
+                        and client.get_session() != parent_session
+                        and client.service.read_alias('default')
+                        == default_collection_path
+                    )
+                    write(write_fd, b'1' if is_reconnected else b'0')
+                finally:
+                    _exit(0)
+
+            close(write_fd)
+            waitpid(pid, 0)
+            self.assertEqual(b'1', read(read_fd, 1))
+            close(read_fd)
+
+            self.assertIs(parent_bus, client.bus)
+            self.assertEqual(parent_session, client.get_session())
+
+            # Fork hook is only registered once
+            client.warm_up_after_fork()
+
+        # Children forked after close do not warm up
+        opened_buses.clear()
+        read_fd, write_fd = pipe()
+        pid = fork()
+        if pid == 0:
+            try:
+                for thread in enumerate_threads():
+                    if thread is not current_thread():
+                        thread.join()
+
+                write(write_fd, b'1' if opened_buses else b'0')
+            finally:
+                _exit(0)
+
+        close(write_fd)
+        waitpid(pid, 0)
+        self.assertEqual(b'0', read(read_fd, 1))
+        close(read_fd)
+
+    def test_proxy_factory(self) -> None:
+        secrets_service = SecretService()
+
+        with SecretProxyFactory() as proxy_factory:
+            default_collection_path = secrets_service.read_alias('default')
+
+            default_collection = proxy_factory.collection(
+                default_collection_path)
+            self.assertIs(
+                default_collection,
+                proxy_factory.collection(default_collection_path),
+            )
+
+            items_paths = default_collection.items
+            self.assertEqual(
+                proxy_factory.items(items_paths),
+                proxy_factory.items(items_paths),
+            )
+
+            proxy_factory.forget(default_collection_path)
+            self.assertIsNot(
+                default_collection,
+                proxy_factory.collection(default_collection_path),
+            )
+
+    def test_instrument(self) -> None:
+        metrics_sink = InMemoryMetricsSink()
+        secrets_service = instrument(SecretService(), metrics_sink)
+
+        self.assertIs(secrets_service, instrument(secrets_service, None))
+
+        default_collection_path = secrets_service.read_alias('default')
+        secrets_service.read_alias('default')
+        self.assertIn(default_collection_path, secrets_service.collections)
+
+        read_alias_stats = metrics_sink.stats(
+            'org.freedesktop.Secret.Service.ReadAlias')
+        self.assertEqual(2, read_alias_stats.calls)
+        self.assertEqual(0, read_alias_stats.errors)
+        self.assertEqual(2 * len('default'), read_alias_stats.request_bytes)
+        self.assertEqual(2, sum(read_alias_stats.bucket_counts))
+        self.assertLessEqual(
+            read_alias_stats.percentile(0.5),
+            read_alias_stats.max_seconds,
+        )
+        self.assertEqual(
+            1,
+            metrics_sink.stats(
+                'org.freedesktop.Secret.Service.Collections').calls,
+        )
+
+        with self.assertRaises(Exception):
+            instrument(
+                SecretItem(default_collection_path + '/missing'),
+                metrics_sink,
+            ).delete()
+
+        self.assertEqual(
+            1,
+            metrics_sink.stats('org.freedesktop.Secret.Item.Delete').errors,
+        )
+
+    def test_call_policy(self) -> None:
+        circuit_breaker = CircuitBreaker(
+            failure_threshold=3, reset_timeout=60)
+        policy = CallPolicy(
+            timeout=10, retries=2, backoff=0, circuit_breaker=circuit_breaker)
+
+        secrets_service = with_policy(SecretService(), policy)
+        self.assertTrue(secrets_service.read_alias('default'))
+
+        missing_service = with_policy(
+            SecretServiceInterface('org.example.MissingSecrets',
+                                   '/org/freedesktop/secrets'),
+            policy,
+        )
+
+        # First try and two retries
+        with self.assertRaises(DbusServiceUnknownError):
+            missing_service.search_items({})
+
+        self.assertEqual('open', circuit_breaker.state)
+
+        with self.assertRaises(CircuitOpenError):
+            secrets_service.read_alias('default')
+
+    def test_lazy_import(self) -> None:
+        import sdbus_block.secrets
+
+        for name in sdbus_block.secrets.__all__:
+            getattr(sdbus_block.secrets, name)
+
+        run(
+            (
+                executable, '-c',
+                'import sys, sdbus_block.secrets; '
+                'assert "sdbus_block.secrets.interfaces" not in sys.modules',
+            ),
+            check=True,
+        )
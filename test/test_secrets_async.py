@@ -19,16 +19,1222 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301 USA
 from __future__ import annotations
 
+from asyncio import CancelledError, Task
+from asyncio import TimeoutError as AsyncioTimeoutError
+from asyncio import gather, get_running_loop, run, sleep, wait_for
+from io import BytesIO, StringIO
+from os import _exit, chmod, close, fork, pipe, read, stat, waitpid, write
+from os.path import getsize, join
+from resource import RLIMIT_FSIZE, getrlimit, setrlimit
+from signal import SIG_IGN, SIGXFSZ, signal
+from sqlite3 import IntegrityError, connect
+from tempfile import TemporaryDirectory
+from typing import Iterable, List, Optional
 from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
 
-from sdbus_async.secrets import SecretService
+from sdbus import sd_bus_open_user, set_default_bus
+from sdbus.sd_bus_internals import SdBus
+from sdbus_async.secrets import (
+    DH_AES_ALGORITHM,
+    CallPolicy,
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceededError,
+    InMemoryMetricsSink,
+    ItemInfo,
+    SearchResult,
+    SecretCollection,
+    SecretCollectionInterface,
+    SecretItem,
+    SecretItemInterface,
+    SecretNoSessionError,
+    SecretPrompt,
+    SecretPromptInterface,
+    SecretProxyFactory,
+    SecretService,
+    SecretServiceInterface,
+    SecretSessionManager,
+    SecretValue,
+    SecretsCache,
+    SecretsClient,
+    SecretsIndex,
+    await_prompt,
+    fetch_secrets,
+    instrument,
+    snapshot_collection,
+    snapshot_items,
+    with_policy,
+)
+from sdbus_async.secrets.coalescing import SecretLockCoalescer
+from sdbus_async.secrets.daemon import (
+    LogStorage,
+    SecretsDaemon,
+    SqliteStorage,
+    StorageFailedError,
+    StoredCollection,
+    StoredItem,
+)
+from sdbus_async.secrets.dump import (
+    BinaryWriter,
+    DumpedItem,
+    DumpRecord,
+    JsonLinesWriter,
+    export_keyring,
+    import_keyring,
+    read_binary,
+    read_json_lines,
+)
+from sdbus_async.secrets.dump.formats import open_private_file
+from sdbus_async.secrets.singleflight import SecretSingleflight
+from sdbus_async.secrets.sync import (
+    CollectionSyncTarget,
+    SnapshotSyncTarget,
+    sync_collection,
+)
+from sdbus_async.secrets.watch import (
+    OVERFLOW_RAISE,
+    CollectionCreated,
+    CollectionDeleted,
+    EventQueueOverflowError,
+    ItemChanged,
+    ItemCreated,
+    ItemDeleted,
+    SecretEvent,
+    watch,
+)
+
+DAEMON_TEST_BUS_NAME = 'org.example.SecretsDaemonTest'
 
 
 class TestSecrets(IsolatedAsyncioTestCase):
 
+    def setUp(self) -> None:
+        # Every test runs in a new event loop
+        set_default_bus(sd_bus_open_user())
+
     async def test_secret_service(self) -> None:
         secrets = SecretService()
 
         print('Default alias: ', await secrets.read_alias('default'))
 
         print('Collections: ', await secrets.collections)
+
+    async def test_session_manager(self) -> None:
+        async with SecretSessionManager() as session_manager:
+            session_paths = await gather(
+                session_manager.get_session(),
+                session_manager.get_session(),
+            )
+
+            self.assertEqual(session_paths[0], session_paths[1])
+
+            session_manager.invalidate()
+
+            self.assertNotEqual(
+                session_paths[0],
+                await session_manager.get_session(),
+            )
+
+    async def test_secret_value(self) -> None:
+        secrets_service = SecretService()
+
+        async with SecretSessionManager() as session_manager:
+            cipher = await session_manager.get_cipher(DH_AES_ALGORITHM)
+
+            default_collection = SecretCollection(
+                await secrets_service.read_alias('default'))
+
+            new_secret_path, _ = await default_collection.create_item(
+                {'org.freedesktop.Secret.Item.Label': ('s', 'MyItem')},
+                cipher.encode(SecretValue(b'-----BEGIN CERTIFICATE-----',
+                                          'application/x-pem-file')),
+                False,
+            )
+
+            secret_item = SecretItem(new_secret_path)
+            value = cipher.decode(
+                await secret_item.get_secret(cipher.session_path))
+            self.assertEqual(b'-----BEGIN CERTIFICATE-----', value)
+            self.assertEqual('application/x-pem-file', value.content_type)
+
+            value_view = memoryview(value)
+            value.close()
+            self.assertFalse(any(value_view))
+
+            await secret_item.delete()
+
+    async def test_fetch_secrets(self) -> None:
+        secrets_service = SecretService()
+
+        async with SecretSessionManager() as session_manager:
+            session_path = await session_manager.get_session()
+
+            default_collection = SecretCollection(
+                await secrets_service.read_alias('default'))
+
+            new_secrets_paths = [
+                (
+                    await default_collection.create_item(
+                        {
+                            'org.freedesktop.Secret.Item.Label': (
+                                's', f'MyItem{i}'),
+                            'org.freedesktop.Secret.Item.Attributes': (
+                                'a{ss}', {'FetchTestAsync': 'yes'}),
+                        },
+                        (session_path, b'', f'secret{i}'.encode(),
+                         'text/plain'),
+                        False,
+                    )
+                )[0]
+                for i in range(5)
+            ]
+
+            fetched_secrets = await fetch_secrets(
+                {'FetchTestAsync': 'yes'},
+                await session_manager.get_cipher(),
+                chunk_size=2,
+                max_concurrent_calls=2,
+            )
+
+            self.assertEqual(
+                {
+                    new_secret_path: f'secret{i}'.encode()
+                    for i, new_secret_path in enumerate(new_secrets_paths)
+                },
+                fetched_secrets,
+            )
+
+            for new_secret_path in new_secrets_paths:
+                await SecretItem(new_secret_path).delete()
+
+    async def test_secrets_cache(self) -> None:
+        secrets_service = SecretService()
+
+        async with SecretSessionManager() as session_manager, \
+                SecretsCache(session_manager) as secrets_cache:
+            session_path = await session_manager.get_session()
+
+            default_collection = SecretCollection(
+                await secrets_service.read_alias('default'))
+
+            new_secret_path, _ = await default_collection.create_item(
+                {'org.freedesktop.Secret.Item.Label': ('s', 'MyItem')},
+                (session_path, b'', b'my secret', 'text/plain'),
+                False,
+            )
+
+            self.assertEqual(
+                (b'my secret', 'text/plain'),
+                await secrets_cache.get_secret(new_secret_path),
+            )
+            self.assertEqual(
+                'MyItem',
+                (await secrets_cache.get_properties(new_secret_path)).label,
+            )
+            # Returned value is a copy that can be wiped
+            value, _ = await secrets_cache.get_secret(new_secret_path)
+            value.close()
+            self.assertEqual(
+                (b'my secret', 'text/plain'),
+                await secrets_cache.get_secret(new_secret_path),
+            )
+
+            self.assertEqual(2, secrets_cache.hits)
+            self.assertEqual(2, secrets_cache.misses)
+
+            new_secret = SecretItem(new_secret_path)
+            await new_secret.set_secret(
+                (session_path, b'', b'new secret', 'text/plain'))
+
+            # Wait for ItemChanged signal to invalidate the entry
+            for _ in range(100):
+                value, _ = await secrets_cache.get_secret(new_secret_path)
+                if value == b'new secret':
+                    break
+
+                await sleep(0.01)
+
+            self.assertEqual(
+                (b'new secret', 'text/plain'),
+                await secrets_cache.get_secret(new_secret_path),
+            )
+
+            await new_secret.delete()
+
+    async def test_secrets_index_failed_load(self) -> None:
+        secrets_index = SecretsIndex()
+
+        load_task = get_running_loop().create_task(secrets_index.load())
+        await sleep(0)
+        load_task.cancel()
+        with self.assertRaises(CancelledError):
+            await load_task
+
+        # Watchers of the failed load are stopped
+        await secrets_index.load()
+        await secrets_index.close()
+
+    async def test_secrets_index(self) -> None:
+        secrets_service = SecretService()
+
+        async with SecretSessionManager() as session_manager, \
+                SecretsIndex() as secrets_index:
+            session_path = await session_manager.get_session()
+
+            default_collection = SecretCollection(
+                await secrets_service.read_alias('default'))
+
+            new_secret_path, _ = await default_collection.create_item(
+                {
+                    'org.freedesktop.Secret.Item.Label': ('s', 'MyItem'),
+                    'org.freedesktop.Secret.Item.Attributes': (
+                        'a{ss}', {'IndexTest': 'yes', 'Other': 'value'}),
+                },
+                (session_path, b'', b'my secret', 'text/plain'),
+                False,
+            )
+
+            # Wait for ItemCreated signal to update the index
+            for _ in range(100):
+                if secrets_index.get_attributes(new_secret_path):
+                    break
+
+                await sleep(0.01)
+
+            self.assertEqual(
+                await secrets_service.search_items({'IndexTest': 'yes'}),
+                secrets_index.search_items({'IndexTest': 'yes'}),
+            )
+            self.assertEqual(
+                ([], []),
+                secrets_index.search_items(
+                    {'IndexTest': 'yes', 'Other': 'no'}),
+            )
+
+            # Deleting a collection with items removes them from
+            # the index and the index keeps following signals
+            new_collection_path, _ = await secrets_service.create_collection(
+                {'org.freedesktop.Secret.Collection.Label': (
+                    's', 'IndexTest')},
+                '',
+            )
+            collection_secret_path, _ = await SecretCollection(
+                new_collection_path).create_item(
+                {
+                    'org.freedesktop.Secret.Item.Label': ('s', 'MyItem'),
+                    'org.freedesktop.Secret.Item.Attributes': (
+                        'a{ss}', {'IndexCollectionTest': 'yes'}),
+                },
+                (session_path, b'', b'my secret', 'text/plain'),
+                False,
+            )
+
+            for _ in range(100):
+                if secrets_index.get_attributes(collection_secret_path):
+                    break
+
+                await sleep(0.01)
+
+            await SecretCollection(new_collection_path).delete()
+
+            for _ in range(100):
+                if not secrets_index.get_attributes(collection_secret_path):
+                    break
+
+                await sleep(0.01)
+
+            self.assertEqual(
+                ([], []),
+                secrets_index.search_items({'IndexCollectionTest': 'yes'}),
+            )
+
+            await SecretItem(new_secret_path).delete()
+
+            for _ in range(100):
+                if not secrets_index.get_attributes(new_secret_path):
+                    break
+
+                await sleep(0.01)
+
+            self.assertEqual(
+                ([], []),
+                secrets_index.search_items({'IndexTest': 'yes'}),
+            )
+
+    async def test_snapshots(self) -> None:
+        secrets_service = SecretService()
+
+        async with SecretSessionManager() as session_manager:
+            session_path = await session_manager.get_session()
+
+            default_collection_path = await secrets_service.read_alias(
+                'default')
+            default_collection = SecretCollection(default_collection_path)
+
+            new_secrets_paths = [
+                (
+                    await default_collection.create_item(
+                        {
+                            'org.freedesktop.Secret.Item.Label': (
+                                's', f'MyItem{i}'),
+                            'org.freedesktop.Secret.Item.Attributes': (
+                                'a{ss}', {'SnapshotTest': str(i)}),
+                        },
+                        (session_path, b'', b'my secret', 'text/plain'),
+                        False,
+                    )
+                )[0]
+                for i in range(3)
+            ]
+
+            collection_properties = await snapshot_collection(
+                default_collection_path)
+            self.assertEqual(
+                await default_collection.label,
+                collection_properties.label,
+            )
+            for new_secret_path in new_secrets_paths:
+                self.assertIn(new_secret_path, collection_properties.items)
+
+            items_properties = await snapshot_items(
+                new_secrets_paths, max_concurrent_calls=2)
+            for i, item_properties in enumerate(items_properties):
+                self.assertEqual(new_secrets_paths[i], item_properties.path)
+                self.assertEqual(f'MyItem{i}', item_properties.label)
+                self.assertEqual(
+                    {'SnapshotTest': str(i)},
+                    item_properties.attributes,
+                )
+
+            for new_secret_path in new_secrets_paths:
+                await SecretItem(new_secret_path).delete()
+
+    async def test_typed_results(self) -> None:
+        secrets_service = SecretService()
+
+        async with SecretSessionManager() as session_manager:
+            session_path = await session_manager.get_session()
+
+            default_collection = SecretCollection(
+                await secrets_service.read_alias('default'))
+
+            new_secret_path, _ = await default_collection.create_item(
+                {
+                    'org.freedesktop.Secret.Item.Label': ('s', 'MyItem'),
+                    'org.freedesktop.Secret.Item.Attributes': (
+                        'a{ss}', {'TypedTest': 'yes'}),
+                },
+                (session_path, b'', b'my secret', 'text/plain'),
+                False,
+            )
+
+            secret = SecretItem(new_secret_path)
+
+            self.assertEqual(
+                SearchResult([new_secret_path], []),
+                await secrets_service.search_items_typed(
+                    {'TypedTest': 'yes'}),
+            )
+
+            cipher = await session_manager.get_cipher()
+            secrets = await secrets_service.get_secrets_typed(
+                [new_secret_path], cipher)
+            self.assertEqual(b'my secret', secrets[new_secret_path].value)
+            self.assertIsInstance(
+                secrets[new_secret_path].value, SecretValue)
+            self.assertEqual(
+                secrets[new_secret_path],
+                await secret.get_secret_typed(cipher),
+            )
+
+            with secrets[new_secret_path] as typed_secret:
+                value = typed_secret.value
+            self.assertFalse(any(value))
+
+            self.assertEqual(
+                ItemInfo(
+                    new_secret_path,
+                    'MyItem',
+                    {'TypedTest': 'yes'},
+                    False,
+                    await secret.created,
+                    await secret.modified,
+                ),
+                await secret.get_info_typed(),
+            )
+
+            with self.assertRaises(TypeError):
+                (await secret.get_info_typed())[0]  # type: ignore[index]
+
+            await secret.delete()
+
+    async def test_instrument(self) -> None:
+        metrics_sink = InMemoryMetricsSink()
+        secrets_service = instrument(SecretService(), metrics_sink)
+
+        default_collection = instrument(
+            SecretCollection(await secrets_service.read_alias('default')),
+            metrics_sink,
+        )
+        await default_collection.label
+        await secrets_service.search_items_typed({'Instrumented': 'yes'})
+
+        self.assertEqual(
+            [
+                'org.freedesktop.Secret.Service.ReadAlias',
+                'org.freedesktop.Secret.Collection.Label',
+                'org.freedesktop.Secret.Service.SearchItems',
+            ],
+            metrics_sink.members(),
+        )
+        search_stats = metrics_sink.stats(
+            'org.freedesktop.Secret.Service.SearchItems')
+        self.assertEqual(1, search_stats.calls)
+        self.assertGreater(search_stats.total_seconds, 0)
+
+        metrics_sink.reset()
+        self.assertEqual([], metrics_sink.members())
+
+    async def test_call_policy(self) -> None:
+        circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        policy = CallPolicy(
+            timeout=0.000001, circuit_breaker=circuit_breaker)
+
+        secrets_service = with_policy(SecretService(), policy)
+
+        with self.assertRaises(DeadlineExceededError):
+            await secrets_service.read_alias('default')
+
+        self.assertEqual('open', circuit_breaker.state)
+
+        policy.timeout = 10
+        concurrent_calls = await gather(
+            secrets_service.collections,
+            secrets_service.collections,
+            return_exceptions=True,
+        )
+
+        # Only a single probe call is allowed while the circuit
+        # is half-open
+        self.assertIsInstance(concurrent_calls[0], list)
+        self.assertIsInstance(concurrent_calls[1], CircuitOpenError)
+        self.assertEqual('closed', circuit_breaker.state)
+
+    async def test_await_prompt(self) -> None:
+        secrets_service = SecretService()
+
+        self.assertEqual((False, None), await await_prompt('/'))
+
+        default_collection_path = await secrets_service.read_alias(
+            'default')
+        await secrets_service.lock([default_collection_path])
+
+        _, prompt_path = await secrets_service.unlock(
+            [default_collection_path])
+
+        self.assertNotEqual('/', prompt_path)
+        dismissed, result = await await_prompt(prompt_path, timeout=60)
+
+        self.assertFalse(dismissed)
+        self.assertIn(default_collection_path, result)
+        self.assertFalse(await SecretCollection(
+            default_collection_path).locked)
+
+        async def watch_completed(prompt_path: str) -> Task[bool]:
+            completed_task = get_running_loop().create_task(
+                wait_completed(prompt_path))
+            # Reply arrives after the match rule is active
+            await sleep(0)
+            await secrets_service.read_alias('default')
+            return completed_task
+
+        async def wait_completed(prompt_path: str) -> bool:
+            async for dismissed, _ in SecretPrompt(
+                    prompt_path).completed.catch():
+                return dismissed
+
+            raise RuntimeError('Prompt signals stopped')
+
+        # Prompt is dismissed if the wait is cancelled
+        await secrets_service.lock([default_collection_path])
+        _, prompt_path = await secrets_service.unlock(
+            [default_collection_path])
+        completed_task = await watch_completed(prompt_path)
+
+        prompt_task = get_running_loop().create_task(
+            await_prompt(prompt_path))
+        await sleep(0)
+        prompt_task.cancel()
+        with self.assertRaises(CancelledError):
+            await prompt_task
+
+        self.assertTrue(await wait_for(completed_task, 60))
+
+        # Prompt is dismissed if the wait times out
+        await secrets_service.lock([default_collection_path])
+        _, prompt_path = await secrets_service.unlock(
+            [default_collection_path])
+        completed_task = await watch_completed(prompt_path)
+
+        with self.assertRaises(AsyncioTimeoutError):
+            await await_prompt(prompt_path, timeout=0)
+
+        self.assertTrue(await wait_for(completed_task, 60))
+
+        _, prompt_path = await secrets_service.unlock(
+            [default_collection_path])
+        await await_prompt(prompt_path, timeout=60)
+        self.assertFalse(await SecretCollection(
+            default_collection_path).locked)
+
+    async def test_lock_coalescer(self) -> None:
+        secrets_service = SecretService()
+
+        default_collection_path = await secrets_service.read_alias(
+            'default')
+
+        metrics_sink = InMemoryMetricsSink()
+
+        def instrumented_service(bus: Optional[SdBus]) -> SecretService:
+            return instrument(SecretService(bus), metrics_sink)
+
+        # Count D-Bus calls made by the coalescer
+        with patch(
+            'sdbus_async.secrets.coalescing.SecretService',
+            instrumented_service,
+        ):
+            async with SecretLockCoalescer(
+                    window=0.01, prompt_timeout=60) as lock_coalescer:
+                self.assertEqual(
+                    [[default_collection_path]] * 3,
+                    await gather(*(
+                        lock_coalescer.lock([default_collection_path])
+                        for _ in range(3)
+                    )),
+                )
+                self.assertTrue(await SecretCollection(
+                    default_collection_path).locked)
+                self.assertEqual(1, metrics_sink.stats(
+                    'org.freedesktop.Secret.Service.Lock').calls)
+
+                # Single prompt unlocks the collection for every caller
+                self.assertEqual(
+                    [
+                        [default_collection_path],
+                        [default_collection_path],
+                        [],
+                    ],
+                    await gather(
+                        lock_coalescer.unlock([default_collection_path]),
+                        lock_coalescer.unlock([default_collection_path]),
+                        lock_coalescer.unlock([]),
+                    ),
+                )
+                self.assertFalse(await SecretCollection(
+                    default_collection_path).locked)
+                self.assertEqual(1, metrics_sink.stats(
+                    'org.freedesktop.Secret.Service.Unlock').calls)
+
+    async def test_singleflight(self) -> None:
+        secrets_service = SecretService()
+        singleflight = SecretSingleflight()
+
+        searches = [
+            get_running_loop().create_task(
+                singleflight.search_items({'SingleflightTest': 'yes'}))
+            for _ in range(5)
+        ]
+        await sleep(0)
+        self.assertEqual(1, singleflight.pending)
+
+        # Other requests still receive the result
+        searches[0].cancel()
+
+        search_results = await gather(*searches[1:])
+        self.assertEqual(
+            [await secrets_service.search_items(
+                {'SingleflightTest': 'yes'})] * 4,
+            search_results,
+        )
+        self.assertIsNot(search_results[0][0], search_results[1][0])
+        self.assertEqual(0, singleflight.pending)
+
+        async with SecretSessionManager() as session_manager:
+            cipher = await session_manager.get_cipher()
+            default_collection = SecretCollection(
+                await secrets_service.read_alias('default'))
+            item_path, _ = await default_collection.create_item(
+                {
+                    'org.freedesktop.Secret.Item.Label': ('s', 'Shared'),
+                    'org.freedesktop.Secret.Item.Attributes': (
+                        'a{ss}', {'SingleflightTest': 'secret'}),
+                },
+                cipher.encode(b'shared secret'),
+                False,
+            )
+
+            first_secret, second_secret = await gather(
+                singleflight.get_secret(item_path, cipher),
+                singleflight.get_secret(item_path, cipher),
+            )
+            # Wiping one value does not affect other requests
+            first_secret.close()
+            self.assertEqual(b'shared secret', second_secret)
+
+            await SecretItem(item_path).delete()
+
+    async def test_dump(self) -> None:
+        secrets_service = SecretService()
+        default_collection = SecretCollection(
+            await secrets_service.read_alias('default'))
+
+        async with SecretSessionManager() as session_manager:
+            session_path = await session_manager.get_session()
+            for index in range(3):
+                await default_collection.create_item(
+                    {
+                        'org.freedesktop.Secret.Item.Label': (
+                            's', f'Dumped {index}'),
+                        'org.freedesktop.Secret.Item.Attributes': (
+                            'a{ss}', {'DumpTest': str(index)}),
+                    },
+                    (session_path, b'', f'secret {index}'.encode(),
+                     'text/plain'),
+                    True,
+                )
+
+        def dumped_items(records: Iterable[DumpRecord]) -> List[DumpedItem]:
+            return sorted(
+                (
+                    record for record in records
+                    if isinstance(record, DumpedItem)
+                    and 'DumpTest' in record.attributes
+                ),
+                key=lambda record: record.label,
+            )
+
+        text_stream = StringIO()
+        exported_count = await export_keyring(
+            JsonLinesWriter(text_stream), include_secrets=True, chunk_size=2)
+
+        with TemporaryDirectory() as temp_dir:
+            dump_path = join(temp_dir, 'dump.jsonl')
+            with open(dump_path, 'w') as dump_file:
+                dump_file.write('old dump')
+            chmod(dump_path, 0o644)
+
+            with open_private_file(
+                    dump_path, encoding='utf-8') as private_file:
+                private_file.write(text_stream.getvalue())
+
+            self.assertEqual(0o600, stat(dump_path).st_mode & 0o777)
+            self.assertEqual(len(text_stream.getvalue()), getsize(dump_path))
+
+        binary_stream = BytesIO()
+        self.assertEqual(
+            exported_count,
+            await export_keyring(BinaryWriter(binary_stream)),
+        )
+
+        text_stream.seek(0)
+        text_items = dumped_items(read_json_lines(text_stream))
+        binary_stream.seek(0)
+        binary_items = dumped_items(read_binary(binary_stream))
+
+        self.assertEqual(
+            ['Dumped 0', 'Dumped 1', 'Dumped 2'],
+            [item.label for item in text_items],
+        )
+        self.assertEqual(
+            ['secret 0', 'secret 1', 'secret 2'],
+            [item.secret.text for item in text_items if item.secret],
+        )
+        self.assertEqual(
+            [item._replace(secret=None) for item in text_items],
+            binary_items,
+        )
+
+        for item in text_items:
+            await SecretItem(item.path).delete()
+
+        text_stream.seek(0)
+        self.assertEqual(
+            exported_count,
+            await import_keyring(
+                read_json_lines(text_stream),
+                replace=True,
+                max_concurrent_calls=2,
+            ),
+        )
+
+        unlocked_items, _ = await secrets_service.search_items(
+            {'DumpTest': '1'})
+        self.assertEqual(1, len(unlocked_items))
+
+        async with SecretSessionManager() as session_manager:
+            _, _, secret, _ = await SecretItem(unlocked_items[0]).get_secret(
+                await session_manager.get_session())
+
+        self.assertEqual(b'secret 1', secret)
+
+        # Dump without secrets must not overwrite existing secrets
+        binary_stream.seek(0)
+        with self.assertRaises(ValueError):
+            await import_keyring(read_binary(binary_stream), replace=True)
+
+        async with SecretSessionManager() as session_manager:
+            _, _, secret, _ = await SecretItem(unlocked_items[0]).get_secret(
+                await session_manager.get_session())
+
+        self.assertEqual(b'secret 1', secret)
+
+    async def test_sync_collection(self) -> None:
+        secrets_service = SecretService()
+        source_path, _ = await secrets_service.create_collection(
+            {'org.freedesktop.Secret.Collection.Label': ('s', 'SyncSource')},
+            '',
+        )
+        target_path, _ = await secrets_service.create_collection(
+            {'org.freedesktop.Secret.Collection.Label': ('s', 'SyncTarget')},
+            '',
+        )
+        source_collection = SecretCollection(source_path)
+
+        async with SecretSessionManager() as session_manager:
+            session_path = await session_manager.get_session()
+            source_items = [
+                (await source_collection.create_item(
+                    {
+                        'org.freedesktop.Secret.Item.Label': (
+                            's', f'Synced {index}'),
+                        'org.freedesktop.Secret.Item.Attributes': (
+                            'a{ss}', {'SyncTest': str(index)}),
+                    },
+                    (session_path, b'', f'secret {index}'.encode(),
+                     'text/plain'),
+                    False,
+                ))[0]
+                for index in range(5)
+            ]
+
+        with TemporaryDirectory() as tmpdir:
+            collection_target = CollectionSyncTarget(target_path)
+            collection_state = join(tmpdir, 'collection.json')
+            snapshot_path = join(tmpdir, 'snapshot.jsonl')
+            snapshot_state = join(tmpdir, 'snapshot.json')
+
+            for target, state_path in (
+                (collection_target, collection_state),
+                (SnapshotSyncTarget(snapshot_path), snapshot_state),
+            ):
+                result = await sync_collection(
+                    source_path, target, state_path, chunk_size=2)
+                self.assertEqual(5, result.created)
+
+            await SecretItem(source_items[0]).label.set_async('Renamed')
+            await SecretItem(source_items[1]).delete()
+
+            result = await sync_collection(
+                source_path, collection_target, collection_state)
+            self.assertEqual(0, result.created)
+            self.assertEqual(1, result.deleted)
+            self.assertEqual(4, result.updated + result.unchanged)
+
+            target_items = await snapshot_items(
+                await SecretCollection(target_path).items)
+            self.assertEqual(
+                ['Renamed', 'Synced 2', 'Synced 3', 'Synced 4'],
+                sorted(item.label for item in target_items),
+            )
+
+            with open(snapshot_path) as snapshot_file:
+                snapshot_records = list(read_json_lines(snapshot_file))
+
+            self.assertEqual(6, len(snapshot_records))
+            for private_path in (snapshot_path, snapshot_state):
+                self.assertEqual(0o600, stat(private_path).st_mode & 0o777)
+            self.assertEqual(
+                {f'secret {index}' for index in range(5)},
+                {
+                    record.secret.text for record in snapshot_records
+                    if isinstance(record, DumpedItem) and record.secret
+                },
+            )
+
+        for collection_path in (source_path, target_path):
+            await SecretCollection(collection_path).delete()
+
+    async def test_watch(self) -> None:
+        secrets_service = SecretService()
+
+        async with watch(debounce=0.05) as events, \
+                watch(max_queue_size=1, overflow=OVERFLOW_RAISE) as overflown:
+            collection_path, _ = await secrets_service.create_collection(
+                {'org.freedesktop.Secret.Collection.Label': (
+                    's', 'WatchTest')},
+                '',
+            )
+
+            async with SecretSessionManager() as session_manager:
+                item_path, _ = await SecretCollection(
+                    collection_path).create_item(
+                    {
+                        'org.freedesktop.Secret.Item.Label': ('s', 'Watched'),
+                        'org.freedesktop.Secret.Item.Attributes': (
+                            'a{ss}', {'WatchTest': 'yes'}),
+                    },
+                    (await session_manager.get_session(), b'', b'secret',
+                     'text/plain'),
+                    False,
+                )
+
+            for index in range(3):
+                await SecretItem(item_path).label.set_async(f'Label {index}')
+
+            await sleep(0.1)
+            await SecretItem(item_path).delete()
+            await SecretCollection(collection_path).delete()
+
+            received_events: List[SecretEvent] = []
+            while not received_events or not isinstance(
+                    received_events[-1], CollectionDeleted):
+                event = await wait_for(events.__anext__(), 5)
+                if event[0] == collection_path:
+                    received_events.append(event)
+
+            self.assertEqual(
+                [
+                    CollectionCreated(collection_path),
+                    ItemCreated(collection_path, item_path),
+                    ItemChanged(collection_path, item_path),
+                    ItemDeleted(collection_path, item_path),
+                    CollectionDeleted(collection_path),
+                ],
+                received_events,
+            )
+            self.assertGreaterEqual(events.coalesced, 2)
+
+            with self.assertRaises(EventQueueOverflowError):
+                await wait_for(overflown.__anext__(), 5)
+
+            self.assertGreater(overflown.dropped, 0)
+
+        self.assertEqual([], [event async for event in events])
+
+    async def test_fork_safe_client(self) -> None:
+        async with SecretsClient() as client:
+            await client.warm_up()
+            parent_bus = client.bus
+            parent_session = await client.get_session()
+            default_collection_path = await client.service.read_alias(
+                'default')
+
+            async def check_child() -> bool:
+                await client.warm_up()
+                return (
+                    client.bus is not parent_bus
+                    and await client.get_session() != parent_session
+                    and await client.service.read_alias('default')
+                    == default_collection_path
+                )
+
+            read_fd, write_fd = pipe()
+            pid = fork()
+            if pid == 0:
+                try:
+                    write(write_fd, b'1' if run(check_child()) else b'0')
+                finally:
+                    _exit(0)
+
+            close(write_fd)
+            waitpid(pid, 0)
+            self.assertEqual(b'1', read(read_fd, 1))
+            close(read_fd)
+
+            self.assertIs(parent_bus, client.bus)
+            self.assertEqual(parent_session, await client.get_session())
+
+    async def test_proxy_factory(self) -> None:
+        secrets_service = SecretService()
+
+        async with SecretSessionManager() as session_manager, \
+                SecretProxyFactory() as proxy_factory:
+            session_path = await session_manager.get_session()
+
+            default_collection = proxy_factory.collection(
+                await secrets_service.read_alias('default'))
+            self.assertIs(
+                default_collection,
+                proxy_factory.collection(
+                    await secrets_service.read_alias('default')),
+            )
+
+            new_secret_path, _ = await default_collection.create_item(
+                {
+                    'org.freedesktop.Secret.Item.Label': ('s', 'MyItem'),
+                    'org.freedesktop.Secret.Item.Attributes': (
+                        'a{ss}', {'ProxyTest': 'yes'}),
+                },
+                (session_path, b'', b'my secret', 'text/plain'),
+                False,
+            )
+
+            new_secret = proxy_factory.item(new_secret_path)
+            self.assertIs(new_secret, proxy_factory.item(new_secret_path))
+
+            await new_secret.delete()
+
+            for _ in range(100):
+                if proxy_factory.item(new_secret_path) is not new_secret:
+                    break
+
+                await sleep(0.01)
+
+            self.assertIsNot(new_secret, proxy_factory.item(new_secret_path))
+
+    async def test_reference_daemon(self) -> None:
+        secrets_daemon = SecretsDaemon()
+        # Objects are exported on a separate connection under
+        # a different name than the secrets daemon
+        daemon_bus = sd_bus_open_user()
+        secrets_daemon.export(daemon_bus)
+        await daemon_bus.request_name_async(DAEMON_TEST_BUS_NAME, 0)
+
+        secrets_service = SecretServiceInterface.new_proxy(
+            DAEMON_TEST_BUS_NAME, '/org/freedesktop/secrets')
+
+        _, session_path = await secrets_service.open_session(
+            'plain', ('s', ''))
+        collection_path = await secrets_service.read_alias('default')
+        collection = SecretCollectionInterface.new_proxy(
+            DAEMON_TEST_BUS_NAME, collection_path)
+
+        items_paths: List[str] = []
+        for i in range(4):
+            item_path, _ = await collection.create_item(
+                {
+                    'org.freedesktop.Secret.Item.Label': ('s', f'Item{i}'),
+                    'org.freedesktop.Secret.Item.Attributes': (
+                        'a{ss}', {'DaemonTest': str(i % 2)}),
+                },
+                (session_path, b'', f'secret{i}'.encode(), 'text/plain'),
+                False,
+            )
+            items_paths.append(item_path)
+
+        self.assertEqual(4, len(secrets_daemon))
+
+        unlocked, locked = await secrets_service.search_items(
+            {'DaemonTest': '1'})
+        self.assertEqual(sorted(items_paths[1::2]), sorted(unlocked))
+        self.assertEqual([], locked)
+
+        secrets = await secrets_service.get_secrets(items_paths, session_path)
+        self.assertEqual(b'secret2', secrets[items_paths[2]][2])
+
+        await secrets_service.lock([collection_path])
+        self.assertEqual(
+            ([], sorted(items_paths[1::2])),
+            tuple(map(sorted, await secrets_service.search_items(
+                {'DaemonTest': '1'}))),
+        )
+        self.assertEqual(
+            {}, await secrets_service.get_secrets(items_paths, session_path))
+
+        _, prompt_path = await secrets_service.unlock([collection_path])
+        await SecretPromptInterface.new_proxy(
+            DAEMON_TEST_BUS_NAME, prompt_path).prompt('')
+        for _ in range(100):
+            if not await collection.locked:
+                break
+
+            await sleep(0.01)
+
+        self.assertFalse(await collection.locked)
+
+        await SecretItemInterface.new_proxy(
+            DAEMON_TEST_BUS_NAME, items_paths[0]).delete()
+        self.assertEqual(
+            [items_paths[2]],
+            await collection.search_items({'DaemonTest': '0'}),
+        )
+
+        # Sessions are closed when the client disconnects
+        client_bus = sd_bus_open_user()
+        _, client_session_path = await SecretServiceInterface.new_proxy(
+            DAEMON_TEST_BUS_NAME, '/org/freedesktop/secrets', client_bus,
+        ).open_session('plain', ('s', ''))
+        await secrets_service.get_secrets(items_paths, client_session_path)
+        client_bus.close()
+
+        with self.assertRaises(SecretNoSessionError):
+            for _ in range(100):
+                await secrets_service.get_secrets(
+                    items_paths, client_session_path)
+                await sleep(0.01)
+
+        secrets_daemon.close()
+
+    def test_log_storage(self) -> None:
+        collection = StoredCollection('/c', 'Collection', 1, 1)
+        items = [
+            StoredItem(f'/c/{i}', '/c', f'Item{i}', {'LogTest': str(i)},
+                       b'secret', 'text/plain', 1, 1)
+            for i in range(10)
+        ]
+
+        with TemporaryDirectory() as temp_dir:
+            log_path = join(temp_dir, 'secrets.log')
+
+            log_storage = LogStorage(log_path)
+            log_storage.put_collection(collection)
+            log_storage.set_alias('default', '/c')
+            for _ in range(3):
+                for item in items:
+                    log_storage.put_item(item)
+            log_storage.delete_item('/c/0')
+            log_storage.commit()
+            log_storage.close()
+
+            # Simulate a crash in the middle of writing a record
+            log_size = getsize(log_path)
+            with open(log_path, 'ab') as log_file:
+                log_file.write(b'\x40\x00\x00\x00torn')
+
+            log_storage = LogStorage(log_path)
+            self.assertEqual(log_size, getsize(log_path))
+            self.assertEqual([collection], log_storage.load_collections())
+            self.assertEqual({'default': '/c'}, log_storage.load_aliases())
+            self.assertEqual(
+                items[1:],
+                sorted(log_storage.load_items(),
+                       key=lambda item: int(item.path[3:])),
+            )
+
+            log_storage.compact()
+            self.assertEqual(0, log_storage.dead_bytes)
+            self.assertLess(getsize(log_path), log_size)
+            self.assertEqual(items[5], log_storage.read_item('/c/5'))
+
+            log_storage.delete_collection('/c')
+            self.assertEqual([], list(log_storage.load_items()))
+            log_storage.close()
+
+    def test_log_storage_failed_write(self) -> None:
+        collection = StoredCollection('/c', 'Collection', 1, 1)
+        item = StoredItem('/c/1', '/c', 'Item', {'Attr': 'value'},
+                          b'secret' * 100, 'text/plain', 1, 1)
+
+        with TemporaryDirectory() as temp_dir:
+            log_path = join(temp_dir, 'secrets.log')
+
+            log_storage = LogStorage(log_path)
+            log_storage.put_collection(collection)
+            log_size = log_storage.size
+
+            # File size limit makes the write short and then fail
+            old_handler = signal(SIGXFSZ, SIG_IGN)
+            old_limits = getrlimit(RLIMIT_FSIZE)
+            setrlimit(RLIMIT_FSIZE, (log_size + 100, old_limits[1]))
+            try:
+                with self.assertRaises(OSError):
+                    log_storage.put_item(item)
+            finally:
+                setrlimit(RLIMIT_FSIZE, old_limits)
+                signal(SIGXFSZ, old_handler)
+
+            self.assertEqual(log_size, log_storage.size)
+            self.assertEqual(log_size, getsize(log_path))
+
+            log_storage.put_item(item)
+            log_storage.close()
+
+            log_storage = LogStorage(log_path)
+            self.assertEqual([item], list(log_storage.load_items()))
+            log_storage.close()
+
+    def test_sqlite_storage(self) -> None:
+        collection = StoredCollection('/c', 'Collection', 1, 1)
+        items = [
+            StoredItem(f'/c/{i}', '/c', f'Item{i}',
+                       {'Parity': str(i % 2), 'Third': str(i % 3)},
+                       b'secret', 'text/plain', 1, 1)
+            for i in range(10)
+        ]
+
+        with TemporaryDirectory() as temp_dir:
+            database_path = join(temp_dir, 'secrets.sqlite')
+
+            sqlite_storage = SqliteStorage(database_path, max_batch_size=4)
+            sqlite_storage.put_collection(collection)
+            sqlite_storage.set_alias('default', '/c')
+            for item in items:
+                sqlite_storage.put_item(item)
+            sqlite_storage.put_item(items[3]._replace(label='Changed'))
+            sqlite_storage.delete_item('/c/0')
+            sqlite_storage.close()
+
+            sqlite_storage = SqliteStorage(database_path)
+            self.assertEqual(
+                [collection], sqlite_storage.load_collections())
+            self.assertEqual(
+                {'default': '/c'}, sqlite_storage.load_aliases())
+            self.assertEqual(
+                [items[1], items[2], items[3]._replace(label='Changed')]
+                + items[4:],
+                list(sqlite_storage.load_items()),
+            )
+            sqlite_storage.delete_collection('/c')
+            self.assertEqual([], list(sqlite_storage.load_items()))
+            self.assertEqual({}, sqlite_storage.load_aliases())
+            sqlite_storage.close()
+
+    def test_sqlite_storage_failed_write(self) -> None:
+        collection = StoredCollection('/c', 'Collection', 1, 1)
+        item = StoredItem('/c/1', '/c', 'Item', {'Attr': 'value'},
+                          b'secret', 'text/plain', 1, 1)
+
+        with TemporaryDirectory() as temp_dir:
+            database_path = join(temp_dir, 'secrets.sqlite')
+
+            sqlite_storage = SqliteStorage(database_path)
+            sqlite_storage.put_collection(collection)
+            sqlite_storage.commit()
+
+            # Collection does not exist
+            with self.assertRaises(IntegrityError):
+                sqlite_storage.put_item(item._replace(collection_path='/d'))
+
+            sqlite_storage.put_item(item)
+            sqlite_storage.commit()
+            sqlite_storage.set_alias('default', '/c')
+            sqlite_storage.close()
+
+            sqlite_storage = SqliteStorage(database_path)
+            self.assertEqual(
+                [collection], sqlite_storage.load_collections())
+            self.assertEqual([item], list(sqlite_storage.load_items()))
+            self.assertEqual(
+                {'default': '/c'}, sqlite_storage.load_aliases())
+            sqlite_storage.close()
+
+            with connect(database_path) as connection:
+                connection.execute(
+                    "CREATE TRIGGER rollback_all BEFORE INSERT ON items "
+                    "WHEN new.label = 'Rollback' "
+                    "BEGIN SELECT RAISE(ROLLBACK, 'rollback'); END"
+                )
+            connection.close()
+
+            sqlite_storage = SqliteStorage(database_path)
+            sqlite_storage.set_alias('other', '/c')
+            # Whole transaction is rolled back including the alias
+            with self.assertRaises(IntegrityError):
+                sqlite_storage.put_item(
+                    item._replace(path='/c/2', label='Rollback'))
+
+            with self.assertRaises(StorageFailedError):
+                sqlite_storage.put_item(item._replace(path='/c/3'))
+
+            sqlite_storage.close()